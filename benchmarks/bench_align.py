@@ -0,0 +1,101 @@
+"""Compara os motores de alinhamento do modo `fuse` (levenshtein x difflib).
+
+Uso:
+    python benchmarks/bench_align.py                       # páginas sintéticas
+    python benchmarks/bench_align.py --segment page        # alinhamento da página inteira
+    python benchmarks/bench_align.py --input-dir data/ --glob "**/*.jpg"   # páginas reais
+
+Nas páginas reais, usa os candidatos OCR já gerados ao lado de cada imagem
+(`.tess.psmNN.txt`, `.paddle.txt`, `.easy.txt`).
+"""
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from daa_cli.align import resolve_engine
+from daa_cli.export import fuse_candidates, list_candidates_for_base
+from daa_cli.utils import base_for_image, discover_images, read_text_if_exists
+
+ALPHABET = "abcdefghijlmnopqrstuvxzáâãçéêíóôõú"
+
+def _synthetic_page(rng: random.Random, n_chars: int) -> str:
+    words = []
+    size = 0
+    while size < n_chars:
+        word = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 10)))
+        words.append(word)
+        size += len(word) + 1
+        if rng.random() < 0.08:
+            words.append("\n")
+    return " ".join(words)[:n_chars]
+
+def _corrupt(rng: random.Random, text: str, rate: float) -> str:
+    out = []
+    for ch in text:
+        r = rng.random()
+        if r < rate / 3:
+            continue
+        if r < 2 * rate / 3:
+            out.append(rng.choice(ALPHABET))
+        elif r < rate:
+            out.append(ch + rng.choice(ALPHABET))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+def synthetic_pages(n_pages: int, n_chars: int, n_candidates: int, rate: float, seed: int):
+    rng = random.Random(seed)
+    for idx in range(n_pages):
+        truth = _synthetic_page(rng, n_chars)
+        yield f"sintetica_{idx:02d}", {f"cand{k}": _corrupt(rng, truth, rate) for k in range(n_candidates)}
+
+def real_pages(input_dir: str, glob: str):
+    for img in discover_images(Path(input_dir).resolve(), glob):
+        texts = {}
+        for key, path in list_candidates_for_base(base_for_image(img)).items():
+            txt = read_text_if_exists(path)
+            if txt:
+                texts[key] = txt
+        if len(texts) >= 2:
+            yield img.name, texts
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--input-dir", help="Diretório com imagens e candidatos OCR (omitido: páginas sintéticas)")
+    ap.add_argument("--glob", default="**/*.jpg")
+    ap.add_argument("--pages", type=int, default=3)
+    ap.add_argument("--chars", type=int, default=20000)
+    ap.add_argument("--candidates", type=int, default=7)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--engines", default="levenshtein,difflib")
+    ap.add_argument("--segment", default="line", choices=["line", "page"], help="Segmentação da fusão")
+    args = ap.parse_args()
+
+    engines = [resolve_engine(e) for e in args.engines.split(",")]
+    if args.input_dir:
+        pages = list(real_pages(args.input_dir, args.glob))
+    else:
+        pages = list(synthetic_pages(args.pages, args.chars, args.candidates, args.error_rate, args.seed))
+
+    print(f"{'página':<24} {'chars':>7} {'cands':>5} " + " ".join(f"{e:>12}" for e in engines))
+    totals = {e: 0.0 for e in engines}
+    for name, cands in pages:
+        timings = []
+        for engine in engines:
+            t0 = time.perf_counter()
+            fuse_candidates(cands, align_engine=engine, segment=args.segment)
+            dt = time.perf_counter() - t0
+            totals[engine] += dt
+            timings.append(dt)
+        longest = max(len(t) for t in cands.values())
+        print(f"{name[:24]:<24} {longest:>7} {len(cands):>5} " + " ".join(f"{dt:>11.3f}s" for dt in timings))
+    print(f"{'total':<24} {'':>7} {'':>5} " + " ".join(f"{totals[e]:>11.3f}s" for e in engines))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compara o CER/WER de `daa_cli.metrics.edit_scores` com `jiwer.cer` + `jiwer.wer`.
+
+Uso:
+    python benchmarks/bench_metrics.py                          # pares sintéticos
+    python benchmarks/bench_metrics.py --input-dir data/ --glob "**/*.jpg"   # curator x candidatos
+
+Além do tempo, confere que os valores batem com os do jiwer.
+"""
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from jiwer import cer, wer
+
+from bench_align import synthetic_pages
+from daa_cli.export import list_candidates_for_base
+from daa_cli.metrics import edit_scores
+from daa_cli.utils import base_for_image, discover_images, read_text_if_exists
+
+def synthetic_pairs(n_pages: int, n_chars: int, n_candidates: int, rate: float, seed: int):
+    for _name, cands in synthetic_pages(n_pages, n_chars, n_candidates + 1, rate, seed):
+        texts = list(cands.values())
+        gold = texts[0]
+        for text in texts[1:]:
+            yield gold, text
+
+def real_pairs(input_dir: str, glob: str, gold_suffix: str):
+    for img in discover_images(Path(input_dir).resolve(), glob):
+        base = base_for_image(img)
+        gold = read_text_if_exists(base.with_suffix(gold_suffix))
+        if not gold:
+            continue
+        for path in list_candidates_for_base(base).values():
+            text = read_text_if_exists(path)
+            if text:
+                yield gold, text
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--input-dir", help="Diretório com imagens, curator e candidatos (omitido: pares sintéticos)")
+    ap.add_argument("--glob", default="**/*.jpg")
+    ap.add_argument("--gold-suffix", default=".curator.txt")
+    ap.add_argument("--pages", type=int, default=5)
+    ap.add_argument("--chars", type=int, default=20000)
+    ap.add_argument("--candidates", type=int, default=7)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=13)
+    args = ap.parse_args()
+
+    if args.input_dir:
+        pairs = list(real_pairs(args.input_dir, args.glob, args.gold_suffix))
+    else:
+        pairs = list(synthetic_pairs(args.pages, args.chars, args.candidates, args.error_rate, args.seed))
+    if not pairs:
+        raise SystemExit("Nenhum par (curator, candidato) encontrado.")
+    total_chars = sum(len(gold) for gold, _text in pairs)
+
+    t0 = time.perf_counter()
+    ref = [(float(cer(gold, text)), float(wer(gold, text))) for gold, text in pairs]
+    t_jiwer = time.perf_counter() - t0
+
+    timings = [("jiwer cer+wer", t_jiwer)]
+    mismatches = 0
+    for breakdown in (False, True):
+        t0 = time.perf_counter()
+        ours = [edit_scores(gold, text, breakdown) for gold, text in pairs]
+        timings.append(("edit_scores" + (" +S/I/D" if breakdown else ""), time.perf_counter() - t0))
+        mismatches += sum(
+            1 for (c, w), s in zip(ref, ours) if abs(c - s.cer) > 1e-9 or abs(w - s.wer) > 1e-9
+        )
+
+    print(f"pares: {len(pairs)}  caracteres (gold): {total_chars}")
+    for name, dt in timings:
+        print(f"{name:<20} {dt:8.3f}s  {len(pairs) / dt:9.1f} pares/s  {total_chars / dt / 1e6:7.2f} Mchar/s")
+    print(f"divergências: {mismatches}")
+
+if __name__ == "__main__":
+    main()
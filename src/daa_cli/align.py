@@ -0,0 +1,98 @@
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+import difflib
+import numpy as np
+
+# (tag, a0, a1, b0, b1) no formato de `difflib.SequenceMatcher.get_opcodes`.
+Opcode = Tuple[str, int, int, int, int]
+
+ALIGN_ENGINES = ("auto", "levenshtein", "difflib")
+
+def _load_levenshtein():
+    # rapidfuzz já vem com o jiwer>=3; o import é protegido para instalações antigas.
+    try:
+        from rapidfuzz.distance import Levenshtein
+    except Exception:
+        return None
+    return Levenshtein
+
+_levenshtein = _load_levenshtein()
+
+def resolve_engine(engine: str = "auto") -> str:
+    engine = (engine or "auto").strip().lower()
+    if engine not in ALIGN_ENGINES:
+        raise ValueError(
+            "Motor de alinhamento '{engine}' inválido. Use {opts}.".format(engine=engine, opts=", ".join(ALIGN_ENGINES))
+        )
+    if engine == "auto":
+        return "levenshtein" if _levenshtein is not None else "difflib"
+    if engine == "levenshtein" and _levenshtein is None:
+        raise RuntimeError("Motor 'levenshtein' requer rapidfuzz (pip install rapidfuzz).")
+    return engine
+
+def align_opcodes(a: Sequence[str], b: Sequence[str], engine: str = "auto") -> List[Opcode]:
+    """Alinha duas sequências de caracteres e devolve opcodes equal/replace/delete/insert.
+
+    `levenshtein` usa o alinhamento de distância de edição mínima do rapidfuzz
+    (bit-paralelo de Hyyrö + Hirschberg, em C++), quase linear em páginas
+    inteiras. `difflib` é o caminho original, em Python puro, por blocos
+    comuns mais longos.
+    """
+    engine = resolve_engine(engine)
+    if engine == "levenshtein":
+        s1 = a if isinstance(a, str) else "".join(a)
+        s2 = b if isinstance(b, str) else "".join(b)
+        if len(s1) != len(a) or len(s2) != len(b):
+            # Tokens com mais de um caractere: compara como sequências de hashables.
+            s1, s2 = list(a), list(b)
+        return [tuple(op) for op in _levenshtein.opcodes(s1, s2)]
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.get_opcodes()
+
+def _similarity_matrix(a: Sequence[str], b: Sequence[str], min_similarity: float) -> np.ndarray:
+    if _levenshtein is not None:
+        from rapidfuzz.distance import Indel
+        from rapidfuzz.process import cdist
+        # Similaridade por LCS (a mesma medida do `ratio` do difflib), em C++ e
+        # em todos os núcleos, sem o GIL; pares abaixo do limiar saem com 0,
+        # o que para o DP equivale a "não casa".
+        return cdist(
+            a, b, scorer=Indel.normalized_similarity, score_cutoff=min_similarity, dtype=np.float64, workers=-1,
+        )
+    return np.array(
+        [[difflib.SequenceMatcher(None, x, y, autojunk=False).ratio() for y in b] for x in a], dtype=np.float64,
+    ).reshape(len(a), len(b))
+
+def align_lines(a: Sequence[str], b: Sequence[str], min_similarity: float = 0.3) -> List[Tuple[int, int]]:
+    """Casa linhas de `a` e `b` em ordem (DP monotônica) e devolve os pares (i, j).
+
+    Só linhas com similaridade >= `min_similarity` podem casar; as demais ficam
+    sem par. O ganho de cada par é a similaridade acima do limiar, de modo que
+    o DP prefere poucos pares bons a muitos pares ruins. Cada linha do DP é
+    calculada de uma vez com NumPy: o máximo entre "pular a linha de `a`" e
+    "casar com j" é propagado para a direita por um máximo acumulado.
+    """
+    if not a or not b:
+        return []
+    n, m = len(a), len(b)
+    sim = _similarity_matrix(a, b, min_similarity)
+    gain = np.where(sim >= min_similarity, sim - min_similarity, -np.inf)
+    score = np.zeros((n + 1, m + 1), dtype=np.float64)
+    for i in range(1, n + 1):
+        prev = score[i - 1]
+        best = prev.copy()
+        np.maximum(best[1:], prev[:-1] + gain[i - 1], out=best[1:])
+        np.maximum.accumulate(best, out=score[i])
+    pairs: List[Tuple[int, int]] = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        here = score[i, j]
+        if here > score[i - 1, j] and here > score[i, j - 1] and here == score[i - 1, j - 1] + gain[i - 1, j - 1]:
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif score[i - 1, j] >= score[i, j - 1]:
+            i -= 1
+        else:
+            j -= 1
+    pairs.reverse()
+    return pairs
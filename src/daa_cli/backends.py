@@ -2,33 +2,72 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional, Callable
+import hashlib
 import inspect
 import os
-from .utils import run_cmd, write_json
+import threading
+import time
+from .utils import write_output
+from .scheduler import CommandScheduler, get_scheduler
 
-def run_tesseract(image: Path, lang: str, oem: int, psm_list: List[int], out_formats: List[str], dry_run: bool=False) -> List[Dict[str, Any]]:
-    rows = []
+def run_tesseract(
+    image: Path,
+    lang: str,
+    oem: int,
+    psm_list: List[int],
+    out_formats: List[str],
+    dry_run: bool=False,
+    scheduler: Optional[CommandScheduler]=None,
+) -> List[Dict[str, Any]]:
+    scheduler = scheduler or get_scheduler()
+    # Uma única execução por PSM gera todos os formatos pedidos (configfiles
+    # txt/tsv/hocr/pdf): análise de layout e reconhecimento rodam uma vez só.
+    configfiles = [fmt for fmt in out_formats if fmt in {"tsv","hocr","pdf"}]
+    if configfiles and "txt" in out_formats:
+        configfiles.insert(0, "txt")
+    jobs = []
     for psm in psm_list:
         out_base = image.with_suffix("").as_posix() + f".tess.psm{psm:02d}"
+        cmd = ["tesseract", str(image), out_base, "-l", lang, "--oem", str(oem), "--psm", str(psm)] + configfiles
+        future = None if dry_run else scheduler.submit(cmd)
+        jobs.append((psm, out_base, future))
+
+    rows = []
+    for psm, out_base, future in jobs:
+        if future is None:
+            rc, dt, err, wait = 0, 0.0, "DRY-RUN", 0.0
+        else:
+            rc, dt, err, wait = future.result()
         for fmt in out_formats:
-            cmd = ["tesseract", str(image), out_base, "-l", lang, "--oem", str(oem), "--psm", str(psm)]
-            if fmt in {"tsv","hocr","pdf"}:
-                cmd.append(fmt)
-            if dry_run:
-                rc, dt, err = 0, 0.0, "DRY-RUN"
-            else:
-                rc, dt, err = run_cmd(cmd)
             rows.append({
                 "engine":"tesseract",
                 "psm":psm,
                 "format":fmt,
+                "shared_formats":list(out_formats),
                 "exit_code":rc,
                 "duration_sec":dt,
+                "queue_wait_sec":wait,
                 "stderr":err,
                 "out_path": str(Path(out_base + f".{fmt}"))
             })
     return rows
 
+def read_image(image: Path, decode: bool=True) -> Tuple[str, Any]:
+    """Lê a imagem do disco uma única vez: devolve (SHA-256, array BGR ou None).
+
+    O array só é decodificado se `decode` e o OpenCV estiver disponível; é o
+    formato que PaddleOCR consome direto e que o EasyOCR recebe convertido.
+    """
+    data = image.read_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+    if not decode:
+        return sha, None
+    cv2 = _safe_import("cv2")
+    np = _safe_import("numpy")
+    if cv2 is None or np is None:
+        return sha, None
+    return sha, cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
 def _safe_import(module: str):
     try:
         return __import__(module)
@@ -38,6 +77,9 @@ def _safe_import(module: str):
 _easyocr_cache: Dict[Tuple[Tuple[str, ...], bool], Any] = {}
 _paddle_cache: Dict[Tuple[bool, str], Any] = {}
 _deepseek_cache: Dict[Tuple[Optional[str], Optional[str], Optional[str], str], Any] = {}
+_tesserocr_cache: Dict[Tuple[str, int], Tuple[Any, threading.Lock]] = {}
+# Falhas de inicialização (traineddata ausente, lang inválido) por (lang, oem).
+_tesserocr_errors: Dict[Tuple[str, int], str] = {}
 
 _EASYOCR_MISSING = (
     "easyocr não instalado. Instale com `pip install -e '.[ocr-easy]'` ou "
@@ -47,6 +89,10 @@ _PADDLE_MISSING = (
     "paddleocr não instalado. Instale com `pip install -e '.[ocr-paddle]'` ou "
     "`pip install paddleocr paddlepaddle`. Docs: https://www.paddleocr.ai."
 )
+_TESSEROCR_MISSING = (
+    "tesserocr não instalado. Instale com `pip install -e '.[ocr-tesseract-api]'` ou "
+    "`pip install tesserocr` (requer libtesseract/leptonica). Docs: https://github.com/sirfz/tesserocr."
+)
 _DEEPSEEK_MISSING = (
     "deepseek_ocr não instalado. Instale as dependências com "
     "`pip install -e '.[ocr-deepseek]'` e configure "
@@ -81,9 +127,20 @@ def clear_paddle_cache() -> None:
     _paddle_cache.clear()
 
 
+def clear_tesserocr_cache() -> None:
+    for api, _lock in _tesserocr_cache.values():
+        try:
+            api.End()
+        except Exception:
+            pass
+    _tesserocr_cache.clear()
+    _tesserocr_errors.clear()
+
+
 def clear_ocr_caches() -> None:
     clear_easyocr_cache()
     clear_paddle_cache()
+    clear_tesserocr_cache()
     _deepseek_cache.clear()
 
 
@@ -111,6 +168,46 @@ def _get_paddle_ocr(gpu: bool, lang: str):
     return ocr
 
 
+def _get_tesserocr_api(lang: str, oem: int):
+    tesserocr = _safe_import("tesserocr")
+    if tesserocr is None:
+        return None, _TESSEROCR_MISSING
+    key = (lang, int(oem))
+    if key in _tesserocr_errors:
+        return None, _tesserocr_errors[key]
+    cached = _tesserocr_cache.get(key)
+    if cached is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang=lang, oem=int(oem))
+        except Exception as exc:
+            _tesserocr_errors[key] = f"falha ao inicializar tesserocr (lang={lang}, oem={oem}): {exc}"
+            return None, _tesserocr_errors[key]
+        # PyTessBaseAPI não é thread-safe; o lock serializa o uso da instância.
+        cached = (api, threading.Lock())
+        _tesserocr_cache[key] = cached
+    return cached, ""
+
+
+def tesserocr_version() -> str:
+    tesserocr = _safe_import("tesserocr")
+    if tesserocr is None:
+        return "unknown (tesserocr não instalado)"
+    try:
+        return str(tesserocr.tesseract_version()).splitlines()[0].strip()
+    except Exception as e:
+        return f"unknown ({e})"
+
+
+_ENGINE_MODULES = {"paddle": "paddleocr", "easyocr": "easyocr", "deepseek": "deepseek_ocr"}
+
+
+def python_engine_version(engine: str) -> str:
+    module = _safe_import(_ENGINE_MODULES.get(engine, engine))
+    if module is None:
+        return ""
+    return str(getattr(module, "__version__", ""))
+
+
 def _select_deepseek_entrypoint(module: Any):
     for candidate in ("DeepSeekOCR", "DeepSeekOcr", "OCR"):
         if hasattr(module, candidate):
@@ -239,34 +336,104 @@ def _normalize_deepseek_result(result: Any) -> Tuple[str, List[Dict[str, Any]]]:
     return str(result), []
 
 
-def run_easyocr(image: Path, langs: List[str], gpu: bool=False) -> Dict[str, Any]:
-    langs_key = tuple(langs)
-    reader = _get_easyocr_reader(langs_key, gpu)
-    if reader is None:
-        return {"engine":"easyocr","available":False,"error":_EASYOCR_MISSING}
-    result = reader.readtext(str(image), detail=1)  # [ [bbox, text, conf], ... ]
+# `emit(path, conteúdo)` grava uma saída; por padrão é síncrono (`write_output`),
+# mas o pipeline do `ocr_batch` passa uma função que enfileira a escrita.
+Emit = Callable[[Path, Any], None]
+
+def _write_easyocr_outputs(image: Path, result: List[Any], gpu: bool, emit: Optional[Emit]=None) -> Dict[str, Any]:
+    emit = emit or write_output
     words = []
     lines = []
-    for item in result:
+    for item in result:  # [ [bbox, text, conf], ... ]
         bbox, text, conf = item[0], item[1], float(item[2])
         words.append({"bbox": bbox, "text": text, "conf": conf})
         lines.append(text)
     text_out = "\n".join(lines)
     txt_path = image.with_suffix(".easy.txt")
     json_path = image.with_suffix(".easy.json")
-    txt_path.write_text(text_out, encoding="utf-8")
-    write_json(json_path, {"engine":"easyocr","gpu":gpu,"words":words})
+    emit(txt_path, text_out)
+    emit(json_path, {"engine":"easyocr","gpu":gpu,"words":words})
     return {"engine":"easyocr","available":True,"out_txt":str(txt_path),"out_json":str(json_path)}
 
-def run_paddle(image: Path, gpu: bool=False) -> Dict[str, Any]:
-    ocr = _get_paddle_ocr(gpu, "pt")
-    if ocr is None:
-        return {"engine":"paddle","available":False,"error":_PADDLE_MISSING}
-    result = ocr.ocr(str(image), cls=True)
+def _to_rgb(cv2: Any, arr: Any):
+    # easyocr.utils.loadImage entrega RGB; cv2 decodifica em BGR.
+    return cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
+
+def run_easyocr(
+    image: Path,
+    langs: List[str],
+    gpu: bool=False,
+    array: Any=None,
+    emit: Optional[Emit]=None,
+) -> Dict[str, Any]:
+    """EasyOCR de uma imagem; `array` (BGR, já decodificado) evita reler o arquivo."""
+    langs_key = tuple(langs)
+    reader = _get_easyocr_reader(langs_key, gpu)
+    if reader is None:
+        return {"engine":"easyocr","available":False,"error":_EASYOCR_MISSING}
+    cv2 = _safe_import("cv2") if array is not None else None
+    source = _to_rgb(cv2, array) if cv2 is not None else str(image)
+    result = reader.readtext(source, detail=1)
+    return _write_easyocr_outputs(image, result, gpu, emit)
+
+def run_easyocr_batch(
+    images: List[Path],
+    langs: List[str],
+    gpu: bool=False,
+    batch_size: int=8,
+    arrays: Optional[List[Any]]=None,
+    emit: Optional[Emit]=None,
+) -> List[Dict[str, Any]]:
+    """EasyOCR em lotes: até `batch_size` imagens por chamada a `readtext_batched`.
+
+    O detector empilha as imagens num único tensor, que exige dimensões
+    iguais: as páginas são ordenadas por tamanho e, em cada lote, completadas
+    com branco à direita e embaixo até a maior delas. As caixas continuam nas
+    coordenadas da página original, e o resultado volta às saídas
+    `.easy.txt`/`.easy.json` de cada imagem, na ordem de `images`.
+    """
+    reader = _get_easyocr_reader(tuple(langs), gpu)
+    if reader is None:
+        return [{"engine":"easyocr","available":False,"error":_EASYOCR_MISSING} for _ in images]
+    cv2 = _safe_import("cv2")
+    arrays = arrays or [None] * len(images)
+    if cv2 is None or not hasattr(reader, "readtext_batched") or batch_size <= 1:
+        return [run_easyocr(image, langs, gpu, arr, emit) for image, arr in zip(images, arrays)]
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+    loaded: List[Tuple[int, Any]] = []
+    for idx, image in enumerate(images):
+        arr = arrays[idx]
+        if arr is None:
+            arr = cv2.imread(str(image), cv2.IMREAD_COLOR)
+        if arr is None:
+            results[idx] = run_easyocr(image, langs, gpu, emit=emit)
+        else:
+            loaded.append((idx, _to_rgb(cv2, arr)))
+
+    # Páginas de tamanho parecido no mesmo lote: menos área de preenchimento.
+    loaded.sort(key=lambda item: item[1].shape[:2])
+    for start in range(0, len(loaded), batch_size):
+        chunk = loaded[start:start + batch_size]
+        height = max(arr.shape[0] for _, arr in chunk)
+        width = max(arr.shape[1] for _, arr in chunk)
+        padded = [
+            arr if arr.shape[:2] == (height, width) else cv2.copyMakeBorder(
+                arr, 0, height - arr.shape[0], 0, width - arr.shape[1], cv2.BORDER_CONSTANT, value=(255, 255, 255),
+            )
+            for _, arr in chunk
+        ]
+        batch_result = reader.readtext_batched(padded, detail=1)
+        for (idx, _arr), result in zip(chunk, batch_result):
+            results[idx] = _write_easyocr_outputs(images[idx], result, gpu, emit)
+    return [res for res in results if res is not None]
+
+def _write_paddle_outputs(image: Path, result: List[Any], gpu: bool, emit: Optional[Emit]=None) -> Dict[str, Any]:
+    emit = emit or write_output
     words = []
     lines = []
-    for page in result:
-        for line in page:
+    for page in result or []:
+        for line in page or []:
             bbox = line[0]
             text = line[1][0]
             conf = float(line[1][1])
@@ -275,10 +442,29 @@ def run_paddle(image: Path, gpu: bool=False) -> Dict[str, Any]:
     text_out = "\n".join(lines)
     txt_path = image.with_suffix(".paddle.txt")
     json_path = image.with_suffix(".paddle.json")
-    txt_path.write_text(text_out, encoding="utf-8")
-    write_json(json_path, {"engine":"paddle","gpu":gpu,"words":words})
+    emit(txt_path, text_out)
+    emit(json_path, {"engine":"paddle","gpu":gpu,"words":words})
     return {"engine":"paddle","available":True,"out_txt":str(txt_path),"out_json":str(json_path)}
 
+def run_paddle(image: Path, gpu: bool=False, array: Any=None, emit: Optional[Emit]=None) -> Dict[str, Any]:
+    """PaddleOCR de uma imagem; `array` (BGR, como o Paddle espera) evita reler o arquivo."""
+    ocr = _get_paddle_ocr(gpu, "pt")
+    if ocr is None:
+        return {"engine":"paddle","available":False,"error":_PADDLE_MISSING}
+    result = ocr.ocr(array if array is not None else str(image), cls=True)
+    return _write_paddle_outputs(image, result, gpu, emit)
+
+def resolve_deepseek_paths(
+    model_path: Optional[str] = None,
+    weights_path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(modelo, pesos, cache) efetivos: opções da CLI ou, na falta delas, as variáveis de ambiente."""
+    return (
+        model_path or os.environ.get("DEEPSEEK_OCR_MODEL_PATH"),
+        weights_path or os.environ.get("DEEPSEEK_OCR_WEIGHTS"),
+        cache_dir or os.environ.get("DEEPSEEK_OCR_CACHE_DIR"),
+    )
 
 def run_deepseek(
     image: Path,
@@ -286,10 +472,12 @@ def run_deepseek(
     model_path: Optional[str] = None,
     weights_path: Optional[str] = None,
     cache_dir: Optional[str] = None,
+    emit: Optional[Emit] = None,
 ) -> Dict[str, Any]:
-    resolved_model_path = model_path or os.environ.get("DEEPSEEK_OCR_MODEL_PATH")
-    resolved_weights_path = weights_path or os.environ.get("DEEPSEEK_OCR_WEIGHTS")
-    resolved_cache_dir = cache_dir or os.environ.get("DEEPSEEK_OCR_CACHE_DIR")
+    emit = emit or write_output
+    resolved_model_path, resolved_weights_path, resolved_cache_dir = resolve_deepseek_paths(
+        model_path, weights_path, cache_dir,
+    )
     if resolved_cache_dir:
         os.environ["DEEPSEEK_OCR_CACHE_DIR"] = resolved_cache_dir
     instance, error = _get_deepseek_ocr(resolved_model_path, resolved_weights_path, resolved_cache_dir, gpu)
@@ -305,8 +493,8 @@ def run_deepseek(
     text_out, words = _normalize_deepseek_result(result)
     txt_path = image.with_suffix(".deepseek.txt")
     json_path = image.with_suffix(".deepseek.json")
-    txt_path.write_text(text_out, encoding="utf-8")
-    write_json(json_path, {
+    emit(txt_path, text_out)
+    emit(json_path, {
         "engine":"deepseek",
         "gpu":gpu,
         "model_path": resolved_model_path,
@@ -315,3 +503,89 @@ def run_deepseek(
         "words":words,
     })
     return {"engine":"deepseek","available":True,"out_txt":str(txt_path),"out_json":str(json_path)}
+
+
+_HOCR_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"\n'
+    '    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">\n'
+    ' <head>\n'
+    '  <title></title>\n'
+    '  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+    "  <meta name='ocr-system' content='tesseract (tesserocr)'/>\n"
+    "  <meta name='ocr-capabilities' content='ocr_page ocr_carea ocr_par ocr_line ocrx_word'/>\n"
+    ' </head>\n'
+    ' <body>\n'
+)
+_HOCR_FOOTER = " </body>\n</html>\n"
+# O CLI escreve o cabeçalho do TSV e termina o txt com o separador de página.
+_TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+_PAGE_SEPARATOR = "\f"
+
+
+def run_tesseract_api(
+    image: Path,
+    lang: str,
+    oem: int,
+    psm_list: List[int],
+    out_formats: List[str],
+    dry_run: bool=False,
+) -> List[Dict[str, Any]]:
+    """Tesseract em processo (tesserocr), com os mesmos arquivos `.tess.psmNN.*` do CLI.
+
+    A instância é mantida por (lang, oem) e reaproveitada entre PSMs e imagens,
+    evitando recarregar o traineddata a cada página. Sem tesserocr ou sem o
+    traineddata de `lang`, as linhas voltam com `available` False.
+    """
+    rows = []
+
+    def _row(psm: int, fmt: str, out_base: str, rc: int, dt: float, err: str, available: bool=True) -> Dict[str, Any]:
+        return {
+            "engine":"tesseract-api",
+            "psm":psm,
+            "format":fmt,
+            "shared_formats":list(out_formats),
+            "available":available,
+            "exit_code":rc,
+            "duration_sec":dt,
+            "queue_wait_sec":0.0,
+            "stderr":err,
+            "out_path": str(Path(out_base + f".{fmt}"))
+        }
+
+    cached, error = (None, "") if dry_run else _get_tesserocr_api(lang, oem)
+    for psm in psm_list:
+        out_base = image.with_suffix("").as_posix() + f".tess.psm{psm:02d}"
+        if dry_run:
+            rows.extend(_row(psm, fmt, out_base, 0, 0.0, "DRY-RUN") for fmt in out_formats)
+            continue
+        if cached is None:
+            rows.extend(_row(psm, fmt, out_base, 1, 0.0, error, available=False) for fmt in out_formats)
+            continue
+        api, lock = cached
+        t0 = time.time()
+        outputs: Dict[str, str] = {}
+        try:
+            with lock:
+                api.SetPageSegMode(int(psm))
+                api.SetImageFile(str(image))
+                if "txt" in out_formats:
+                    outputs["txt"] = api.GetUTF8Text() + _PAGE_SEPARATOR
+                if "tsv" in out_formats:
+                    outputs["tsv"] = _TSV_HEADER + api.GetTSVText(0)
+                if "hocr" in out_formats:
+                    outputs["hocr"] = _HOCR_HEADER + api.GetHOCRText(0) + _HOCR_FOOTER
+                api.Clear()
+        except Exception as exc:
+            dt = time.time() - t0
+            rows.extend(_row(psm, fmt, out_base, 1, dt, f"falha no tesserocr: {exc}") for fmt in out_formats)
+            continue
+        dt = time.time() - t0
+        for fmt in out_formats:
+            if fmt not in outputs:
+                rows.append(_row(psm, fmt, out_base, 1, dt, f"formato {fmt} indisponível no backend tesseract-api"))
+                continue
+            Path(out_base + f".{fmt}").write_text(outputs[fmt], encoding="utf-8")
+            rows.append(_row(psm, fmt, out_base, 0, dt, ""))
+    return rows
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+META_FILE = "meta.json"
+
+class ResultCache:
+    """Cache persistente de saídas OCR, endereçado por conteúdo.
+
+    Cada entrada fica em `<root>/<k[:2]>/<k>/` e guarda os arquivos gerados por
+    um engine (por papel: `txt`, `tsv`, `json`...) mais um `meta.json`. A chave
+    é o SHA-256 dos parâmetros que determinam o resultado (SHA-256 da imagem,
+    engine, versão, idioma, oem/psm, formato). O mtime do `meta.json` marca o
+    último acesso e orienta a remoção LRU em `evict`.
+    """
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str, dests: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+        """Restaura os arquivos da entrada em `dests` (papel -> destino); None se ausente."""
+        entry = self._entry_dir(key)
+        meta_path = entry / META_FILE
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            for role, dest in dests.items():
+                shutil.copyfile(entry / role, dest)
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return meta
+
+    def put(self, key: str, files: Dict[str, Path], meta: Optional[Dict[str, Any]] = None) -> bool:
+        entry = self._entry_dir(key)
+        if (entry / META_FILE).exists():
+            return True
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+            for role, src in files.items():
+                shutil.copyfile(src, tmp / role)
+            meta_out = dict(meta or {})
+            meta_out["stored_at"] = time.time()
+            (tmp / META_FILE).write_text(json.dumps(meta_out, ensure_ascii=False), encoding="utf-8")
+        except OSError:
+            return False
+        try:
+            # Rename atômico: outro processo pode ter gravado a mesma chave.
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return True
+
+    def evict(self) -> int:
+        """Remove as entradas menos usadas até caber em `max_bytes`; devolve quantas saíram."""
+        if not self.max_bytes or not self.root.exists():
+            return 0
+        entries = []
+        total = 0
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                meta_path = entry / META_FILE
+                try:
+                    last_used = meta_path.stat().st_mtime
+                    size = sum(f.stat().st_size for f in entry.iterdir())
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry))
+                total += size
+        removed = 0
+        for _last_used, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
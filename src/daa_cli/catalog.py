@@ -0,0 +1,293 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+import sqlite3
+import threading
+import time
+from .collection import CollectionIndex, glob_regex
+from .utils import base_for_image
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAME = "catalog.sqlite"
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER,
+    sha256 TEXT,
+    ocr_sha256 TEXT,
+    ocr_key TEXT,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_by_file ON images (inode, size, mtime_ns);
+CREATE TABLE IF NOT EXISTS outputs (
+    image TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (image, name)
+);
+"""
+
+# Sufixo depois do nome da base -> tipo do arquivo no catálogo.
+_TESS_OUTPUT = re.compile(r"\.tess\.psm(\d\d)\.[^.]+\Z")
+_ENGINE_OUTPUTS = (("paddle", ".paddle."), ("easy", ".easy."), ("deepseek", ".deepseek."))
+
+def output_kind(rest: str, gold_suffix: str = ".curator.txt", hypothesis_suffix: str = ".fuse.txt") -> Optional[str]:
+    """Classifica `rest` (nome do arquivo sem a base): `tess_psmNN`, engine, `curator`, `fuse` ou None."""
+    if rest == gold_suffix:
+        return "curator"
+    if rest == hypothesis_suffix:
+        return "fuse"
+    m = _TESS_OUTPUT.match(rest)
+    if m:
+        return f"tess_psm{m.group(1)}"
+    for kind, prefix in _ENGINE_OUTPUTS:
+        if rest.startswith(prefix) and "." not in rest[len(prefix):]:
+            return kind
+    return None
+
+def _ocr_outputs(outputs: Dict[str, Tuple[str, int, int]]) -> Dict[str, Tuple[str, int, int]]:
+    # Só as saídas de engine contam para a assinatura de OCR (curadoria e fusão, não).
+    return {name: state for name, state in outputs.items() if state[0] not in ("curator", "fuse")}
+
+@dataclass
+class CatalogDiff:
+    """O que mudou na coleção desde a última sincronização do catálogo."""
+    new: List[Path] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    unchanged: List[Path] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    outputs_changed: List[Path] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "new": len(self.new), "changed": len(self.changed), "unchanged": len(self.unchanged),
+            "removed": len(self.removed), "outputs_changed": len(self.outputs_changed),
+        }
+
+class Catalog:
+    """Catálogo SQLite da coleção em `manifests/catalog.sqlite`.
+
+    Guarda, por imagem (caminho relativo à raiz), tamanho, mtime, SHA-256 e
+    a assinatura do último OCR completo, e o tamanho/mtime de cada saída de
+    engine, `.curator.txt` e `.fuse.txt` ao lado dela. `sync` compara a
+    coleção atual com o que foi visto na execução anterior; o SHA-256 só é
+    descartado (e recalculado por quem precisar) quando inode, tamanho ou
+    mtime mudam. Uma imagem renomeada ou movida dentro da coleção (mesmo
+    inode, tamanho e mtime) herda o SHA-256 já calculado.
+    """
+
+    def __init__(self, root: Path, path: Optional[Path] = None):
+        self.root = Path(root)
+        self.path = Path(path) if path is not None else self.root / "manifests" / CATALOG_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # O `ocr --pipeline` grava pelo estágio de escrita (outra thread).
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 1:
+                # v1 não tinha inode; o primeiro `sync` o preenche sem descartar os SHA-256.
+                self._conn.execute("ALTER TABLE images ADD COLUMN inode INTEGER")
+            elif version not in (0, SCHEMA_VERSION):
+                self._conn.executescript("DROP TABLE IF EXISTS images; DROP TABLE IF EXISTS outputs;")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def key(self, img: Path) -> str:
+        try:
+            return Path(img).relative_to(self.root).as_posix()
+        except ValueError:
+            return str(img)
+
+    def sync(
+        self,
+        images: Iterable[Path],
+        index: CollectionIndex,
+        gold_suffix: str = ".curator.txt",
+        hypothesis_suffix: str = ".fuse.txt",
+        prune: bool = True,
+        glob: Optional[str] = None,
+    ) -> CatalogDiff:
+        """Atualiza o catálogo com `images` e seus arquivos irmãos e devolve o que mudou.
+
+        Com `prune`, imagens do catálogo que não estão em `images` são
+        removidas. Se `images` veio de uma varredura com `glob`, só as que
+        casam com ele são candidatas à remoção; as demais (com SHA-256 e
+        assinatura de OCR) ficam intactas. Use `prune=False` quando `images`
+        for uma lista avulsa.
+        """
+        diff = CatalogDiff()
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            known: Dict[str, Tuple[int, int, Optional[int]]] = {}
+            # (inode, tamanho, mtime) -> SHA-256, para reaproveitar o hash de arquivos movidos.
+            by_file: Dict[Tuple[int, int, int], str] = {}
+            for path, size, mtime_ns, inode, sha in conn.execute("SELECT path, size, mtime_ns, inode, sha256 FROM images"):
+                known[path] = (size, mtime_ns, inode)
+                if sha and inode is not None:
+                    by_file[(inode, size, mtime_ns)] = sha
+            known_outputs: Dict[str, Dict[str, Tuple[str, int, int]]] = {}
+            for image, name, kind, size, mtime_ns in conn.execute("SELECT image, name, kind, size, mtime_ns FROM outputs"):
+                known_outputs.setdefault(image, {})[name] = (kind, size, mtime_ns)
+
+            for img in images:
+                key = self.key(img)
+                try:
+                    st = img.stat()
+                except OSError:
+                    continue
+                prev = known.pop(key, None)
+                sig = (st.st_size, st.st_mtime_ns, st.st_ino)
+                if prev is None:
+                    diff.new.append(img)
+                    conn.execute(
+                        "INSERT INTO images (path, size, mtime_ns, inode, sha256, seen_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, *sig, by_file.get((st.st_ino, st.st_size, st.st_mtime_ns)), now),
+                    )
+                elif prev[:2] != sig[:2] or prev[2] not in (None, st.st_ino):
+                    diff.changed.append(img)
+                    conn.execute(
+                        "UPDATE images SET size=?, mtime_ns=?, inode=?, sha256=NULL, seen_at=? WHERE path=?",
+                        (*sig, now, key),
+                    )
+                else:
+                    diff.unchanged.append(img)
+                    conn.execute("UPDATE images SET inode=?, seen_at=? WHERE path=?", (st.st_ino, now, key))
+
+                base = base_for_image(img)
+                outputs: Dict[str, Tuple[str, int, int]] = {}
+                for path in index.siblings(base):
+                    kind = output_kind(path.name[len(base.name):], gold_suffix, hypothesis_suffix)
+                    if kind is None:
+                        continue
+                    try:
+                        out_st = path.stat()
+                    except OSError:
+                        continue
+                    outputs[path.name] = (kind, out_st.st_size, out_st.st_mtime_ns)
+                prev_outputs = known_outputs.pop(key, {})
+                if outputs != prev_outputs:
+                    if prev is not None:
+                        diff.outputs_changed.append(img)
+                    if _ocr_outputs(outputs) != _ocr_outputs(prev_outputs):
+                        # Saída de OCR apagada ou alterada: a imagem volta a ficar pendente.
+                        conn.execute("UPDATE images SET ocr_key=NULL WHERE path=?", (key,))
+                    conn.execute("DELETE FROM outputs WHERE image=?", (key,))
+                    conn.executemany(
+                        "INSERT INTO outputs (image, name, kind, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                        [(key, name, *state) for name, state in outputs.items()],
+                    )
+
+            if prune:
+                pattern = glob_regex(glob) if glob is not None else None
+                diff.removed = sorted(key for key in known if pattern is None or pattern.match(key))
+                conn.executemany("DELETE FROM images WHERE path=?", [(key,) for key in diff.removed])
+                conn.executemany("DELETE FROM outputs WHERE image=?", [(key,) for key in diff.removed])
+            conn.commit()
+        return diff
+
+    def digests(self, images: Iterable[Path]) -> Dict[str, str]:
+        """SHA-256 já conhecidos (arquivo sem mudança desde o cálculo), por `str(img)`."""
+        with self._lock:
+            known = dict(self._conn.execute("SELECT path, sha256 FROM images WHERE sha256 IS NOT NULL"))
+        out = {}
+        for img in images:
+            sha = known.get(self.key(img))
+            if sha:
+                out[str(img)] = sha
+        return out
+
+    def record_digest(self, img: Path, sha: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE images SET sha256=? WHERE path=?", (sha, self.key(img)))
+            self._maybe_commit()
+
+    def record_ocr(self, img: Path, sha: str, ocr_key: str, outputs: Iterable[Path] = ()) -> None:
+        """Marca o OCR de `img` (com o SHA-256 e a assinatura de parâmetros `ocr_key`) como completo.
+
+        O estado de `outputs` (as saídas recém-gravadas) entra no catálogo,
+        para que o próximo `sync` perceba se alguma for apagada ou alterada.
+        """
+        key = self.key(img)
+        base = base_for_image(Path(img))
+        rows = []
+        for path in outputs:
+            kind = output_kind(path.name[len(base.name):]) if path.name.startswith(base.name) else None
+            if kind is None:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            rows.append((key, path.name, kind, st.st_size, st.st_mtime_ns))
+        with self._lock:
+            self._conn.execute(
+                "UPDATE images SET sha256=?, ocr_sha256=?, ocr_key=? WHERE path=?", (sha, sha, ocr_key, key),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outputs (image, name, kind, size, mtime_ns) VALUES (?, ?, ?, ?, ?)", rows,
+            )
+            self._maybe_commit()
+
+    def pending_ocr(self, images: Iterable[Path], ocr_key: str) -> List[Path]:
+        """Imagens novas, alteradas ou sem OCR completo com os parâmetros `ocr_key`.
+
+        Uma saída de OCR apagada ou modificada desde `record_ocr` (vista no
+        `sync`) também deixa a imagem pendente.
+        """
+        with self._lock:
+            done = {
+                row[0] for row in self._conn.execute(
+                    "SELECT path FROM images WHERE sha256 IS NOT NULL AND ocr_sha256 = sha256 AND ocr_key = ?",
+                    (ocr_key,),
+                )
+            }
+        return [img for img in images if self.key(img) not in done]
+
+    def outputs(self, img: Path) -> Dict[str, str]:
+        """Arquivos registrados ao lado de `img`: nome -> tipo."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, kind FROM outputs WHERE image=?", (self.key(img),)).fetchall()
+        return dict(rows)
+
+    def _maybe_commit(self) -> None:
+        self._pending += 1
+        if self._pending >= 100:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def open_catalog(root: Path) -> Optional[Catalog]:
+    """Abre o catálogo de `root`; None (com aviso) se não for possível, p.ex. coleção só de leitura."""
+    try:
+        return Catalog(root)
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning("Catálogo da coleção indisponível em %s: %s", root, exc)
+        return None
@@ -0,0 +1,187 @@
+from __future__ import annotations
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import re
+from .utils import IMAGE_EXTS
+
+TESS_PREFIX = ".tess.psm"
+
+def glob_regex(glob: str) -> "re.Pattern[str]":
+    # Mesmo subconjunto de `Path.glob` usado na CLI: `**/` casa zero ou mais
+    # diretórios, `*`/`?` não atravessam `/`, `[...]` é classe de caracteres.
+    out = []
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif glob[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif glob[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif glob[i] == "[":
+            end = glob.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(glob[i]))
+                i += 1
+            else:
+                body = glob[i + 1:end]
+                out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = end + 1
+        else:
+            out.append(re.escape(glob[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+def _max_depth(glob: str) -> Optional[int]:
+    return None if "**" in glob else glob.count("/")
+
+def _recursive_depth(glob: str) -> Optional[int]:
+    # Posição (em diretórios) do primeiro `**` do glob; None se não houver.
+    for depth, part in enumerate(glob.split("/")):
+        if "**" in part:
+            return depth
+    return None
+
+class CollectionIndex:
+    """Índice em memória dos arquivos da coleção, com um `os.scandir` por diretório.
+
+    Guarda, por diretório, os nomes de arquivo ordenados: imagens, candidatos
+    (`.tess.psmNN.*`, `.paddle.*`, `.easy.*`, `.deepseek.*`), `.curator.txt`
+    e `.fuse.txt` de uma mesma base ficam lado a lado e são encontrados por
+    prefixo, sem `glob`/`exists()` por arquivo. Diretórios fora da varredura
+    inicial são lidos sob demanda, uma vez.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._dirs: Dict[Path, List[str]] = {}
+        self._order: List[Path] = []
+
+    def _scan_dir(self, directory: Path) -> Tuple[List[str], List[Tuple[str, bool]]]:
+        files: List[str] = []
+        subdirs: List[Tuple[str, bool]] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            files.append(entry.name)
+                        elif entry.is_dir():
+                            subdirs.append((entry.name, entry.is_symlink()))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        self._dirs[directory] = sorted(files)
+        self._order.append(directory)
+        return files, subdirs
+
+    def scan(self, glob: str = "**/*") -> "CollectionIndex":
+        """Varre a árvore até a profundidade que `glob` pode alcançar."""
+        max_depth = _max_depth(glob)
+        # Como `Path.glob`: links simbólicos para diretórios são seguidos pelos
+        # trechos antes do primeiro `**`, mas o `**` não desce por eles. Assim
+        # não há ciclos, e cada caminho fica com o nome que o glob daria.
+        follow_depth = _recursive_depth(glob)
+        stack: List[Tuple[Path, int]] = [(self.root, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            if directory in self._dirs:
+                continue
+            _files, subdirs = self._scan_dir(directory)
+            if max_depth is None or depth < max_depth:
+                stack.extend(
+                    (directory / name, depth + 1)
+                    for name, is_link in reversed(subdirs)
+                    if not is_link or follow_depth is None or depth < follow_depth
+                )
+        return self
+
+    def _names(self, directory: Path) -> List[str]:
+        names = self._dirs.get(directory)
+        if names is None:
+            self._scan_dir(directory)
+            names = self._dirs[directory]
+        return names
+
+    def images(self, glob: str) -> List[Path]:
+        """Imagens que casam com `glob` (relativo à raiz), como `discover_images`."""
+        if not self._dirs:
+            self.scan(glob)
+        pattern = glob_regex(glob)
+        out: List[Path] = []
+        for directory in self._order:
+            try:
+                rel_dir = directory.relative_to(self.root).as_posix()
+            except ValueError:
+                continue
+            prefix = "" if rel_dir == "." else rel_dir + "/"
+            for name in self._dirs[directory]:
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS and pattern.match(prefix + name):
+                    out.append(directory / name)
+        return out
+
+    def exists(self, path: Path) -> bool:
+        names = self._names(path.parent)
+        i = bisect_left(names, path.name)
+        return i < len(names) and names[i] == path.name
+
+    def with_prefix(self, directory: Path, prefix: str) -> Iterator[str]:
+        names = self._names(directory)
+        i = bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            yield names[i]
+            i += 1
+
+    def siblings(self, base: Path) -> List[Path]:
+        """Todos os arquivos `<base>.*` do diretório da base."""
+        return [base.parent / name for name in self.with_prefix(base.parent, base.name + ".")]
+
+    def restrict(self, base: Path) -> "CollectionIndex":
+        """Índice mínimo só com os irmãos de `base` (barato de enviar a um worker)."""
+        sub = CollectionIndex(self.root)
+        # `base.with_suffix(...)` corta no último ponto: `a.b` procura `a.curator.txt`.
+        names = set(self.with_prefix(base.parent, base.name)) | set(self.with_prefix(base.parent, base.stem))
+        sub._dirs[base.parent] = sorted(names)
+        sub._order.append(base.parent)
+        return sub
+
+    def read_text(self, path: Path) -> Optional[str]:
+        """Como `read_text_if_exists`, mas a existência vem do índice."""
+        if not self.exists(path):
+            return None
+        try:
+            return path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return None
+
+def list_candidates_for_base(base: Path, index: Optional[CollectionIndex] = None) -> Dict[str, Path]:
+    """Candidatos OCR ao lado de `base`: `tess_psmNN`, `paddle` e `easy`."""
+    out = {}
+    if index is None:
+        for cand in base.parent.glob(base.name + ".tess.psm??.txt"):
+            psm = cand.stem.split("psm")[-1]
+            out[f"tess_psm{psm}"] = cand
+        p = base.with_suffix(".paddle.txt")
+        if p.exists(): out["paddle"] = p
+        e = base.with_suffix(".easy.txt")
+        if e.exists(): out["easy"] = e
+        return out
+
+    prefix = base.name + TESS_PREFIX
+    for name in index.with_prefix(base.parent, prefix):
+        if len(name) == len(prefix) + 6 and name.endswith(".txt"):
+            out[f"tess_psm{name[len(prefix):len(prefix) + 2]}"] = base.parent / name
+    for key, suffix in (("paddle", ".paddle.txt"), ("easy", ".easy.txt")):
+        path = base.with_suffix(suffix)
+        if index.exists(path):
+            out[key] = path
+    return out
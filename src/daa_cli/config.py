@@ -21,6 +21,29 @@ class OCRConfig(BaseModel):
     deepseek_model_path: Optional[str] = None
     deepseek_weights_path: Optional[str] = None
     deepseek_cache_dir: Optional[str] = None
+    workers: int = 1
+    tesseract_jobs: int = 1
+    cache_dir: Optional[str] = None
+    cache_max_gb: float = 20.0
+    resume: bool = False
+    batch_size: int = 1
+    pipeline: bool = False
+    queue_size: int = 4
+    overlap_engines: bool = True
+    catalog: bool = True
+    changed_only: bool = False
+
+class WatchConfig(OCRConfig):
+    interval: float = 2.0
+    settle: float = 2.0
+    backend: str = "auto"
+    catch_up: bool = True
+
+class ServeConfig(OCRConfig):
+    host: str = "127.0.0.1"
+    port: int = 8765
+    max_batch: int = 8
+    max_wait_ms: float = 10.0
 
 class ExportConfig(BaseModel):
     input_dir: str
@@ -31,9 +54,19 @@ class ExportConfig(BaseModel):
     fail_if_no_gold: bool = True
     write_hypothesis: bool = True
     hypothesis_suffix: str = ".fuse.txt"
+    align_engine: str = "auto"
+    fuse_segment: str = "line"
+    workers: int = 1
+    shard_size: int = 0
+    compression: str = "none"
+    format: str = "jsonl"
+    catalog: bool = True
 
 class EvalConfig(BaseModel):
     input_dir: str
     glob: str = "**/*.jpg"
     gold_suffix: str = ".curator.txt"
     out_dir: str
+    workers: int = 1
+    cache: bool = True
+    catalog: bool = True
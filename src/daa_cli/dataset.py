@@ -0,0 +1,268 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, TextIO
+import gzip
+import io
+import json
+import os
+from .utils import AtomicJsonlWriter, ensure_parent
+
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+PARQUET_CODECS = {"none": None, "snappy": "snappy", "gzip": "gzip", "zstd": "zstd"}
+INDEX_SUFFIX = ".index.json"
+
+_ZSTD_MISSING = "Compressão zstd requer o pacote zstandard (pip install .[export-zstd])."
+
+def _load_zstandard():
+    try:
+        import zstandard
+    except Exception:
+        return None
+    return zstandard
+
+def index_path_for(out_path: Path) -> Path:
+    return out_path.with_name(out_path.stem + INDEX_SUFFIX)
+
+def shard_path_for(out_path: Path, idx: int, compression: str, fmt: str = "jsonl") -> Path:
+    if fmt == "parquet":
+        return out_path.with_name(f"{out_path.stem}-{idx:05d}.parquet")
+    return out_path.with_name(f"{out_path.stem}-{idx:05d}{out_path.suffix}{COMPRESSION_SUFFIXES[compression]}")
+
+def open_shard(path: Path, compression: str, mode: str = "r") -> TextIO:
+    """Abre um shard (texto UTF-8) para leitura (`"r"`) ou escrita (`"w"`)."""
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if compression == "zstd":
+        zstandard = _load_zstandard()
+        if zstandard is None:
+            raise RuntimeError(_ZSTD_MISSING)
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class ShardedJsonlWriter:
+    """Grava o dataset em shards JSONL de até `shard_size` exemplos, com índice.
+
+    Com `out = data/abbadia_train.jsonl`, os shards saem como
+    `data/abbadia_train-00000.jsonl[.gz|.zst]` e o índice como
+    `data/abbadia_train.index.json`, com exemplos, primeiro exemplo global e
+    bytes de cada shard. Como em `AtomicJsonlWriter`, tudo é escrito em
+    `.tmp` e só renomeado no `commit` (o índice por último); shards de uma
+    exportação anterior que sobrarem são removidos.
+    """
+
+    format = "jsonl"
+    compressions: Dict[str, Any] = COMPRESSION_SUFFIXES
+
+    def __init__(self, out_path: Path, shard_size: int = 0, compression: str = "none"):
+        if compression not in self.compressions:
+            raise ValueError(
+                "Compressão '{c}' inválida. Use {opts}.".format(c=compression, opts=", ".join(self.compressions))
+            )
+        if compression == "zstd" and self.format == "jsonl" and _load_zstandard() is None:
+            raise RuntimeError(_ZSTD_MISSING)
+        self.out_path = Path(out_path)
+        self.index_path = index_path_for(self.out_path)
+        self.shard_size = max(0, int(shard_size or 0))
+        self.compression = compression
+        self.rows = 0
+        self.shards: List[Dict[str, Any]] = []
+        self._fh: Any = None
+        self._tmp_paths: List[Path] = []
+        ensure_parent(self.out_path)
+
+    def _tmp(self, path: Path) -> Path:
+        return path.with_name(path.name + ".tmp")
+
+    # Ganchos por formato: abrir, gravar uma linha e fechar o shard corrente.
+    def _open_file(self, tmp_path: Path) -> None:
+        self._fh = open_shard(tmp_path, self.compression, "w")
+
+    def _write_row(self, row: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def _close_file(self) -> None:
+        self._fh.close()
+        self._fh = None
+
+    def _close_shard(self) -> None:
+        if self._fh is None:
+            return
+        self._close_file()
+        shard = self.shards[-1]
+        shard["bytes"] = self._tmp(self.out_path.parent / shard["file"]).stat().st_size
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._fh is None or (self.shard_size and self.shards[-1]["examples"] >= self.shard_size):
+            self._close_shard()
+            path = shard_path_for(self.out_path, len(self.shards), self.compression, self.format)
+            self._tmp_paths.append(self._tmp(path))
+            self._open_file(self._tmp(path))
+            self.shards.append({"file": path.name, "first_example": self.rows, "examples": 0, "bytes": 0})
+        self._write_row(row)
+        self.shards[-1]["examples"] += 1
+        self.rows += 1
+
+    def _previous_shards(self) -> List[str]:
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            return [shard["file"] for shard in index.get("shards", [])]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def commit(self) -> None:
+        self._close_shard()
+        previous = self._previous_shards()
+        for tmp in self._tmp_paths:
+            os.replace(tmp, tmp.with_name(tmp.name[: -len(".tmp")]))
+        index = {
+            "format": self.format,
+            "compression": self.compression,
+            "shard_size": self.shard_size,
+            "examples": self.rows,
+            "shards": self.shards,
+        }
+        tmp_index = self._tmp(self.index_path)
+        tmp_index.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_index, self.index_path)
+        current = {shard["file"] for shard in self.shards}
+        for name in previous:
+            if name not in current:
+                (self.out_path.parent / name).unlink(missing_ok=True)
+        self._tmp_paths = []
+
+    def abort(self) -> None:
+        if self._fh is not None:
+            self._close_file()
+        for tmp in self._tmp_paths:
+            tmp.unlink(missing_ok=True)
+        self._tmp_paths = []
+
+    def __enter__(self) -> "ShardedJsonlWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except Exception:
+        return None
+    return pyarrow
+
+_PYARROW_MISSING = "Formato parquet requer o pacote pyarrow (pip install .[export-parquet])."
+
+def parquet_schema(pa: Any) -> Any:
+    """Schema estável do dataset em Parquet (uma linha por documento)."""
+    return pa.schema([
+        ("doc_id", pa.string()),
+        ("input_text", pa.string()),
+        ("target_text", pa.string()),
+        ("candidates", pa.map_(pa.string(), pa.string())),
+        ("source_image", pa.string()),
+        ("multi_hyp_mode", pa.string()),
+        ("selected_candidates", pa.list_(pa.string())),
+        ("candidates_keys", pa.list_(pa.string())),
+        ("cer", pa.float64()),
+        ("wer", pa.float64()),
+        ("num_candidates", pa.int32()),
+        ("curator_len", pa.int64()),
+        ("input_len", pa.int64()),
+    ])
+
+def columnar_row(row_export: Dict[str, Any], row_manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Achata (linha do dataset, linha do manifest) nas colunas de `parquet_schema`."""
+    meta = row_export.get("meta") or {}
+    return {
+        "doc_id": row_export["doc_id"],
+        "input_text": row_export["input_text"],
+        "target_text": row_export["target_text"],
+        "candidates": sorted(row_export["candidates"].items()),
+        "source_image": meta.get("source_image"),
+        "multi_hyp_mode": meta.get("multi_hyp_mode"),
+        "selected_candidates": list(meta.get("selected_candidates") or []),
+        "candidates_keys": list(meta.get("candidates_keys") or []),
+        "cer": row_manifest["cer"],
+        "wer": row_manifest["wer"],
+        "num_candidates": row_manifest["num_candidates"],
+        "curator_len": row_manifest["curator_len"],
+        "input_len": row_manifest["input_len"],
+    }
+
+class ParquetDatasetWriter(ShardedJsonlWriter):
+    """Dataset em Parquet: mesmos shards, índice e commit atômico do `ShardedJsonlWriter`.
+
+    As linhas (já em `columnar_row`) são acumuladas em row groups de
+    `row_group_size` documentos. `compression` escolhe o codec do Parquet
+    (`PARQUET_CODECS`); "none" grava as colunas sem compressão.
+    """
+
+    format = "parquet"
+    compressions = PARQUET_CODECS
+
+    def __init__(self, out_path: Path, shard_size: int = 0, compression: str = "none", row_group_size: int = 256):
+        self._pa = _load_pyarrow()
+        if self._pa is None:
+            raise RuntimeError(_PYARROW_MISSING)
+        super().__init__(out_path, shard_size, compression)
+        self.schema = parquet_schema(self._pa)
+        self.row_group_size = max(1, int(row_group_size))
+        self._batch: List[Dict[str, Any]] = []
+
+    def _open_file(self, tmp_path: Path) -> None:
+        codec = PARQUET_CODECS[self.compression]
+        self._fh = self._pa.parquet.ParquetWriter(str(tmp_path), self.schema, compression=codec)
+
+    def _flush_batch(self) -> None:
+        if self._batch:
+            self._fh.write_table(self._pa.Table.from_pylist(self._batch, schema=self.schema))
+            self._batch = []
+
+    def _write_row(self, row: Dict[str, Any]) -> None:
+        self._batch.append(row)
+        if len(self._batch) >= self.row_group_size:
+            self._flush_batch()
+
+    def _close_file(self) -> None:
+        self._flush_batch()
+        self._fh.close()
+        self._fh = None
+
+def open_dataset_writer(out_path: Path, shard_size: int = 0, compression: str = "none", fmt: str = "jsonl"):
+    """Writer do dataset: JSONL único (padrão), shards JSONL com índice, ou Parquet."""
+    if fmt == "parquet":
+        return ParquetDatasetWriter(out_path, shard_size, compression)
+    if fmt != "jsonl":
+        raise ValueError("Formato '{fmt}' inválido. Use jsonl ou parquet.".format(fmt=fmt))
+    if not shard_size and compression == "none":
+        return AtomicJsonlWriter(out_path)
+    return ShardedJsonlWriter(out_path, shard_size, compression)
+
+def iter_dataset(path: Path):
+    """Lê os exemplos de um JSONL único ou de um índice `.index.json`, na ordem."""
+    path = Path(path)
+    if path.name.endswith(INDEX_SUFFIX):
+        index = json.loads(path.read_text(encoding="utf-8"))
+        if index.get("format") == "parquet":
+            pa = _load_pyarrow()
+            if pa is None:
+                raise RuntimeError(_PYARROW_MISSING)
+            for shard in index["shards"]:
+                yield from pa.parquet.read_table(path.parent / shard["file"]).to_pylist()
+            return
+        for shard in index["shards"]:
+            with open_shard(path.parent / shard["file"], index["compression"]) as fh:
+                for line in fh:
+                    yield json.loads(line)
+        return
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
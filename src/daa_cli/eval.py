@@ -1,66 +1,137 @@
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List
-from jiwer import wer, cer
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
 from .config import EvalConfig
-from .utils import discover_images, base_for_image, read_text_if_exists, append_csv, ensure_parent
+from .metrics import EditScores, MetricCache, MetricMemo, text_digest
+from .catalog import open_catalog
+from .collection import CollectionIndex, list_candidates_for_base
+from .utils import base_for_image, ensure_parent, ManifestWriter
 
-PER_PAGE_FIELDS = ["doc_id","candidate_key","cer","wer"]
+PER_PAGE_FIELDS = [
+    "doc_id","candidate_key","cer","wer",
+    "char_sub","char_ins","char_del","word_sub","word_ins","word_del","ref_chars","ref_words",
+]
 SUMMARY_FIELDS = ["engine","psm","count","cer_mean","wer_mean"]
+CACHE_NAME = "eval_cache.jsonl"
+
+# (doc_id, gold, [(candidate_key, texto)])
+Page = Tuple[str, str, List[Tuple[str, str]]]
 
 def parse_key(key: str):
     if key.startswith("tess_psm"):
         return "tesseract", key.split("tess_psm")[-1]
     return key, ""
 
-def list_candidates_for_base(base: Path) -> Dict[str, Path]:
-    out = {}
-    for cand in base.parent.glob(base.name + ".tess.psm??.txt"):
-        psm = cand.stem.split("psm")[-1]
-        out[f"tess_psm{psm}"] = cand
-    p = base.with_suffix(".paddle.txt")
-    if p.exists(): out["paddle"] = p
-    e = base.with_suffix(".easy.txt")
-    if e.exists(): out["easy"] = e
-    return out
+def _read_pages(files: List[Path], gold_suffix: str, index: CollectionIndex) -> Iterator[Page]:
+    for img in files:
+        base = base_for_image(img)
+        curator_text = index.read_text(base.with_suffix(gold_suffix))
+        if not curator_text:
+            continue
+        cands = list_candidates_for_base(base, index)
+        yield base.name, curator_text, [(key, index.read_text(path) or "") for key, path in cands.items()]
+
+def _score_texts(job: Tuple[str, List[str]]) -> List[EditScores]:
+    # Executado nos workers: um memo por página evita repetir textos idênticos.
+    gold, texts = job
+    memo = MetricMemo(gold)
+    return [memo.details(text) for text in texts]
 
 def eval_collection(cfg: EvalConfig) -> Dict[str, Any]:
     input_dir = Path(cfg.input_dir).resolve()
-    files = discover_images(input_dir, cfg.glob)
+    index = CollectionIndex(input_dir).scan(cfg.glob)
+    files = index.images(cfg.glob)
+    changes = None
+    catalog = open_catalog(input_dir) if cfg.catalog else None
+    if catalog is not None:
+        with catalog:
+            changes = catalog.sync(files, index, cfg.gold_suffix, glob=cfg.glob).summary()
     out_dir = Path(cfg.out_dir)
     ensure_parent(out_dir / "dummy")
 
     per_page = out_dir / "eval_by_page.csv"
     summary = out_dir / "eval_summary_by_engine_psm.csv"
+    # Os relatórios descrevem só esta execução (o cache de métricas é que
+    # persiste entre execuções no mesmo `out_dir`); relatórios antigos, talvez
+    # com outras colunas, não recebem linhas novas.
+    for report in (per_page, summary):
+        report.unlink(missing_ok=True)
 
-    rows_page: List[Dict[str, Any]] = []
+    pages_eval = 0
+    computed = 0
     agg: Dict[tuple, List[tuple]] = {}
+    cache = MetricCache(out_dir / CACHE_NAME) if cfg.cache else None
+    workers = max(1, int(cfg.workers or 1))
+    # Criado só quando alguma página tem pares fora do cache.
+    pool: Optional[ProcessPoolExecutor] = None
+    # Páginas em voo: (doc_id, candidatos, digests, métricas do cache, resultado/Future dos pendentes).
+    in_flight: deque = deque()
 
-    for img in files:
-        base = base_for_image(img)
-        curator = base.with_suffix(cfg.gold_suffix)
-        curator_text = read_text_if_exists(curator)
-        if not curator_text:
-            continue
-        cands = list_candidates_for_base(base)
-        for key, path in cands.items():
-            cand_text = read_text_if_exists(path) or ""
-            _wer = float(wer(curator_text, cand_text)) if cand_text else 1.0
-            _cer = float(cer(curator_text, cand_text)) if cand_text else 1.0
-            rows_page.append({"doc_id": base.name, "candidate_key": key, "cer": _cer, "wer": _wer})
+    def _finish(page_writer: ManifestWriter) -> None:
+        nonlocal pages_eval, computed
+        doc_id, cands, digests, known, result = in_flight.popleft()
+        fresh = iter(result.result() if isinstance(result, Future) else result)
+        for (key, _text), (gold_d, cand_d), scores in zip(cands, digests, known):
+            if scores is None:
+                scores = next(fresh)
+                computed += 1
+                if cache is not None:
+                    cache.put(gold_d, cand_d, scores)
+            page_writer.write({
+                "doc_id": doc_id, "candidate_key": key, "cer": scores.cer, "wer": scores.wer,
+                "char_sub": scores.char_substitutions, "char_ins": scores.char_insertions,
+                "char_del": scores.char_deletions, "word_sub": scores.word_substitutions,
+                "word_ins": scores.word_insertions, "word_del": scores.word_deletions,
+                "ref_chars": scores.ref_chars, "ref_words": scores.ref_words,
+            })
+            pages_eval += 1
             eng, psm = parse_key(key)
-            agg.setdefault((eng, psm), []).append((_cer, _wer))
+            agg.setdefault((eng, psm), []).append((scores.cer, scores.wer))
 
-    for r in rows_page:
-        append_csv(per_page, PER_PAGE_FIELDS, r)
+    try:
+        with ManifestWriter(per_page, PER_PAGE_FIELDS) as page_writer:
+            for doc_id, curator_text, cands in _read_pages(files, cfg.gold_suffix, index):
+                gold_d = text_digest(curator_text).hex()
+                digests = [(gold_d, text_digest(text).hex()) for _key, text in cands]
+                known: List[Optional[EditScores]] = [cache.get(*d) if cache is not None else None for d in digests]
+                todo = [text for (_key, text), scores in zip(cands, known) if scores is None]
+                if not todo:
+                    result: Any = []
+                elif workers > 1:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                    result = pool.submit(_score_texts, (curator_text, todo))
+                else:
+                    result = _score_texts((curator_text, todo))
+                in_flight.append((doc_id, cands, digests, known, result))
+                # Janela limitada: no máximo algumas páginas por worker aguardando escrita.
+                while len(in_flight) > workers * 4:
+                    _finish(page_writer)
+            while in_flight:
+                _finish(page_writer)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if cache is not None:
+            cache.close()
 
-    for (eng, psm), vals in agg.items():
-        cer_mean = sum(v[0] for v in vals) / len(vals)
-        wer_mean = sum(v[1] for v in vals) / len(vals)
-        append_csv(summary, SUMMARY_FIELDS, {
-            "engine": eng, "psm": psm, "count": len(vals),
-            "cer_mean": round(cer_mean,4), "wer_mean": round(wer_mean,4)
-        })
+    with ManifestWriter(summary, SUMMARY_FIELDS) as writer:
+        for (eng, psm), vals in agg.items():
+            cer_mean = sum(v[0] for v in vals) / len(vals)
+            wer_mean = sum(v[1] for v in vals) / len(vals)
+            writer.write({
+                "engine": eng, "psm": psm, "count": len(vals),
+                "cer_mean": round(cer_mean,4), "wer_mean": round(wer_mean,4)
+            })
 
-    return {"pages_eval": len(rows_page), "groups": len(agg), "out_dir": str(out_dir)}
+    result = {
+        "pages_eval": pages_eval, "groups": len(agg), "out_dir": str(out_dir),
+        "computed": computed, "cached": pages_eval - computed,
+    }
+    if changes is not None:
+        result["changes"] = changes
+    return result
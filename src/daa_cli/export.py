@@ -1,29 +1,26 @@
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass
-import difflib
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import json
 import logging
+import multiprocessing
 import re
 import unicodedata
-from jiwer import wer, cer
+import numpy as np
+from .align import align_lines, align_opcodes, resolve_engine
 from .config import ExportConfig
-from .utils import discover_images, base_for_image, read_text_if_exists, write_jsonl, append_csv, ensure_parent
+from .metrics import MetricMemo
+from .dataset import ShardedJsonlWriter, columnar_row, open_dataset_writer
+from .pipeline import bounded_map
+from .catalog import open_catalog
+from .collection import CollectionIndex, list_candidates_for_base
+from .utils import base_for_image, read_text_if_exists, ensure_parent, ManifestWriter
 
 logger = logging.getLogger(__name__)
 
-def list_candidates_for_base(base: Path) -> Dict[str, Path]:
-    out = {}
-    for cand in base.parent.glob(base.name + ".tess.psm??.txt"):
-        psm = cand.stem.split("psm")[-1]
-        out[f"tess_psm{psm}"] = cand
-    p = base.with_suffix(".paddle.txt")
-    if p.exists(): out["paddle"] = p
-    e = base.with_suffix(".easy.txt")
-    if e.exists(): out["easy"] = e
-    return out
-
 EXPORT_FIELDS = [
     "doc_id","source_image","num_candidates","has_curator","cer","wer","curator_len","input_len",
     "candidates_present","multi_hyp_mode","selected_candidates"
@@ -36,6 +33,14 @@ class Example:
     candidates: Dict[str, str]
     tagged_candidates: Dict[str, str]
     meta: Dict[str, Any]
+    fusion_candidates: Optional[Dict[str, str]] = None
+    metrics: Optional[MetricMemo] = field(default=None, repr=False)
+
+    def score(self, text: str) -> Tuple[float, float]:
+        """(cer, wer) de `text` contra o gold, via memo do documento."""
+        if self.metrics is None:
+            self.metrics = MetricMemo(self.target_text)
+        return self.metrics.score(text)
 
     def _select_best_candidate_key(self) -> Optional[str]:
         if not self.candidates:
@@ -45,8 +50,7 @@ class Example:
         best_scores: Optional[Tuple[float, float, int]] = None
         for key in sorted(self.candidates.keys()):
             text = self.candidates[key]
-            cand_wer = float(wer(self.target_text, text)) if text else 1.0
-            cand_cer = float(cer(self.target_text, text)) if text else 1.0
+            cand_cer, cand_wer = self.score(text)
             score = (cand_cer, cand_wer, len(text or ""))
             if best_scores is None or score < best_scores:
                 best_scores = score
@@ -54,7 +58,7 @@ class Example:
 
         return best_key
 
-    def build_input(self, mode: str) -> Dict[str, Any]:
+    def build_input(self, mode: str, align_engine: str = "auto", segment: str = "line") -> Dict[str, Any]:
         mode_normalized = (mode or "").strip().lower()
         if mode_normalized == "concat":
             joined = "\n".join(
@@ -86,7 +90,10 @@ class Example:
                 }
 
             anchor = self._select_best_candidate_key()
-            fused = fuse_candidates(self.candidates, anchor_key=anchor)
+            fused = fuse_candidates(
+                self.fusion_candidates or self.candidates, anchor_key=anchor,
+                align_engine=align_engine, segment=segment,
+            )
             return {
                 "input_text": fused,
                 "selected_candidates": sorted(self.candidates.keys()),
@@ -98,6 +105,8 @@ class Example:
 
 
 GAP_TOKEN = "\uFFFF"
+EMPTY = -1
+FUSE_SEGMENTS = ("line", "page")
 
 
 def _normalize_for_alignment(text: str) -> str:
@@ -110,68 +119,53 @@ def _normalize_for_alignment(text: str) -> str:
     return normalized.strip()
 
 
-def _tokenize(text: str) -> List[str]:
-    return list(text)
-
-
-def _align_tokens(
-    anchor_tokens: List[str],
-    candidate_tokens: List[str],
-) -> List[Tuple[str, Optional[str], bool]]:
-    matcher = difflib.SequenceMatcher(None, anchor_tokens, candidate_tokens, autojunk=False)
-    alignment: List[Tuple[str, Optional[str], bool]] = []
-    for tag, a0, a1, b0, b1 in matcher.get_opcodes():
-        if tag == "equal":
-            for idx in range(a1 - a0):
-                alignment.append((anchor_tokens[a0 + idx], candidate_tokens[b0 + idx], True))
-        elif tag == "replace":
-            len_a = a1 - a0
-            len_b = b1 - b0
-            length = max(len_a, len_b)
-            for idx in range(length):
-                if idx < len_a:
-                    anchor_char = anchor_tokens[a0 + idx]
-                    consumes_anchor = True
-                else:
-                    anchor_char = GAP_TOKEN
-                    consumes_anchor = False
-                candidate_char = candidate_tokens[b0 + idx] if idx < len_b else None
-                alignment.append((anchor_char, candidate_char, consumes_anchor))
-        elif tag == "delete":
-            for idx in range(a1 - a0):
-                alignment.append((anchor_tokens[a0 + idx], None, True))
-        elif tag == "insert":
-            for idx in range(b1 - b0):
-                alignment.append((GAP_TOKEN, candidate_tokens[b0 + idx], False))
-    return alignment
-
-
-def _progressive_align(candidates: Dict[str, str], order: List[str]) -> Tuple[List[Dict[str, str]], str]:
-    pivot_key = order[0]
-    pivot_tokens = _tokenize(_normalize_for_alignment(candidates[pivot_key]))
-    columns: List[Dict[str, str]] = [{pivot_key: ch} for ch in pivot_tokens]
-    aligned_pivot = pivot_tokens[:]
+def _codes(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.int32)
+
+
+def _align_indices(anchor: str, candidate: str, align_engine: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Índices de âncora e candidato por coluna alinhada (-1 = lacuna), a partir dos opcodes."""
+    ops = align_opcodes(anchor, candidate, align_engine)
+    if not ops:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    bounds = np.array([op[1:] for op in ops], dtype=np.int64)
+    a0, a1, b0, b1 = bounds.T
+    len_a, len_b = a1 - a0, b1 - b0
+    lengths = np.maximum(len_a, len_b)
+    starts = np.cumsum(lengths) - lengths
+    offset = np.arange(int(lengths.sum())) - np.repeat(starts, lengths)
+    src = np.where(offset < np.repeat(len_a, lengths), np.repeat(a0, lengths) + offset, -1)
+    cand = np.where(offset < np.repeat(len_b, lengths), np.repeat(b0, lengths) + offset, -1)
+    return src, cand
 
-    for key in order[1:]:
-        candidate_tokens = _tokenize(_normalize_for_alignment(candidates[key]))
-        aligned = _align_tokens(aligned_pivot, candidate_tokens)
-        new_columns: List[Dict[str, str]] = []
-        pivot_index = 0
 
-        for anchor_char, candidate_char, consumes_anchor in aligned:
-            if consumes_anchor:
-                column = dict(columns[pivot_index])
-                pivot_index += 1
-            else:
-                column = {pivot_key: ""}
+def _progressive_align(
+    candidates: Dict[str, str], order: List[str], align_engine: str = "auto",
+) -> np.ndarray:
+    """Alinha os candidatos ao pivô (`order[0]`) e devolve a grade de colunas.
 
-            column[key] = candidate_char or ""
-            new_columns.append(column)
+    A grade tem uma linha por coluna alinhada e uma coluna por candidato, na
+    ordem de `order`, com o code point do caractere ou `EMPTY` (-1) onde o
+    candidato não contribui.
+    """
+    pivot_codes = _codes(_normalize_for_alignment(candidates[order[0]]))
+    grid = pivot_codes.reshape(-1, 1)
 
-        columns = new_columns
-        aligned_pivot = [col.get(pivot_key, "") or GAP_TOKEN for col in columns]
+    for key in order[1:]:
+        candidate_text = _normalize_for_alignment(candidates[key])
+        pivot_column = np.where(grid[:, 0] == EMPTY, ord(GAP_TOKEN), grid[:, 0])
+        anchor_text = pivot_column.astype("<u4").tobytes().decode("utf-32-le")
+        src, cand = _align_indices(anchor_text, candidate_text, align_engine)
+
+        new_grid = np.full((len(src), grid.shape[1] + 1), EMPTY, dtype=np.int32)
+        consumed = src >= 0
+        new_grid[consumed, :-1] = grid[src[consumed]]
+        has_char = cand >= 0
+        new_grid[has_char, -1] = _codes(candidate_text)[cand[has_char]]
+        grid = new_grid
 
-    return columns, pivot_key
+    return grid
 
 
 def _is_digit_like(ch: str) -> bool:
@@ -185,38 +179,55 @@ def _has_diacritic(ch: str) -> bool:
     return any(unicodedata.category(c) == "Mn" for c in decomposed)
 
 
-def _vote_column(column: Dict[str, str], engine_weights: Dict[str, float], pivot_key: str) -> str:
-    scores: Dict[str, float] = {}
-    counts: Dict[str, int] = {}
-    anchor_char = column.get(pivot_key, "")
+def _vote_columns(grid: np.ndarray, weights: np.ndarray) -> str:
+    """Votação ponderada de todas as colunas da grade de uma vez.
 
-    for key, char in column.items():
-        if not char:
-            continue
-        weight = engine_weights.get(key, 1.0)
-        if _is_digit_like(char):
-            weight += 0.25
-        if _has_diacritic(char):
-            weight += 0.15
-        scores[char] = scores.get(char, 0.0) + weight
-        counts[char] = counts.get(char, 0) + 1
-
-    if not scores:
-        return ""
+    `weights` traz o peso de cada candidato (um por coluna da grade) ou de
+    cada célula (mesma forma da grade).
 
-    best_score = max(scores.values())
-    best_chars = [char for char, score in scores.items() if score == best_score]
-    if len(best_chars) == 1:
-        chosen = best_chars[0]
-    elif anchor_char and anchor_char in best_chars:
-        chosen = anchor_char
-    else:
-        chosen = sorted(best_chars)[0]
-
-    if not anchor_char and chosen.isspace() and counts.get(chosen, 0) < 2:
+    Cada caractere soma o peso do engine que o leu (+0.25 se dígito, +0.15 se
+    tem diacrítico); empates ficam com o pivô (coluna 0) ou, sem ele, com o
+    menor code point. Espaço inserido contra o pivô só entra se vier de ao
+    menos dois engines.
+    """
+    n_cols, n_cands = grid.shape
+    if n_cols == 0:
         return ""
-
-    return chosen
+    present = grid != EMPTY
+    uniq, inv = np.unique(grid, return_inverse=True)
+    inv = inv.reshape(grid.shape)
+    chars = [chr(c) if c != EMPTY else "" for c in uniq.tolist()]
+    digit = np.array([_is_digit_like(ch) for ch in chars])[inv]
+    diacritic = np.array([_has_diacritic(ch) for ch in chars])[inv]
+    space_u = np.array([ch.isspace() for ch in chars])
+
+    char_weight = np.broadcast_to(weights, grid.shape).astype(np.float64)
+    char_weight = np.where(digit, char_weight + 0.25, char_weight)
+    char_weight = np.where(diacritic, char_weight + 0.15, char_weight)
+
+    # Soma na mesma ordem dos candidatos para reproduzir os empates em float.
+    scores = np.zeros(grid.shape, dtype=np.float64)
+    counts = np.zeros(grid.shape, dtype=np.int64)
+    for j in range(n_cands):
+        same = (grid == grid[:, j:j + 1]) & present[:, j:j + 1]
+        scores += np.where(same, char_weight[:, j:j + 1], 0.0)
+        counts += same
+    scores = np.where(present, scores, -np.inf)
+
+    best = scores.max(axis=1)
+    is_best = present & (scores == best[:, None])
+    anchor = grid[:, 0]
+    lowest = np.where(is_best, grid, np.iinfo(np.int32).max).min(axis=1)
+    chosen = np.where(is_best[:, 0], anchor, lowest)
+    chosen = np.where(present.any(axis=1), chosen, EMPTY)
+
+    chosen_count = np.where(grid == chosen[:, None], counts, 0).max(axis=1)
+    chosen_space = space_u[np.searchsorted(uniq, chosen)]
+    drop = (anchor == EMPTY) & chosen_space & (chosen_count < 2)
+    chosen = np.where(drop, EMPTY, chosen)
+
+    kept = chosen[chosen != EMPTY]
+    return kept.astype("<u4").tobytes().decode("utf-32-le")
 
 
 def _default_engine_weights(keys: List[str]) -> Dict[str, float]:
@@ -237,7 +248,161 @@ def _finalize_fused_text(text: str) -> str:
     return unicodedata.normalize("NFC", cleaned.strip())
 
 
-def fuse_candidates(candidates: Dict[str, str], anchor_key: Optional[str] = None) -> str:
+def _lines_from_boxes(json_path: Path) -> Optional[str]:
+    """Reagrupa as caixas de `.paddle.json`/`.easy.json` em linhas visuais.
+
+    PaddleOCR e EasyOCR gravam uma caixa por linha do `.txt`, muitas vezes só
+    um pedaço da linha impressa. As caixas são ordenadas de cima para baixo e
+    unidas quando o centro vertical cai dentro da linha corrente; um vão
+    horizontal maior que duas alturas de linha (calha entre colunas) abre uma
+    nova linha.
+    """
+    try:
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        boxes = []
+        for word in data.get("words") or []:
+            text = (word.get("text") or "").strip()
+            if not text:
+                continue
+            xs = [float(pt[0]) for pt in word["bbox"]]
+            ys = [float(pt[1]) for pt in word["bbox"]]
+            boxes.append((min(ys), max(ys), min(xs), max(xs), text))
+    except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+        return None
+    if not boxes:
+        return None
+
+    lines: List[Tuple[float, float, List[Tuple[float, float, str]]]] = []
+    for top, bottom, left, right, text in sorted(boxes):
+        center = (top + bottom) / 2
+        if lines and lines[-1][0] <= center <= lines[-1][1]:
+            lines[-1][2].append((left, right, text))
+        else:
+            lines.append((top, bottom, [(left, right, text)]))
+
+    out: List[str] = []
+    for top, bottom, words in lines:
+        gutter = 2 * (bottom - top)
+        words.sort()
+        current = [words[0][2]]
+        for (_l0, r0, _t0), (l1, _r1, t1) in zip(words, words[1:]):
+            if l1 - r0 > gutter:
+                out.append(" ".join(current))
+                current = []
+            current.append(t1)
+        out.append(" ".join(current))
+    return "\n".join(out)
+
+
+def _fusion_texts(
+    base: Path, candidate_texts: Dict[str, str], index: Optional[CollectionIndex] = None,
+) -> Dict[str, str]:
+    """Troca o texto de paddle/easy pelas linhas reconstruídas das caixas, quando houver JSON."""
+    texts = dict(candidate_texts)
+    for key, suffix in (("paddle", ".paddle.json"), ("easy", ".easy.json")):
+        if key in texts:
+            path = base.with_suffix(suffix)
+            if index is not None and not index.exists(path):
+                continue
+            lines = _lines_from_boxes(path)
+            if lines:
+                texts[key] = lines
+    return texts
+
+
+def _fuse_aligned(candidates: Dict[str, str], order: List[str], align_engine: str) -> str:
+    grid = _progressive_align(candidates, order, align_engine)
+    engine_weights = _default_engine_weights(list(candidates.keys()))
+    return _vote_columns(grid, np.array([engine_weights[key] for key in order], dtype=np.float64))
+
+
+def _fuse_segments(segments: List[Dict[str, str]], order: List[str], align_engine: str) -> str:
+    """Alinha cada segmento e vota a página inteira numa única passada.
+
+    As grades dos segmentos (colunas na ordem de `order` restrita aos
+    candidatos presentes, completadas com `EMPTY`) são empilhadas com uma
+    linha de `\\n` entre elas, cada célula com o peso do seu engine; como a
+    votação é independente por coluna, o resultado é o mesmo de votar
+    segmento a segmento, sem o custo fixo de uma votação por linha.
+    """
+    engine_weights = _default_engine_weights(order)
+    width = len(order)
+    newline = np.full((1, width), EMPTY, dtype=np.int32)
+    newline[0, 0] = ord("\n")
+    grids: List[np.ndarray] = []
+    weights: List[np.ndarray] = []
+    for idx, seg in enumerate(segments):
+        if idx:
+            grids.append(newline)
+            weights.append(np.ones((1, width)))
+        seg = {key: text for key, text in seg.items() if text}
+        seg_order = [key for key in order if key in seg]
+        if not seg_order:
+            continue
+        if len(seg_order) == 1:
+            grid = _codes(seg[seg_order[0]]).reshape(-1, 1)
+        else:
+            grid = _progressive_align(seg, seg_order, align_engine)
+        padded = np.full((len(grid), width), EMPTY, dtype=np.int32)
+        padded[:, :grid.shape[1]] = grid
+        row_weights = np.ones(width)
+        row_weights[:len(seg_order)] = [engine_weights[key] for key in seg_order]
+        grids.append(padded)
+        weights.append(np.broadcast_to(row_weights, padded.shape))
+    if not grids:
+        return ""
+    return _vote_columns(np.concatenate(grids), np.concatenate(weights))
+
+
+def _segment_by_lines(candidates: Dict[str, str], order: List[str]) -> Optional[List[Dict[str, str]]]:
+    """Quebra a página em segmentos ancorados nas linhas do pivô.
+
+    Cada linha do pivô vira um segmento; as linhas de cada candidato vão para o
+    segmento da linha do pivô com que casaram (`align_lines`), e linhas sem par
+    seguem a última linha casada. None quando algum candidato não casa nenhuma
+    linha (texto muito divergente): nesse caso a fusão volta a ser por página.
+    """
+    pivot_key = order[0]
+    pivot_lines = _normalize_for_alignment(candidates[pivot_key]).split("\n")
+    segments: List[Dict[str, List[str]]] = [{pivot_key: [line]} for line in pivot_lines]
+
+    for key in order[1:]:
+        lines = _normalize_for_alignment(candidates[key]).split("\n")
+        pairs = align_lines(pivot_lines, lines)
+        if not pairs:
+            return None
+        owner = dict((j, i) for i, j in pairs)
+        current = pairs[0][0]
+        for j, line in enumerate(lines):
+            current = owner.get(j, current)
+            segments[current].setdefault(key, []).append(line)
+
+    return [{key: " ".join(parts) for key, parts in segment.items()} for segment in segments]
+
+
+def resolve_segment(segment: str = "line") -> str:
+    segment = (segment or "line").strip().lower()
+    if segment not in FUSE_SEGMENTS:
+        raise ValueError(
+            "Segmentação da fusão '{seg}' inválida. Use {opts}.".format(seg=segment, opts=", ".join(FUSE_SEGMENTS))
+        )
+    return segment
+
+
+def fuse_candidates(
+    candidates: Dict[str, str],
+    anchor_key: Optional[str] = None,
+    align_engine: str = "auto",
+    segment: str = "line",
+) -> str:
+    """Funde os candidatos OCR por alinhamento de caracteres e votação ponderada.
+
+    Com `segment="line"`, as linhas são casadas primeiro e o alinhamento de
+    caracteres roda só dentro de cada par de linhas, o que limita o custo por
+    segmento e impede que um erro de alinhamento contamine o resto da página.
+    `segment="page"` alinha a página inteira de uma vez.
+    """
+    segment = resolve_segment(segment)
     filtered_candidates = {key: value for key, value in candidates.items() if value}
     if not filtered_candidates:
         return ""
@@ -252,32 +417,30 @@ def fuse_candidates(candidates: Dict[str, str], anchor_key: Optional[str] = None
         )
 
     order = [anchor_key] + [key for key in sorted(filtered_candidates.keys()) if key != anchor_key]
-    columns, pivot_key = _progressive_align(filtered_candidates, order)
+    segments = _segment_by_lines(filtered_candidates, order) if segment == "line" else None
+    if segments is None:
+        return _finalize_fused_text(_fuse_aligned(filtered_candidates, order, align_engine))
 
-    engine_weights = _default_engine_weights(list(filtered_candidates.keys()))
-    fused_chars = [_vote_column(column, engine_weights, pivot_key) for column in columns]
-    fused_text = "".join(fused_chars)
-    return _finalize_fused_text(fused_text)
-    fused_text = re.sub(r"[ \t]+", " ", fused_text)
-    fused_text = re.sub(r" ?\n ?", "\n", fused_text)
-    return unicodedata.normalize("NFC", fused_text.strip())
+    return _finalize_fused_text(_fuse_segments(segments, order, align_engine))
 
 def make_example_for_image(
     img: Path,
     gold_suffix: str,
     candidate_texts: Optional[Dict[str, str]] = None,
+    index: Optional[CollectionIndex] = None,
 ) -> Optional[Example]:
     base = base_for_image(img)
+    read = index.read_text if index is not None else read_text_if_exists
     curator = base.with_suffix(gold_suffix)
-    curator_text = read_text_if_exists(curator)
+    curator_text = read(curator)
     if curator_text is None:
         return None
 
     prepared_candidates: Dict[str, str] = {}
     if candidate_texts is None:
-        cands_paths = list_candidates_for_base(base)
+        cands_paths = list_candidates_for_base(base, index)
         for key in sorted(cands_paths.keys()):
-            txt = read_text_if_exists(cands_paths[key])
+            txt = read(cands_paths[key])
             if txt:
                 prepared_candidates[key] = txt
     else:
@@ -312,89 +475,147 @@ def make_example_for_image(
         meta=meta
     )
 
+def _export_document(
+    img: Path, cfg: ExportConfig, index: Optional[CollectionIndex] = None,
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Processa uma imagem e devolve (linha do dataset, linha do manifest), ou None sem curator.
+
+    Com `index`, candidatos, curator e JSON de caixas são localizados no
+    índice da coleção, sem `glob`/`exists()` no disco.
+    """
+    base = base_for_image(img)
+    index = index or CollectionIndex(base.parent)
+    candidate_texts: Dict[str, str] = {}
+    for key, path in list_candidates_for_base(base, index).items():
+        txt = index.read_text(path)
+        if txt:
+            candidate_texts[key] = txt
+
+    fusion_texts = _fusion_texts(base, candidate_texts, index) if resolve_segment(cfg.fuse_segment) == "line" else candidate_texts
+    if cfg.write_hypothesis and len(candidate_texts) >= 2:
+        anchor_key = max(
+            candidate_texts.keys(),
+            key=lambda key: len(_normalize_for_alignment(candidate_texts[key])),
+        )
+        fused_text = fuse_candidates(
+            fusion_texts, anchor_key=anchor_key, align_engine=cfg.align_engine, segment=cfg.fuse_segment,
+        )
+        hypothesis_path = base.with_suffix(cfg.hypothesis_suffix)
+        if fused_text and not hypothesis_path.exists():
+            try:
+                ensure_parent(hypothesis_path)
+                hypothesis_path.write_text(fused_text, encoding="utf-8")
+            except Exception as exc:
+                logger.warning("Falha ao escrever hipótese fundida %s: %s", hypothesis_path, exc)
+
+    ex = make_example_for_image(img, cfg.gold_suffix, candidate_texts=candidate_texts, index=index)
+    if ex is None:
+        return None
+
+    ex.fusion_candidates = {key: fusion_texts.get(key, txt) for key, txt in ex.candidates.items()}
+    try:
+        input_info = ex.build_input(cfg.multi_hyp, cfg.align_engine, cfg.fuse_segment)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    input_text = input_info["input_text"]
+    selected_candidates = input_info["selected_candidates"]
+
+    _cer, _wer = ex.score(input_text)
+
+    meta = dict(ex.meta)
+    meta["multi_hyp_mode"] = cfg.multi_hyp
+    meta["selected_candidates"] = selected_candidates
+
+    row_export = {
+        "doc_id": ex.doc_id,
+        "input_text": input_text,
+        "target_text": ex.target_text,
+        "candidates": ex.candidates,
+        "meta": meta
+    }
+
+    row_manifest = {
+        "doc_id": ex.doc_id,
+        "source_image": ex.meta["source_image"],
+        "num_candidates": len(ex.candidates),
+        "has_curator": True,
+        "cer": _cer,
+        "wer": _wer,
+        "curator_len": len(ex.target_text or ""),
+        "input_len": len(input_text or ""),
+        "candidates_present": ";".join(ex.meta["candidates_keys"]),
+        "multi_hyp_mode": cfg.multi_hyp,
+        "selected_candidates": ";".join(selected_candidates),
+    }
+    return row_export, row_manifest
+
+def _export_documents(
+    files: List[Path], cfg: ExportConfig, index: CollectionIndex,
+) -> Iterator[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+    """Aplica `_export_document` a cada imagem, em paralelo com `cfg.workers` > 1, na ordem de entrada."""
+    workers = min(max(1, int(cfg.workers or 1)), len(files))
+    if workers <= 1:
+        for img in files:
+            yield _export_document(img, cfg, index)
+        return
+    # Mesmo contexto "spawn" do `ocr run`; a janela limita quantos documentos
+    # prontos (com todos os textos) esperam a escrita.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # Cada worker recebe só a fatia do índice com os irmãos da imagem.
+        jobs = ((img, cfg, index.restrict(base_for_image(img))) for img in files)
+        yield from bounded_map(pool, _export_document_worker, jobs, workers * 4)
+
+def _export_document_worker(
+    args: Tuple[Path, ExportConfig, CollectionIndex],
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    img, cfg, index = args
+    return _export_document(img, cfg, index)
+
+def _sync_catalog(input_dir: Path, files: List[Path], index: CollectionIndex, cfg: ExportConfig) -> Optional[Dict[str, int]]:
+    catalog = open_catalog(input_dir)
+    if catalog is None:
+        return None
+    with catalog:
+        return catalog.sync(files, index, cfg.gold_suffix, cfg.hypothesis_suffix, glob=cfg.glob).summary()
+
 def export_dataset(cfg: ExportConfig) -> Dict[str, Any]:
+    try:
+        resolve_engine(cfg.align_engine)
+        resolve_segment(cfg.fuse_segment)
+    except (ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
     input_dir = Path(cfg.input_dir).resolve()
-    files = discover_images(input_dir, cfg.glob)
+    index = CollectionIndex(input_dir).scan(cfg.glob)
+    files = index.images(cfg.glob)
+    changes = _sync_catalog(input_dir, files, index, cfg) if cfg.catalog else None
     out_path = Path(cfg.out)
     manifest_csv = (out_path.parent / "export_manifest.csv")
     manifest_jsonl = (out_path.parent / "export_manifest.jsonl")
 
-    rows_export: List[Dict[str, Any]] = []
-    rows_manifest: List[Dict[str, Any]] = []
-
-    found_curators = 0
-    for img in files:
-        base = base_for_image(img)
-        cands_paths = list_candidates_for_base(base)
-        candidate_texts: Dict[str, str] = {}
-        for key, path in cands_paths.items():
-            txt = read_text_if_exists(path)
-            if txt:
-                candidate_texts[key] = txt
-
-        if cfg.write_hypothesis and len(candidate_texts) >= 2:
-            anchor_key = max(
-                candidate_texts.keys(),
-                key=lambda key: len(_normalize_for_alignment(candidate_texts[key])),
-            )
-            fused_text = fuse_candidates(candidate_texts, anchor_key=anchor_key)
-            hypothesis_path = base.with_suffix(cfg.hypothesis_suffix)
-            if fused_text and not hypothesis_path.exists():
-                try:
-                    ensure_parent(hypothesis_path)
-                    hypothesis_path.write_text(fused_text, encoding="utf-8")
-                except Exception as exc:
-                    logger.warning("Falha ao escrever hipótese fundida %s: %s", hypothesis_path, exc)
-
-        ex = make_example_for_image(img, cfg.gold_suffix, candidate_texts=candidate_texts)
-        if ex is None:
-            continue
-        found_curators += 1
-
-        try:
-            input_info = ex.build_input(cfg.multi_hyp)
-        except ValueError as exc:
-            raise SystemExit(str(exc))
-
-        input_text = input_info["input_text"]
-        selected_candidates = input_info["selected_candidates"]
-
-        _wer = float(wer(ex.target_text, input_text)) if input_text else 1.0
-        _cer = float(cer(ex.target_text, input_text)) if input_text else 1.0
-
-        meta = dict(ex.meta)
-        meta["multi_hyp_mode"] = cfg.multi_hyp
-        meta["selected_candidates"] = selected_candidates
-
-        rows_export.append({
-            "doc_id": ex.doc_id,
-            "input_text": input_text,
-            "target_text": ex.target_text,
-            "candidates": ex.candidates,
-            "meta": meta
-        })
-
-        rows_manifest.append({
-            "doc_id": ex.doc_id,
-            "source_image": ex.meta["source_image"],
-            "num_candidates": len(ex.candidates),
-            "has_curator": True,
-            "cer": _cer,
-            "wer": _wer,
-            "curator_len": len(ex.target_text or ""),
-            "input_len": len(input_text or ""),
-            "candidates_present": ";".join(ex.meta["candidates_keys"]),
-            "multi_hyp_mode": cfg.multi_hyp,
-            "selected_candidates": ";".join(selected_candidates),
-        })
-
-    if cfg.fail_if_no_gold and found_curators == 0:
-        raise SystemExit("Nenhum arquivo *.curator.txt encontrado na coleção. Export abortado.")
-
-    write_jsonl(out_path, rows_export)
-    ensure_parent(manifest_csv)
-    for row in rows_manifest:
-        append_csv(manifest_csv, EXPORT_FIELDS, row)
-    write_jsonl(manifest_jsonl, rows_manifest)
-
-    return {"items": len(rows_export), "out": str(out_path), "manifest_csv": str(manifest_csv), "manifest_jsonl": str(manifest_jsonl)}
+    try:
+        dataset_writer = open_dataset_writer(out_path, cfg.shard_size, cfg.compression, cfg.format)
+    except (ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
+
+    # Cada exemplo vai direto para o(s) `.tmp`; o rename no fim publica o dataset inteiro.
+    with dataset_writer as dataset, ManifestWriter(manifest_csv, EXPORT_FIELDS, manifest_jsonl) as writer:
+        for result in _export_documents(files, cfg, index):
+            if result is None:
+                continue
+            row_export, row_manifest = result
+            dataset.write(columnar_row(row_export, row_manifest) if cfg.format == "parquet" else row_export)
+            writer.write(row_manifest, row_manifest)
+
+        found_curators = dataset.rows
+        if cfg.fail_if_no_gold and found_curators == 0:
+            raise SystemExit("Nenhum arquivo *.curator.txt encontrado na coleção. Export abortado.")
+
+    result = {"items": found_curators, "out": str(out_path), "manifest_csv": str(manifest_csv), "manifest_jsonl": str(manifest_jsonl)}
+    if isinstance(dataset, ShardedJsonlWriter):
+        result["out"] = str(dataset.index_path)
+        result["shards"] = len(dataset.shards)
+    if changes is not None:
+        result["changes"] = changes
+    return result
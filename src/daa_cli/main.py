@@ -3,10 +3,12 @@ from __future__ import annotations
 import typer
 from typing import List
 from rich import print as rprint
-from .config import OCRConfig, ExportConfig, EvalConfig
+from .config import OCRConfig, ExportConfig, EvalConfig, ServeConfig, WatchConfig
 from .ocr import ocr_batch
 from .export import export_dataset
 from .eval import eval_collection
+from .watch import watch_collection
+from .serve import serve
 
 app = typer.Typer(help="Do Arquivo ao Algoritmo — OCR CLI")
 
@@ -27,12 +29,23 @@ def ocr_run(
     outputs: List[str] = typer.Option(["txt"], help="txt/tsv/hocr/pdf"),
     write_manifest: bool = typer.Option(True, help="Grava manifest CSV/JSONL"),
     dry_run: bool = typer.Option(False, help="Apenas simula"),
-    engines: List[str] = typer.Option(["tesseract","paddle","easyocr"], help="tesseract paddle easyocr deepseek"),
+    engines: List[str] = typer.Option(["tesseract","paddle","easyocr"], help="tesseract tesseract-api paddle easyocr deepseek"),
     gpu: bool = typer.Option(False, help="Usar GPU (Paddle/EasyOCR/DeepSeek-OCR)"),
     easyocr_langs: List[str] = typer.Option(["pt"], help="Idiomas EasyOCR, ex.: pt en"),
     deepseek_model_path: str = typer.Option(None, help="Caminho do modelo DeepSeek-OCR"),
     deepseek_weights_path: str = typer.Option(None, help="Caminho dos pesos/checkpoint DeepSeek-OCR"),
     deepseek_cache_dir: str = typer.Option(None, help="Diretório de cache do DeepSeek-OCR"),
+    workers: int = typer.Option(1, help="Processos paralelos (1 = sequencial); cada worker mantém seus modelos carregados"),
+    tesseract_jobs: int = typer.Option(1, help="Máximo de processos tesseract simultâneos no lote (limite global, compartilhado entre os workers)"),
+    cache_dir: str = typer.Option(None, help="Cache de resultados OCR por SHA-256 da imagem + parâmetros (desligado se vazio)"),
+    cache_max_gb: float = typer.Option(20.0, help="Tamanho máximo do cache; entradas menos usadas são removidas (LRU)"),
+    resume: bool = typer.Option(False, help="Retoma a execução anterior a partir de manifests/ocr_checkpoint.jsonl"),
+    batch_size: int = typer.Option(1, help="Imagens por lote na inferência EasyOCR (GPU); 1 = uma por vez"),
+    pipeline: bool = typer.Option(False, help="Leitura, OCR e escrita em estágios paralelos com filas limitadas (sem --workers)"),
+    queue_size: int = typer.Option(4, help="Tamanho das filas entre os estágios do --pipeline"),
+    overlap_engines: bool = typer.Option(True, "--overlap-engines/--no-overlap-engines", help="Com --gpu, roda o Tesseract (CPU) em paralelo aos engines de GPU na mesma página"),
+    catalog: bool = typer.Option(True, "--catalog/--no-catalog", help="Mantém manifests/catalog.sqlite (tamanho, mtime, SHA-256 e saídas por imagem)"),
+    changed_only: bool = typer.Option(False, help="Processa só imagens novas, alteradas ou sem OCR completo com estes parâmetros (requer --catalog)"),
 ):
     cfg = OCRConfig(
         input_dir=input_dir, glob=glob, lang=lang, oem=oem,
@@ -42,10 +55,97 @@ def ocr_run(
         deepseek_model_path=deepseek_model_path,
         deepseek_weights_path=deepseek_weights_path,
         deepseek_cache_dir=deepseek_cache_dir,
+        workers=workers,
+        tesseract_jobs=tesseract_jobs,
+        cache_dir=cache_dir,
+        cache_max_gb=cache_max_gb,
+        resume=resume,
+        batch_size=batch_size,
+        pipeline=pipeline,
+        queue_size=queue_size,
+        overlap_engines=overlap_engines,
+        catalog=catalog,
+        changed_only=changed_only,
     )
     res = ocr_batch(cfg)
     rprint(res)
 
+@app.command("watch")
+def watch_cmd(
+    input_dir: str = typer.Option(..., help="Diretório da coleção a observar"),
+    glob: str = typer.Option("**/*.jpg", help="Padrão glob das imagens"),
+    lang: str = typer.Option("por", help="Idioma Tesseract"),
+    oem: int = typer.Option(3, help="OEM (0-3)"),
+    psm: List[int] = typer.Option([3,4,6,11,12], help="Lista de PSMs (Tesseract)"),
+    outputs: List[str] = typer.Option(["txt"], help="txt/tsv/hocr/pdf"),
+    engines: List[str] = typer.Option(["tesseract","paddle","easyocr"], help="tesseract tesseract-api paddle easyocr deepseek"),
+    gpu: bool = typer.Option(False, help="Usar GPU (Paddle/EasyOCR/DeepSeek-OCR)"),
+    easyocr_langs: List[str] = typer.Option(["pt"], help="Idiomas EasyOCR, ex.: pt en"),
+    deepseek_model_path: str = typer.Option(None, help="Caminho do modelo DeepSeek-OCR"),
+    deepseek_weights_path: str = typer.Option(None, help="Caminho dos pesos/checkpoint DeepSeek-OCR"),
+    deepseek_cache_dir: str = typer.Option(None, help="Diretório de cache do DeepSeek-OCR"),
+    tesseract_jobs: int = typer.Option(1, help="Máximo de processos tesseract simultâneos"),
+    cache_dir: str = typer.Option(None, help="Cache de resultados OCR por SHA-256 da imagem + parâmetros (desligado se vazio)"),
+    cache_max_gb: float = typer.Option(20.0, help="Tamanho máximo do cache; aplicado ao encerrar"),
+    overlap_engines: bool = typer.Option(True, "--overlap-engines/--no-overlap-engines", help="Com --gpu, roda o Tesseract (CPU) em paralelo aos engines de GPU na mesma página"),
+    backend: str = typer.Option("auto", help="Como observar: auto (watchdog/inotify se instalado; polling em NFS/SMB), watchdog ou polling"),
+    interval: float = typer.Option(2.0, help="Segundos entre varreduras no modo polling"),
+    settle: float = typer.Option(2.0, help="Segundos sem mudança antes de processar uma imagem (arquivo ainda sendo gravado)"),
+    catch_up: bool = typer.Option(True, "--catch-up/--no-catch-up", help="Ao iniciar, processa imagens novas/alteradas desde a última execução"),
+):
+    cfg = WatchConfig(
+        input_dir=input_dir, glob=glob, lang=lang, oem=oem,
+        psm=list(psm), outputs=list(outputs),
+        engines=list(engines), gpu=gpu, easyocr_langs=list(easyocr_langs),
+        deepseek_model_path=deepseek_model_path,
+        deepseek_weights_path=deepseek_weights_path,
+        deepseek_cache_dir=deepseek_cache_dir,
+        tesseract_jobs=tesseract_jobs,
+        cache_dir=cache_dir,
+        cache_max_gb=cache_max_gb,
+        overlap_engines=overlap_engines,
+        backend=backend, interval=interval, settle=settle, catch_up=catch_up,
+    )
+    rprint(f"[bold]daa watch[/bold] observando {input_dir} (Ctrl+C para sair)")
+    res = watch_collection(cfg)
+    rprint(res)
+
+@app.command("serve")
+def serve_cmd(
+    input_dir: str = typer.Option(..., help="Coleção servida: pedidos por caminho precisam estar dentro dela"),
+    host: str = typer.Option("127.0.0.1", help="Endereço de escuta (padrão: só a máquina local)"),
+    port: int = typer.Option(8765, help="Porta HTTP (0 = escolhe uma livre)"),
+    lang: str = typer.Option("por", help="Idioma Tesseract"),
+    oem: int = typer.Option(3, help="OEM (0-3)"),
+    psm: List[int] = typer.Option([3,4,6,11,12], help="Lista de PSMs (Tesseract)"),
+    outputs: List[str] = typer.Option(["txt"], help="txt/tsv/hocr/pdf"),
+    engines: List[str] = typer.Option(["tesseract","paddle","easyocr"], help="tesseract tesseract-api paddle easyocr deepseek"),
+    gpu: bool = typer.Option(False, help="Usar GPU (Paddle/EasyOCR/DeepSeek-OCR)"),
+    easyocr_langs: List[str] = typer.Option(["pt"], help="Idiomas EasyOCR, ex.: pt en"),
+    deepseek_model_path: str = typer.Option(None, help="Caminho do modelo DeepSeek-OCR"),
+    deepseek_weights_path: str = typer.Option(None, help="Caminho dos pesos/checkpoint DeepSeek-OCR"),
+    deepseek_cache_dir: str = typer.Option(None, help="Diretório de cache do DeepSeek-OCR"),
+    tesseract_jobs: int = typer.Option(1, help="Máximo de processos tesseract simultâneos"),
+    cache_dir: str = typer.Option(None, help="Cache de resultados OCR por SHA-256 da imagem + parâmetros (desligado se vazio)"),
+    overlap_engines: bool = typer.Option(True, "--overlap-engines/--no-overlap-engines", help="Com --gpu, roda o Tesseract (CPU) em paralelo aos engines de GPU na mesma página"),
+    max_batch: int = typer.Option(8, help="Máximo de páginas por lote de OCR (EasyOCR em lote na GPU)"),
+    max_wait_ms: float = typer.Option(10.0, help="Quanto esperar por outras requisições antes de fechar um lote"),
+):
+    cfg = ServeConfig(
+        input_dir=input_dir, host=host, port=port, lang=lang, oem=oem,
+        psm=list(psm), outputs=list(outputs),
+        engines=list(engines), gpu=gpu, easyocr_langs=list(easyocr_langs),
+        deepseek_model_path=deepseek_model_path,
+        deepseek_weights_path=deepseek_weights_path,
+        deepseek_cache_dir=deepseek_cache_dir,
+        tesseract_jobs=tesseract_jobs,
+        cache_dir=cache_dir,
+        overlap_engines=overlap_engines,
+        max_batch=max_batch, max_wait_ms=max_wait_ms,
+    )
+    res = serve(cfg, ready=lambda h, p: rprint(f"[bold]daa serve[/bold] em http://{h}:{p} (Ctrl+C para sair)"))
+    rprint(res)
+
 @app.command("export")
 def export_cmd(
     input_dir: str = typer.Option(..., help="Diretório base a varrer"),
@@ -66,11 +166,26 @@ def export_cmd(
         ".fuse.txt",
         help="Sufixo do arquivo de hipótese fundida gerado quando write_hypothesis estiver ativo",
     ),
+    align_engine: str = typer.Option(
+        "auto",
+        help="Motor de alinhamento do modo fuse: auto, levenshtein (rapidfuzz) ou difflib",
+    ),
+    fuse_segment: str = typer.Option(
+        "line",
+        help="Fusão por linha (casa linhas antes de alinhar caracteres) ou page (página inteira)",
+    ),
+    workers: int = typer.Option(1, help="Processos paralelos (uma página por vez em cada processo)"),
+    shard_size: int = typer.Option(0, help="Exemplos por shard (0 = arquivo único); gera <out>-NNNNN.jsonl e <out>.index.json"),
+    compression: str = typer.Option("none", help="Compressão dos shards: none, gzip ou zstd (no parquet, o codec: none, snappy, gzip ou zstd)"),
+    format: str = typer.Option("jsonl", "--format", help="Formato do dataset: jsonl ou parquet (requer pyarrow)"),
+    catalog: bool = typer.Option(True, "--catalog/--no-catalog", help="Atualiza manifests/catalog.sqlite da coleção e informa o que mudou"),
 ):
     cfg = ExportConfig(
         input_dir=input_dir, glob=glob, out=out,
         gold_suffix=gold_suffix, multi_hyp=multi_hyp, fail_if_no_gold=fail_if_no_gold,
         write_hypothesis=write_hypothesis, hypothesis_suffix=hypothesis_suffix,
+        align_engine=align_engine, fuse_segment=fuse_segment, workers=workers,
+        shard_size=shard_size, compression=compression, format=format, catalog=catalog,
     )
     res = export_dataset(cfg)
     rprint(res)
@@ -81,8 +196,14 @@ def eval_cmd(
     glob: str = typer.Option("**/*.jpg", help="Arquivos de imagem base"),
     gold_suffix: str = typer.Option(".curator.txt", help="Sufixo dos textos revisados"),
     out_dir: str = typer.Option(..., help="Diretório de saída dos relatórios"),
+    workers: int = typer.Option(1, help="Processos paralelos para calcular CER/WER"),
+    cache: bool = typer.Option(True, "--cache/--no-cache", help="Reaproveita métricas de pares (gold, candidato) inalterados (out_dir/eval_cache.jsonl)"),
+    catalog: bool = typer.Option(True, "--catalog/--no-catalog", help="Atualiza manifests/catalog.sqlite da coleção e informa o que mudou"),
 ):
-    cfg = EvalConfig(input_dir=input_dir, glob=glob, gold_suffix=gold_suffix, out_dir=out_dir)
+    cfg = EvalConfig(
+        input_dir=input_dir, glob=glob, gold_suffix=gold_suffix, out_dir=out_dir,
+        workers=workers, cache=cache, catalog=catalog,
+    )
     res = eval_collection(cfg)
     rprint(res)
 
@@ -0,0 +1,210 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import hashlib
+import json
+import os
+import re
+from .align import _load_levenshtein
+
+# (cer, wer)
+Scores = Tuple[float, float]
+
+_levenshtein = _load_levenshtein()
+
+@dataclass(frozen=True)
+class EditScores:
+    """CER/WER de um par (gold, candidato) com a decomposição dos erros (None se não pedida)."""
+    cer: float
+    wer: float
+    char_substitutions: Optional[int]
+    char_insertions: Optional[int]
+    char_deletions: Optional[int]
+    word_substitutions: Optional[int]
+    word_insertions: Optional[int]
+    word_deletions: Optional[int]
+    ref_chars: int
+    ref_words: int
+
+    @property
+    def has_breakdown(self) -> bool:
+        return self.char_substitutions is not None
+
+# Mesma normalização padrão do jiwer: `cer` só apara as pontas; `wer` colapsa
+# sequências de 2+ espaços, apara e separa por " ".
+_MULTISPACE = re.compile(r"\s\s+")
+
+def _words(text: str) -> List[str]:
+    return [w for w in _MULTISPACE.sub(" ", text).strip().split(" ") if w]
+
+def _as_strings(ref: List[str], hyp: List[str]) -> Tuple[str, str]:
+    # Cada palavra distinta vira um code point (planos suplementares, longe dos
+    # surrogates), e o Levenshtein de palavras roda como o de caracteres.
+    vocab: Dict[str, str] = {}
+    encode = lambda words: "".join(vocab.setdefault(w, chr(0x10000 + len(vocab))) for w in words)
+    return encode(ref), encode(hyp)
+
+def _edit_counts(ref: Sequence, hyp: Sequence) -> Tuple[int, int, int]:
+    subs = ins = dels = 0
+    for tag, _src, _dest in _levenshtein.editops(ref, hyp).as_list():
+        if tag == "replace":
+            subs += 1
+        elif tag == "insert":
+            ins += 1
+        else:
+            dels += 1
+    return subs, ins, dels
+
+def _distance(ref: str, hyp: str) -> int:
+    # Com `score_cutoff` o rapidfuzz só calcula uma faixa em torno da diagonal;
+    # a faixa cresce até conter a distância (páginas OCR costumam ter poucos
+    # erros em relação ao tamanho).
+    longest = max(len(ref), len(hyp))
+    cutoff = max(64, abs(len(ref) - len(hyp)))
+    while True:
+        dist = _levenshtein.distance(ref, hyp, score_cutoff=cutoff)
+        if dist <= cutoff or cutoff >= longest:
+            return dist
+        cutoff *= 4
+
+def _jiwer_scores(gold: str, text: str) -> EditScores:
+    # Caminho sem rapidfuzz (jiwer antigo): duas passadas do próprio jiwer.
+    from jiwer import process_characters, process_words
+    chars = process_characters(gold, text)
+    words = process_words(gold, text)
+    return EditScores(
+        cer=float(chars.cer), wer=float(words.wer),
+        char_substitutions=chars.substitutions, char_insertions=chars.insertions, char_deletions=chars.deletions,
+        word_substitutions=words.substitutions, word_insertions=words.insertions, word_deletions=words.deletions,
+        ref_chars=len(gold.strip()), ref_words=len(_words(gold)),
+    )
+
+def edit_scores(gold: str, text: str, breakdown: bool = True) -> EditScores:
+    """CER e WER em uma passada por nível, com os mesmos valores de `jiwer.cer`/`jiwer.wer`.
+
+    Usa o Levenshtein do rapidfuzz (bit-paralelo, em C++) sobre os caracteres
+    e sobre as palavras codificadas como caracteres. Com `breakdown`, as
+    contagens de substituições/inserções/deleções saem da mesma passada
+    (editops); sem ele, só a distância é calculada, numa faixa diagonal.
+    """
+    if _levenshtein is None:
+        return _jiwer_scores(gold, text)
+    ref_chars, hyp_chars = gold.strip(), text.strip()
+    ref_words, hyp_words = _as_strings(_words(gold), _words(text))
+    if breakdown:
+        c_sub, c_ins, c_del = _edit_counts(ref_chars, hyp_chars)
+        w_sub, w_ins, w_del = _edit_counts(ref_words, hyp_words)
+        c_dist, w_dist = c_sub + c_ins + c_del, w_sub + w_ins + w_del
+    else:
+        c_sub = c_ins = c_del = w_sub = w_ins = w_del = None
+        c_dist, w_dist = _distance(ref_chars, hyp_chars), _distance(ref_words, hyp_words)
+    return EditScores(
+        cer=c_dist / max(len(ref_chars), 1),
+        wer=w_dist / max(len(ref_words), 1),
+        char_substitutions=c_sub, char_insertions=c_ins, char_deletions=c_del,
+        word_substitutions=w_sub, word_insertions=w_ins, word_deletions=w_del,
+        ref_chars=len(ref_chars), ref_words=len(ref_words),
+    )
+
+def _empty_scores(gold: str) -> EditScores:
+    ref_chars, ref_words = len(gold.strip()), len(_words(gold))
+    return EditScores(1.0, 1.0, 0, 0, ref_chars, 0, 0, ref_words, ref_chars, ref_words)
+
+def text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class MetricMemo:
+    """CER/WER de um documento, memorizados pelo hash do texto candidato.
+
+    Um memo por documento (o gold é fixo): a escolha do melhor candidato, as
+    métricas do manifest e o `eval` consultam o mesmo memo, e cada par
+    (gold, candidato) é pontuado no máximo uma vez.
+    """
+
+    def __init__(self, gold: str):
+        self.gold = gold
+        self._scores: Dict[bytes, EditScores] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def details(self, text: str, breakdown: bool = True) -> EditScores:
+        key = text_digest(text or "")
+        cached = self._scores.get(key)
+        if cached is not None and (cached.has_breakdown or not breakdown):
+            self.hits += 1
+            return cached
+        self.misses += 1
+        scores = self._scores[key] = edit_scores(self.gold, text, breakdown) if text else _empty_scores(self.gold)
+        return scores
+
+    def score(self, text: str) -> Scores:
+        scores = self.details(text, breakdown=False)
+        return scores.cer, scores.wer
+
+class MetricCache:
+    """Cache em disco de métricas por par (hash do gold, hash do candidato).
+
+    Arquivo JSONL só de acréscimo: cada linha é `{"gold", "cand", "scores"}`.
+    Uma linha truncada (queda no meio da escrita) é ignorada na leitura. Ao
+    fechar, se a maior parte das entradas não foi usada na execução (golds ou
+    candidatos que mudaram), o arquivo é reescrito só com as usadas.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 500):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._used: Set[Tuple[str, str]] = set()
+        self._fh = None
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[(entry["gold"], entry["cand"])] = entry["scores"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def get(self, gold: str, cand: str) -> Optional[EditScores]:
+        scores = self._entries.get((gold, cand))
+        if scores is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.add((gold, cand))
+        return EditScores(**scores)
+
+    def put(self, gold: str, cand: str, scores: EditScores) -> None:
+        key = (gold, cand)
+        self._entries[key] = asdict(scores)
+        self._used.add(key)
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps({"gold": gold, "cand": cand, "scores": self._entries[key]}) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._fh.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        stale = len(self._entries) - len(self._used)
+        if stale > len(self._used):
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for key in self._used:
+                    f.write(json.dumps({"gold": key[0], "cand": key[1], "scores": self._entries[key]}) + "\n")
+            os.replace(tmp, self.path)
+
+    def __enter__(self) -> "MetricCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -1,179 +1,717 @@
-
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import json
+import multiprocessing
+import os
 from .config import OCRConfig
-from .utils import discover_images, tesseract_version, sha256_of_file, append_csv, write_jsonl
-from .backends import run_tesseract, run_easyocr, run_paddle, run_deepseek
+from .utils import discover_images, tesseract_version, sha256_of_file, ensure_parent, write_output, ManifestWriter
+from .backends import (
+    run_tesseract, run_tesseract_api, tesserocr_version, python_engine_version,
+    run_easyocr, run_easyocr_batch, run_paddle, run_deepseek, resolve_deepseek_paths, read_image,
+)
+from .cache import ResultCache
+from .catalog import Catalog, open_catalog
+from .collection import CollectionIndex
+from .scheduler import configure_scheduler
+from .pipeline import WriterStage, bounded_map, prefetch
 
 MANIFEST_FIELDS = [
     "timestamp","source_path","source_sha256",
     "engine","engine_version","device",
     "lang","oem","psm","format",
-    "exit_code","duration_sec","stderr","out_path","notes"
+    "exit_code","duration_sec","queue_wait_sec","stderr","out_path","notes"
 ]
 
-def ocr_batch(cfg: OCRConfig) -> Dict[str, Any]:
-    input_dir = Path(cfg.input_dir).resolve()
-    files = discover_images(input_dir, cfg.glob)
-    manifest_csv = input_dir / "manifests" / "ocr_manifest.csv"
-    manifest_jsonl = input_dir / "manifests" / "ocr_manifest.jsonl"
-    rows_jsonl = []
-    stats = {"images": len(files), "rows": 0}
+CHECKPOINT_NAME = "ocr_checkpoint.jsonl"
 
-    tesseract_ver = None
-    if "tesseract" in cfg.engines:
-        tesseract_ver = tesseract_version()
-
-    for img in files:
-        sha = sha256_of_file(img)
-
-        # Tesseract
-        if "tesseract" in cfg.engines:
-            rows = run_tesseract(img, cfg.lang, cfg.oem, cfg.psm, cfg.outputs, cfg.dry_run)
-            for row in rows:
-                append_csv(manifest_csv, MANIFEST_FIELDS, {
-                    "timestamp": datetime.utcnow().isoformat(timespec="seconds")+"Z",
-                    "source_path": str(img),
-                    "source_sha256": sha,
-                    "engine": "tesseract",
-                    "engine_version": tesseract_ver,
-                    "device": "cpu",
-                    "lang": cfg.lang,
-                    "oem": cfg.oem,
-                    "psm": row.get("psm"),
-                    "format": row.get("format"),
-                    "exit_code": row.get("exit_code"),
-                    "duration_sec": round(row.get("duration_sec", 0.0), 3),
-                    "stderr": row.get("stderr",""),
-                    "out_path": row.get("out_path"),
-                    "notes": ""
-                })
-                rows_jsonl.append({
-                    "engine": "tesseract",
-                    "engine_version": tesseract_ver,
-                    "device": "cpu",
-                    "psm": row.get("psm"),
-                    "format": row.get("format"),
-                    "exit_code": row.get("exit_code"),
-                    "duration_sec": row.get("duration_sec"),
-                    "stderr": row.get("stderr"),
-                    "out_path": row.get("out_path"),
-                    "source_path": str(img),
-                    "source_sha256": sha,
-                })
-                stats["rows"] += 1
-
-        # PaddleOCR
-        if "paddle" in cfg.engines:
-            res = run_paddle(img, gpu=cfg.gpu)
-            available = res.get("available", False)
-            append_csv(manifest_csv, MANIFEST_FIELDS, {
-                "timestamp": datetime.utcnow().isoformat(timespec="seconds")+"Z",
-                "source_path": str(img),
-                "source_sha256": sha,
-                "engine": "paddle",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "lang": cfg.lang,
-                "oem": "",
-                "psm": "",
-                "format": "txt",
-                "exit_code": 0 if available else 1,
-                "duration_sec": 0.0,
-                "stderr": "" if available else res.get("error",""),
-                "out_path": res.get("out_txt","") if available else "",
-                "notes": "" if available else "backend ausente"
-            })
-            rows_jsonl.append({
-                "engine": "paddle",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "available": available,
-                "out_txt": res.get("out_txt", ""),
-                "out_json": res.get("out_json", ""),
-                "error": res.get("error", "") if not available else "",
-                "source_path": str(img),
-                "source_sha256": sha
-            })
-            stats["rows"] += 1
-
-        # EasyOCR
-        if "easyocr" in cfg.engines:
-            res = run_easyocr(img, langs=cfg.easyocr_langs, gpu=cfg.gpu)
-            available = res.get("available", False)
-            append_csv(manifest_csv, MANIFEST_FIELDS, {
-                "timestamp": datetime.utcnow().isoformat(timespec="seconds")+"Z",
-                "source_path": str(img),
-                "source_sha256": sha,
-                "engine": "easyocr",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "lang": ",".join(cfg.easyocr_langs),
-                "oem": "",
-                "psm": "",
-                "format": "txt",
-                "exit_code": 0 if available else 1,
-                "duration_sec": 0.0,
-                "stderr": "" if available else res.get("error",""),
-                "out_path": res.get("out_txt","") if available else "",
-                "notes": "" if available else "backend ausente"
-            })
-            rows_jsonl.append({
-                "engine": "easyocr",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "available": available,
-                "out_txt": res.get("out_txt", ""),
-                "out_json": res.get("out_json", ""),
-                "error": res.get("error", "") if not available else "",
-                "source_path": str(img),
-                "source_sha256": sha
+CPU_ENGINES = ("tesseract", "tesseract-api")
+GPU_ENGINES = ("paddle", "easyocr", "deepseek")
+
+ManifestPair = Tuple[Dict[str, Any], Dict[str, Any]]
+# Recebe uma tarefa de escrita para executar depois (estágio de escrita do pipeline).
+Defer = Callable[[Callable[[], Any]], None]
+# Unidade de trabalho do checkpoint: (engine, psm); psm vazio fora do Tesseract.
+Unit = Tuple[str, str]
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")+"Z"
+
+def _tesseract_pairs(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine: str,
+    rows: List[Dict[str, Any]],
+    engine_ver: Optional[str],
+) -> List[ManifestPair]:
+    pairs = []
+    for row in rows:
+        shared = row.get("shared_formats") or []
+        available = row.get("available", True)
+        csv_row = {
+            "timestamp": _timestamp(),
+            "source_path": str(img),
+            "source_sha256": sha,
+            "engine": engine,
+            "engine_version": engine_ver,
+            "device": "cpu",
+            "lang": cfg.lang,
+            "oem": cfg.oem,
+            "psm": row.get("psm"),
+            "format": row.get("format"),
+            "exit_code": row.get("exit_code"),
+            "duration_sec": round(row.get("duration_sec", 0.0), 3),
+            "queue_wait_sec": round(row.get("queue_wait_sec", 0.0), 3),
+            "stderr": row.get("stderr",""),
+            "out_path": row.get("out_path"),
+            # Formatos gerados pela mesma execução dividem duration_sec.
+            "notes": "backend ausente" if not available else "cache" if row.get("cached") else (
+                "execução compartilhada: " + "+".join(shared) if len(shared) > 1 else ""
+            )
+        }
+        json_row = {
+            "engine": engine,
+            "engine_version": engine_ver,
+            "device": "cpu",
+            "psm": row.get("psm"),
+            "format": row.get("format"),
+            "available": available,
+            "exit_code": row.get("exit_code"),
+            "cached": bool(row.get("cached")),
+            "duration_sec": row.get("duration_sec"),
+            "queue_wait_sec": row.get("queue_wait_sec", 0.0),
+            "stderr": row.get("stderr"),
+            "out_path": row.get("out_path"),
+            "source_path": str(img),
+            "source_sha256": sha,
+        }
+        pairs.append((csv_row, json_row))
+    return pairs
+
+def _engine_pair(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine: str,
+    lang: str,
+    res: Dict[str, Any],
+    engine_ver: str = "",
+) -> ManifestPair:
+    available = res.get("available", False)
+    cached = bool(res.get("cached"))
+    device = "cuda" if cfg.gpu else "cpu"
+    csv_row = {
+        "timestamp": _timestamp(),
+        "source_path": str(img),
+        "source_sha256": sha,
+        "engine": engine,
+        "engine_version": engine_ver,
+        "device": device,
+        "lang": lang,
+        "oem": "",
+        "psm": "",
+        "format": "txt",
+        "exit_code": 0 if available else 1,
+        "duration_sec": 0.0,
+        "queue_wait_sec": 0.0,
+        "stderr": "" if available else res.get("error",""),
+        "out_path": res.get("out_txt","") if available else "",
+        "notes": ("cache" if cached else "") if available else "backend ausente"
+    }
+    json_row = {
+        "engine": engine,
+        "engine_version": engine_ver,
+        "device": device,
+        "available": available,
+        "cached": cached,
+        "out_txt": res.get("out_txt", ""),
+        "out_json": res.get("out_json", ""),
+        "error": res.get("error", "") if not available else "",
+        "source_path": str(img),
+        "source_sha256": sha
+    }
+    return csv_row, json_row
+
+def _deferred_emit(defer: Optional[Defer]) -> Optional[Callable[[Path, Any], None]]:
+    if defer is None:
+        return None
+    return lambda path, content: defer(partial(write_output, path, content))
+
+def _open_cache(cfg: OCRConfig) -> Optional[ResultCache]:
+    if not cfg.cache_dir or cfg.dry_run:
+        return None
+    max_bytes = int(cfg.cache_max_gb * 1024 ** 3) if cfg.cache_max_gb else None
+    return ResultCache(Path(cfg.cache_dir), max_bytes)
+
+def _run_tesseract_cached(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine: str,
+    runner: Callable[..., List[Dict[str, Any]]],
+    engine_ver: Optional[str],
+    cache: Optional[ResultCache],
+    psm_list: List[int],
+) -> List[Dict[str, Any]]:
+    if not psm_list:
+        return []
+    if cache is None:
+        return runner(img, cfg.lang, cfg.oem, psm_list, cfg.outputs, cfg.dry_run)
+
+    def _key(psm: int, fmt: str) -> str:
+        return ResultCache.make_key(
+            source_sha256=sha, engine=engine, engine_version=engine_ver,
+            lang=cfg.lang, oem=cfg.oem, psm=psm, format=fmt,
+        )
+
+    rows_by_psm: Dict[int, List[Dict[str, Any]]] = {}
+    missing: List[int] = []
+    for psm in psm_list:
+        out_base = img.with_suffix("").as_posix() + f".tess.psm{psm:02d}"
+        restored = []
+        for fmt in cfg.outputs:
+            out_path = Path(out_base + f".{fmt}")
+            if cache.get(_key(psm, fmt), {fmt: out_path}) is None:
+                break
+            restored.append({
+                "engine": engine, "psm": psm, "format": fmt, "exit_code": 0,
+                "duration_sec": 0.0, "queue_wait_sec": 0.0, "stderr": "",
+                "out_path": str(out_path), "cached": True,
             })
-            stats["rows"] += 1
+        if len(restored) == len(cfg.outputs):
+            rows_by_psm[psm] = restored
+        else:
+            missing.append(psm)
+
+    if missing:
+        for row in runner(img, cfg.lang, cfg.oem, missing, cfg.outputs, cfg.dry_run):
+            rows_by_psm.setdefault(row["psm"], []).append(row)
+            out_path = Path(row["out_path"])
+            if row.get("exit_code") == 0 and out_path.exists():
+                cache.put(_key(row["psm"], row["format"]), {row["format"]: out_path}, {"source_path": str(img)})
 
-        # DeepSeek-OCR
-        if "deepseek" in cfg.engines:
-            res = run_deepseek(
+    return [row for psm in dict.fromkeys(psm_list) for row in rows_by_psm.get(psm, [])]
+
+def _engine_cache_key(sha: str, cfg: OCRConfig, engine: str, engine_ver: str, params: Dict[str, Any]) -> str:
+    return ResultCache.make_key(
+        source_sha256=sha, engine=engine, engine_version=engine_ver,
+        device="cuda" if cfg.gpu else "cpu", format="txt+json", **params,
+    )
+
+def _lookup_engine_cache(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine: str,
+    suffix: str,
+    engine_ver: str,
+    params: Dict[str, Any],
+    cache: Optional[ResultCache],
+) -> Optional[Dict[str, Any]]:
+    if cache is None:
+        return None
+    txt_path = img.with_suffix(f".{suffix}.txt")
+    json_path = img.with_suffix(f".{suffix}.json")
+    key = _engine_cache_key(sha, cfg, engine, engine_ver, params)
+    if cache.get(key, {"txt": txt_path, "json": json_path}) is None:
+        return None
+    return {"engine": engine, "available": True, "cached": True, "out_txt": str(txt_path), "out_json": str(json_path)}
+
+def _run_engine_cached(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine: str,
+    suffix: str,
+    engine_ver: str,
+    params: Dict[str, Any],
+    runner: Callable[[], Dict[str, Any]],
+    cache: Optional[ResultCache],
+    precomputed: Optional[Dict[str, Any]] = None,
+    defer: Optional[Defer] = None,
+) -> Dict[str, Any]:
+    # `precomputed` vem da inferência em lote (ou de um acerto de cache já
+    # restaurado) feita antes de process_image.
+    res = precomputed or _lookup_engine_cache(img, sha, cfg, engine, suffix, engine_ver, params, cache)
+    if res is None:
+        res = runner()
+    if cache is not None and res.get("available") and not res.get("cached"):
+        key = _engine_cache_key(sha, cfg, engine, engine_ver, params)
+        store = partial(
+            cache.put, key, {"txt": Path(res["out_txt"]), "json": Path(res["out_json"])}, {"source_path": str(img)},
+        )
+        # No pipeline as saídas ainda estão na fila de escrita: o cache entra depois delas.
+        if defer is not None:
+            defer(store)
+        else:
+            store()
+    return res
+
+def _run_cpu_engines(
+    img: Path,
+    sha: str,
+    cfg: OCRConfig,
+    engine_versions: Dict[str, str],
+    done: Set[Unit],
+    cache: Optional[ResultCache],
+) -> List[ManifestPair]:
+    pairs: List[ManifestPair] = []
+    for engine, runner in (("tesseract", run_tesseract), ("tesseract-api", run_tesseract_api)):
+        if engine not in cfg.engines:
+            continue
+        ver = engine_versions.get(engine)
+        psm_list = [psm for psm in cfg.psm if (engine, str(psm)) not in done]
+        rows = _run_tesseract_cached(img, sha, cfg, engine, runner, ver, cache, psm_list)
+        pairs.extend(_tesseract_pairs(img, sha, cfg, engine, rows, ver))
+    return pairs
+
+def _overlap_engines(cfg: OCRConfig) -> bool:
+    return (
+        cfg.gpu and cfg.overlap_engines and not cfg.dry_run
+        and any(engine in cfg.engines for engine in CPU_ENGINES)
+        and any(engine in cfg.engines for engine in GPU_ENGINES)
+    )
+
+def _engine_pool(max_workers: int) -> ThreadPoolExecutor:
+    # As threads só coordenam os engines de CPU; o limite real de processos
+    # tesseract continua sendo o do scheduler (`--tesseract-jobs`). O pool
+    # vive só durante a página (ou o lote) e é encerrado no fim do `with`.
+    return ThreadPoolExecutor(max_workers=max(1, min(4, max_workers)), thread_name_prefix="daa-cpu-engines")
+
+def process_image(
+    img: Path,
+    cfg: OCRConfig,
+    engine_versions: Optional[Dict[str, str]] = None,
+    completed: Optional[Dict[str, Set[Unit]]] = None,
+    sha: Optional[str] = None,
+    precomputed: Optional[Dict[str, Dict[str, Any]]] = None,
+    array: Any = None,
+    defer: Optional[Defer] = None,
+    cpu_future: Optional["Future[List[ManifestPair]]"] = None,
+) -> List[ManifestPair]:
+    """Roda os engines configurados em uma imagem e devolve pares (linha CSV, linha JSONL) do manifest.
+
+    `completed` mapeia SHA-256 -> unidades (engine, psm) já concluídas desta
+    imagem segundo o checkpoint; essas unidades são puladas (`--resume`).
+    `precomputed` traz resultados por engine já obtidos em lote (`process_chunk`).
+    `array` é a imagem já decodificada (BGR) e `defer` recebe as escritas de
+    saída em vez de executá-las (modo `--pipeline`). Com `--gpu`, os engines de
+    CPU (Tesseract) rodam numa thread enquanto os de GPU processam a página;
+    `cpu_future` é essa execução quando já foi disparada por `process_chunk`.
+    """
+    engine_versions = engine_versions or {}
+    emit = _deferred_emit(defer)
+    precomputed = precomputed or {}
+    sha = sha or sha256_of_file(img)
+    done = (completed or {}).get(sha, set())
+    cache = _open_cache(cfg)
+    pairs: List[ManifestPair] = []
+
+    # Tesseract
+    cpu_pairs: List[ManifestPair] = []
+    if cpu_future is None and _overlap_engines(cfg):
+        with _engine_pool(1) as pool:
+            cpu_future = pool.submit(_run_cpu_engines, img, sha, cfg, engine_versions, done, cache)
+            return process_image(img, cfg, engine_versions, completed, sha, precomputed, array, defer, cpu_future)
+    if cpu_future is None:
+        cpu_pairs = _run_cpu_engines(img, sha, cfg, engine_versions, done, cache)
+
+    # PaddleOCR
+    if "paddle" in cfg.engines and ("paddle", "") not in done:
+        ver = engine_versions.get("paddle", "")
+        res = _run_engine_cached(
+            img, sha, cfg, "paddle", "paddle", ver, {"lang": "pt"},
+            lambda: run_paddle(img, gpu=cfg.gpu, array=array, emit=emit), cache,
+            precomputed.get("paddle"), defer,
+        )
+        pairs.append(_engine_pair(img, sha, cfg, "paddle", cfg.lang, res, ver))
+
+    # EasyOCR
+    if "easyocr" in cfg.engines and ("easyocr", "") not in done:
+        ver = engine_versions.get("easyocr", "")
+        res = _run_engine_cached(
+            img, sha, cfg, "easyocr", "easy", ver, {"lang": sorted(cfg.easyocr_langs)},
+            lambda: run_easyocr(img, langs=cfg.easyocr_langs, gpu=cfg.gpu, array=array, emit=emit), cache,
+            precomputed.get("easyocr"), defer,
+        )
+        pairs.append(_engine_pair(img, sha, cfg, "easyocr", ",".join(cfg.easyocr_langs), res, ver))
+
+    # DeepSeek-OCR
+    if "deepseek" in cfg.engines and ("deepseek", "") not in done:
+        ver = engine_versions.get("deepseek", "")
+        # Modelo efetivo (opção ou variável de ambiente): trocar o modelo invalida o cache.
+        model_path, weights_path, _cache_dir = resolve_deepseek_paths(cfg.deepseek_model_path, cfg.deepseek_weights_path)
+        res = _run_engine_cached(
+            img, sha, cfg, "deepseek", "deepseek", ver,
+            {"model_path": model_path, "weights_path": weights_path},
+            lambda: run_deepseek(
                 img,
                 gpu=cfg.gpu,
                 model_path=cfg.deepseek_model_path,
                 weights_path=cfg.deepseek_weights_path,
                 cache_dir=cfg.deepseek_cache_dir,
+                emit=emit,
+            ),
+            cache,
+            precomputed.get("deepseek"), defer,
+        )
+        pairs.append(_engine_pair(img, sha, cfg, "deepseek", cfg.lang, res, ver))
+
+    if cpu_future is not None:
+        cpu_pairs = cpu_future.result()
+    return cpu_pairs + pairs
+
+def process_chunk(
+    imgs: List[Path],
+    cfg: OCRConfig,
+    engine_versions: Optional[Dict[str, str]] = None,
+    completed: Optional[List[Optional[Dict[str, Set[Unit]]]]] = None,
+    shas: Optional[List[str]] = None,
+    arrays: Optional[List[Any]] = None,
+    defer: Optional[Defer] = None,
+) -> List[List[ManifestPair]]:
+    """Como `process_image`, mas agrupa a inferência EasyOCR das imagens em lotes na GPU.
+
+    Primeiro resolve o que já está no checkpoint ou no cache; só as imagens
+    restantes vão para `run_easyocr_batch`, e os resultados são repassados a
+    `process_image` de cada imagem.
+    """
+    engine_versions = engine_versions or {}
+    completed = completed or [None] * len(imgs)
+    cache = _open_cache(cfg)
+    shas = [sha or sha256_of_file(img) for img, sha in zip(imgs, shas or [None] * len(imgs))]
+    arrays = arrays or [None] * len(imgs)
+    precomputed: List[Dict[str, Dict[str, Any]]] = [{} for _ in imgs]
+
+    with _engine_pool(len(imgs)) as pool:
+        # Tesseract das páginas do lote começa antes da inferência em GPU.
+        cpu_futures: List[Optional["Future[List[ManifestPair]]"]] = [None] * len(imgs)
+        if _overlap_engines(cfg):
+            for idx, img in enumerate(imgs):
+                done = (completed[idx] or {}).get(shas[idx], set())
+                cpu_futures[idx] = pool.submit(_run_cpu_engines, img, shas[idx], cfg, engine_versions, done, cache)
+
+        if "easyocr" in cfg.engines and not cfg.dry_run:
+            ver = engine_versions.get("easyocr", "")
+            params = {"lang": sorted(cfg.easyocr_langs)}
+            pending = []
+            for idx, img in enumerate(imgs):
+                if ("easyocr", "") in (completed[idx] or {}).get(shas[idx], set()):
+                    continue
+                hit = _lookup_engine_cache(img, shas[idx], cfg, "easyocr", "easy", ver, params, cache)
+                if hit is not None:
+                    precomputed[idx]["easyocr"] = hit
+                else:
+                    pending.append(idx)
+            if pending:
+                batch = run_easyocr_batch(
+                    [imgs[idx] for idx in pending], cfg.easyocr_langs, gpu=cfg.gpu, batch_size=cfg.batch_size,
+                    arrays=[arrays[idx] for idx in pending], emit=_deferred_emit(defer),
+                )
+                for idx, res in zip(pending, batch):
+                    precomputed[idx]["easyocr"] = res
+
+        return [
+            process_image(
+                img, cfg, engine_versions, completed[idx], shas[idx], precomputed[idx], arrays[idx], defer,
+                cpu_futures[idx],
             )
-            available = res.get("available", False)
-            append_csv(manifest_csv, MANIFEST_FIELDS, {
-                "timestamp": datetime.utcnow().isoformat(timespec="seconds")+"Z",
-                "source_path": str(img),
-                "source_sha256": sha,
-                "engine": "deepseek",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "lang": cfg.lang,
-                "oem": "",
-                "psm": "",
-                "format": "txt",
-                "exit_code": 0 if available else 1,
-                "duration_sec": 0.0,
-                "stderr": "" if available else res.get("error",""),
-                "out_path": res.get("out_txt","") if available else "",
-                "notes": "" if available else "backend ausente"
-            })
-            rows_jsonl.append({
-                "engine": "deepseek",
-                "engine_version": "",
-                "device": "cuda" if cfg.gpu else "cpu",
-                "available": available,
-                "out_txt": res.get("out_txt", ""),
-                "out_json": res.get("out_json", ""),
-                "error": res.get("error", "") if not available else "",
-                "source_path": str(img),
-                "source_sha256": sha
-            })
-            stats["rows"] += 1
+            for idx, img in enumerate(imgs)
+        ]
+
+def _process_chunk_worker(
+    args: Tuple[List[Path], OCRConfig, Dict[str, str], List[Optional[Dict[str, Set[Unit]]]], List[Optional[str]]],
+) -> List[List[ManifestPair]]:
+    imgs, cfg, engine_versions, completed, shas = args
+    return process_chunk(imgs, cfg, engine_versions, completed, shas)
+
+def _process_image_worker(
+    args: Tuple[Path, OCRConfig, Dict[str, str], Optional[Dict[str, Set[Unit]]], Optional[str]],
+) -> List[ManifestPair]:
+    # Executado em processos filhos: cada worker mantém seus próprios modelos
+    # EasyOCR/Paddle/DeepSeek/tesserocr aquecidos nos caches de `backends`.
+    img, cfg, engine_versions, completed, sha = args
+    return process_image(img, cfg, engine_versions, completed, sha)
+
+def _load_checkpoint(path: Path) -> Dict[str, Dict[str, Set[Unit]]]:
+    """Lê o checkpoint: source_path -> SHA-256 -> unidades (engine, psm) concluídas."""
+    completed: Dict[str, Dict[str, Set[Unit]]] = {}
+    if not path.exists():
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Última linha truncada por uma queda no meio da escrita.
+                continue
+            by_sha = completed.setdefault(entry["source_path"], {})
+            by_sha.setdefault(entry["source_sha256"], set()).add((entry["engine"], str(entry.get("psm", ""))))
+    return completed
+
+def _units_of(json_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Só unidades em que todas as linhas (um formato cada) terminaram sem erro
+    # entram no checkpoint; as que falharam são refeitas pelo `--resume`.
+    units: Dict[Tuple[str, str, str, str], bool] = {}
+    for row in json_rows:
+        psm = row.get("psm")
+        unit = (row["source_path"], row["source_sha256"], row["engine"], "" if psm is None else str(psm))
+        ok = row.get("exit_code", 0) == 0 and row.get("available", True)
+        units[unit] = units.get(unit, True) and ok
+    return [
+        {"source_path": path, "source_sha256": sha, "engine": engine, "psm": psm}
+        for (path, sha, engine, psm), ok in units.items() if ok
+    ]
+
+def _with_digests(items: List[Any], digests: Dict[str, str], ahead: int) -> Iterator[Tuple[Any, Any]]:
+    """(imagem ou lote, SHA-256) na ordem de `items`.
+
+    Digests do catálogo são reaproveitados; os demais são calculados numa
+    thread, até `ahead` itens à frente, enquanto o OCR do item corrente roda.
+    """
+    def _digest(img: Path) -> str:
+        return digests.get(str(img)) or sha256_of_file(img)
+
+    def _load(item: Any) -> Any:
+        return [_digest(img) for img in item] if isinstance(item, list) else _digest(item)
+
+    return prefetch(items, _load, ahead)
+
+def ocr_key(cfg: OCRConfig) -> str:
+    """Assinatura dos parâmetros que definem as saídas de OCR de uma imagem (catálogo)."""
+    return json.dumps({
+        "engines": sorted(cfg.engines), "lang": cfg.lang, "oem": cfg.oem, "psm": sorted(cfg.psm),
+        "outputs": sorted(cfg.outputs), "easyocr_langs": sorted(cfg.easyocr_langs),
+    }, sort_keys=True)
+
+def _record_catalog(catalog: Catalog, cfg: OCRConfig, key: str, pairs: List[ManifestPair]) -> None:
+    # SHA-256 calculado no OCR fica no catálogo; a imagem só conta como
+    # processada se todas as unidades terminaram sem erro.
+    by_image: Dict[str, List[Dict[str, Any]]] = {}
+    for _csv_row, json_row in pairs:
+        by_image.setdefault(json_row["source_path"], []).append(json_row)
+    for source_path, rows in by_image.items():
+        sha = rows[0]["source_sha256"]
+        ok = all(row.get("exit_code", 0) == 0 and row.get("available", True) for row in rows)
+        if ok and not cfg.dry_run:
+            outputs = {row[field] for row in rows for field in ("out_path", "out_txt", "out_json") if row.get(field)}
+            catalog.record_ocr(Path(source_path), sha, key, [Path(out) for out in sorted(outputs)])
+        else:
+            catalog.record_digest(Path(source_path), sha)
+
+def detect_engine_versions(cfg: OCRConfig) -> Dict[str, str]:
+    """Versão de cada engine selecionado, consultada uma vez por execução."""
+    engine_versions: Dict[str, str] = {}
+    if "tesseract" in cfg.engines:
+        engine_versions["tesseract"] = tesseract_version()
+    if "tesseract-api" in cfg.engines:
+        engine_versions["tesseract-api"] = tesserocr_version()
+    for engine in ("paddle", "easyocr", "deepseek"):
+        if engine in cfg.engines:
+            engine_versions[engine] = python_engine_version(engine)
+    return engine_versions
+
+class RunRecorder:
+    """Registra os resultados de OCR: manifests, checkpoint e catálogo.
+
+    Cada `collect` recebe as linhas (csv, json) de uma imagem. As linhas do
+    manifest são descarregadas primeiro; o checkpoint só é gravado depois
+    delas, de modo que uma unidade marcada como concluída sempre tem suas
+    linhas registradas. Unidades com erro ou backend ausente, e tudo de um
+    `--dry-run`, ficam fora do checkpoint. Com `append`, manifests e checkpoint continuam os
+    da execução anterior (`--resume`, `daa watch`).
+    """
+
+    def __init__(self, input_dir: Path, cfg: OCRConfig, catalog: Optional[Catalog] = None, append: bool = False):
+        self.cfg = cfg
+        self.catalog = catalog
+        self.key = ocr_key(cfg)
+        self.manifest_csv = input_dir / "manifests" / "ocr_manifest.csv"
+        self.manifest_jsonl = input_dir / "manifests" / "ocr_manifest.jsonl"
+        self.checkpoint_path = input_dir / "manifests" / CHECKPOINT_NAME
+        self.stats = {"rows": 0, "cached": 0}
+        mode = "a" if append else "w"
+        self._writer = ManifestWriter(self.manifest_csv, MANIFEST_FIELDS, self.manifest_jsonl, jsonl_mode=mode)
+        ensure_parent(self.checkpoint_path)
+        self._checkpoint_fh = open(self.checkpoint_path, mode, encoding="utf-8")
+
+    def collect(self, pairs: List[ManifestPair]) -> None:
+        for csv_row, json_row in pairs:
+            self._writer.write(csv_row, json_row)
+            self.stats["rows"] += 1
+            if json_row.get("cached"):
+                self.stats["cached"] += 1
+        self._writer.flush()
+        # `--dry-run` não produz saídas: nada conta como concluído.
+        units = [] if self.cfg.dry_run else _units_of([json_row for _, json_row in pairs])
+        if units:
+            for unit in units:
+                self._checkpoint_fh.write(json.dumps(unit, ensure_ascii=False) + "\n")
+            self._checkpoint_fh.flush()
+            os.fsync(self._checkpoint_fh.fileno())
+        if self.catalog is not None:
+            _record_catalog(self.catalog, self.cfg, self.key, pairs)
+
+    def close(self) -> None:
+        self._writer.close()
+        self._checkpoint_fh.close()
+
+    def __enter__(self) -> "RunRecorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def ocr_batch(cfg: OCRConfig) -> Dict[str, Any]:
+    input_dir = Path(cfg.input_dir).resolve()
+    index = CollectionIndex(input_dir).scan(cfg.glob)
+    files = index.images(cfg.glob)
+    catalog = open_catalog(input_dir) if cfg.catalog else None
+    if cfg.changed_only and catalog is None:
+        raise SystemExit("--changed-only requer o catálogo da coleção (manifests/catalog.sqlite) com permissão de escrita.")
+    digests: Dict[str, str] = {}
+    catalog_diff: Dict[str, int] = {}
+    if catalog is not None:
+        catalog_diff = catalog.sync(files, index, cfg.gold_suffix, glob=cfg.glob).summary()
+        # Só imagens sem mudança de inode/tamanho/mtime reaproveitam o SHA-256.
+        digests = catalog.digests(files)
+        if cfg.changed_only:
+            files = catalog.pending_ocr(files, ocr_key(cfg))
+    checkpoint_path = input_dir / "manifests" / CHECKPOINT_NAME
+
+    # Sem --resume a execução recomeça do zero; com --resume, o checkpoint diz
+    # o que pular e os manifests continuam de onde pararam.
+    checkpoint = _load_checkpoint(checkpoint_path) if cfg.resume else {}
+    recorder = RunRecorder(input_dir, cfg, catalog, append=cfg.resume)
+    engine_versions = detect_engine_versions(cfg)
+
+    workers = max(1, int(cfg.workers or 1))
+    tesseract_jobs = max(1, int(cfg.tesseract_jobs or 1))
+    try:
+        _run_images(files, cfg, engine_versions, checkpoint, digests, workers, tesseract_jobs, recorder.collect)
+    finally:
+        recorder.close()
+        if catalog is not None:
+            catalog.close()
+
+    stats = {"images": len(files), **recorder.stats, "hashed": sum(str(img) not in digests for img in files)}
+    cache = _open_cache(cfg)
+    if cache is not None:
+        stats["cache_evicted"] = cache.evict()
+
+    result = {
+        "stats": stats,
+        "manifest_csv": str(recorder.manifest_csv),
+        "manifest_jsonl": str(recorder.manifest_jsonl),
+        "checkpoint": str(checkpoint_path),
+    }
+    if catalog is not None:
+        result["catalog"] = str(catalog.path)
+        result["changes"] = catalog_diff
+    return result
+
+def _worker_pool(workers: int, tesseract_jobs: int) -> ProcessPoolExecutor:
+    # "spawn" evita herdar contextos CUDA/threads do processo pai via fork.
+    # O limite de processos Tesseract é global: os workers dividem as vagas de
+    # um semáforo entre processos, e não uma fração fixa cada um.
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=configure_scheduler,
+        initargs=(tesseract_jobs, ctx.BoundedSemaphore(tesseract_jobs)),
+    )
+
+def _run_pipeline(
+    files: List[Path],
+    cfg: OCRConfig,
+    engine_versions: Dict[str, str],
+    checkpoint: Dict[str, Dict[str, Set[Unit]]],
+    digests: Dict[str, str],
+    batch_size: int,
+    collect: Callable[[List[ManifestPair]], None],
+) -> None:
+    """Leitura -> OCR -> escrita em estágios ligados por filas limitadas.
+
+    Uma thread lê cada imagem uma única vez (SHA-256 + decodificação para
+    Paddle/EasyOCR), o OCR roda nesta thread e outra thread grava as saídas,
+    o cache e os manifests, na ordem das imagens.
+    """
+    decode = any(engine in cfg.engines for engine in ("paddle", "easyocr")) and not cfg.dry_run
+    batched = batch_size > 1 and "easyocr" in cfg.engines
+    chunks = [files[i:i + batch_size] for i in range(0, len(files), batch_size)] if batched else [[img] for img in files]
+
+    def _load(chunk: List[Path]) -> List[Tuple[str, Any]]:
+        # Sem decodificação, um SHA-256 já conhecido dispensa a leitura.
+        return [
+            (digests[str(img)], None) if not decode and str(img) in digests else read_image(img, decode)
+            for img in chunk
+        ]
+
+    with WriterStage(cfg.queue_size) as writer_stage:
+        for chunk, loaded in prefetch(chunks, _load, cfg.queue_size):
+            completed = [checkpoint.get(str(img)) for img in chunk]
+            shas = [sha for sha, _ in loaded]
+            arrays = [arr for _, arr in loaded]
+            if batched:
+                chunk_pairs = process_chunk(chunk, cfg, engine_versions, completed, shas, arrays, writer_stage.submit)
+            else:
+                chunk_pairs = [process_image(
+                    chunk[0], cfg, engine_versions, completed[0], shas[0], None, arrays[0], writer_stage.submit,
+                )]
+            del loaded, arrays
+            for pairs in chunk_pairs:
+                writer_stage.submit(partial(collect, pairs))
+
+def _run_images(
+    files: List[Path],
+    cfg: OCRConfig,
+    engine_versions: Dict[str, str],
+    checkpoint: Dict[str, Dict[str, Set[Unit]]],
+    digests: Dict[str, str],
+    workers: int,
+    tesseract_jobs: int,
+    collect: Callable[[List[ManifestPair]], None],
+) -> None:
+    batch_size = max(1, int(cfg.batch_size or 1))
+    if cfg.pipeline and workers <= 1:
+        configure_scheduler(tesseract_jobs)
+        _run_pipeline(files, cfg, engine_versions, checkpoint, digests, batch_size, collect)
+        return
 
-    if rows_jsonl:
-        write_jsonl(manifest_jsonl, rows_jsonl)
+    if batch_size > 1 and "easyocr" in cfg.engines:
+        chunks = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+        jobs = (
+            (chunk, cfg, engine_versions, [checkpoint.get(str(img)) for img in chunk], [digests.get(str(img)) for img in chunk])
+            for chunk in chunks
+        )
+        if workers > 1 and len(chunks) > 1:
+            workers = min(workers, len(chunks))
+            with _worker_pool(workers, tesseract_jobs) as pool:
+                for chunk_pairs in bounded_map(pool, _process_chunk_worker, jobs, workers * 4):
+                    for pairs in chunk_pairs:
+                        collect(pairs)
+        else:
+            configure_scheduler(tesseract_jobs)
+            for chunk, shas in _with_digests(chunks, digests, 2):
+                completed = [checkpoint.get(str(img)) for img in chunk]
+                for pairs in process_chunk(chunk, cfg, engine_versions, completed, shas):
+                    collect(pairs)
+        return
 
-    return {"stats": stats, "manifest_csv": str(manifest_csv), "manifest_jsonl": str(manifest_jsonl)}
+    if workers > 1 and len(files) > 1:
+        workers = min(workers, len(files))
+        with _worker_pool(workers, tesseract_jobs) as pool:
+            jobs = ((img, cfg, engine_versions, checkpoint.get(str(img)), digests.get(str(img))) for img in files)
+            # Janela limitada: sem submeter a coleção inteira nem acumular
+            # resultados atrás de uma página lenta.
+            for pairs in bounded_map(pool, _process_image_worker, jobs, workers * 4):
+                collect(pairs)
+    else:
+        configure_scheduler(tesseract_jobs)
+        for img, sha in _with_digests(files, digests, max(2, cfg.queue_size)):
+            collect(process_image(img, cfg, engine_versions, checkpoint.get(str(img)), sha))
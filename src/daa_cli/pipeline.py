@@ -0,0 +1,119 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+import queue
+import threading
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+def prefetch(items: Iterable[T], load: Callable[[T], R], maxsize: int = 2) -> Iterator[Tuple[T, R]]:
+    """Estágio de leitura: carrega os itens numa thread, até `maxsize` à frente do consumidor.
+
+    Erros do `load` são repassados ao consumidor no item em que ocorreram.
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def _reader() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                try:
+                    q.put((item, load(item), None))
+                except BaseException as exc:
+                    q.put((item, None, exc))
+                    return
+        finally:
+            q.put(_DONE)
+
+    thread = threading.Thread(target=_reader, name="daa-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = q.get()
+            if entry is _DONE:
+                break
+            item, loaded, exc = entry
+            if exc is not None:
+                raise exc
+            yield item, loaded
+    finally:
+        stop.set()
+        # Esvazia a fila para a thread leitora não ficar bloqueada num put.
+        while thread.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def bounded_map(executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """Como `executor.map`, em ordem, mas com no máximo `window` tarefas submetidas à frente.
+
+    `Executor.map` submete tudo de uma vez e guarda os resultados prontos até
+    o consumidor chegar neles; aqui a memória fica limitada à janela.
+    """
+    pending: deque = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max(1, window):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class WriterStage:
+    """Estágio de escrita: executa em ordem, numa thread, as tarefas enfileiradas.
+
+    A fila é limitada (`maxsize`), então um disco lento segura o estágio de OCR
+    em vez de acumular saídas em memória. O primeiro erro interrompe o estágio
+    e é relançado em `submit`/`close`.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="daa-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            task = self._q.get()
+            if task is _DONE:
+                return
+            if self._error is not None:
+                continue
+            try:
+                task()
+            except BaseException as exc:
+                self._error = exc
+
+    def submit(self, task: Callable[[], Any]) -> None:
+        if self._error is not None:
+            raise self._error
+        self._q.put(task)
+
+    def close(self) -> None:
+        self._q.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "WriterStage":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._q.put(_DONE)
+            self._thread.join()
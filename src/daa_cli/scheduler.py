@@ -0,0 +1,65 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+from .utils import run_cmd
+
+# (exit_code, duration_sec, stderr, queue_wait_sec)
+JobResult = Tuple[int, float, str, float]
+
+class CommandScheduler:
+    """Executa comandos externos em um pool de threads com limite de concorrência.
+
+    O limite vale para todos os comandos submetidos ao mesmo scheduler, não por
+    imagem: o scheduler padrão do processo é compartilhado pelo lote inteiro.
+    `slots` é um semáforo entre processos (`--workers`): cada comando ocupa
+    uma vaga dele enquanto roda, então o limite vale para o lote todo.
+    """
+
+    def __init__(self, max_concurrency: int = 1, slots: Any = None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.slots = slots
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="daa-cmd")
+        self._env: Optional[Dict[str, str]] = None
+        if self.max_concurrency > 1 and "OMP_THREAD_LIMIT" not in os.environ:
+            # Tesseract já usa várias threads OpenMP por processo; com processos
+            # concorrentes isso só disputa os mesmos núcleos.
+            self._env = dict(os.environ, OMP_THREAD_LIMIT="1")
+
+    def submit(self, cmd: List[str]) -> "Future[JobResult]":
+        queued_at = time.time()
+
+        def _job() -> JobResult:
+            with self.slots if self.slots is not None else nullcontext():
+                wait = time.time() - queued_at
+                rc, dt, err = run_cmd(cmd, env=self._env)
+            return rc, dt, err, wait
+
+        return self._pool.submit(_job)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+_default_scheduler: Optional[CommandScheduler] = None
+_default_lock = threading.Lock()
+
+def configure_scheduler(max_concurrency: int, slots: Any = None) -> CommandScheduler:
+    """Define o scheduler padrão do processo (reaproveitado se o limite não mudou)."""
+    global _default_scheduler
+    with _default_lock:
+        current = _default_scheduler
+        if current is not None and current.max_concurrency == max(1, int(max_concurrency)) and current.slots is slots:
+            return current
+        _default_scheduler = CommandScheduler(max_concurrency, slots)
+    if current is not None:
+        current.shutdown(wait=False)
+    return _default_scheduler
+
+def get_scheduler() -> CommandScheduler:
+    with _default_lock:
+        if _default_scheduler is not None:
+            return _default_scheduler
+    return configure_scheduler(1)
@@ -0,0 +1,398 @@
+from __future__ import annotations
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import json
+import logging
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from .config import ServeConfig
+from .ocr import ManifestPair, detect_engine_versions, process_chunk
+from .scheduler import configure_scheduler
+from .utils import IMAGE_EXTS, read_text_if_exists
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+# Latências guardadas para os percentis de /metrics (janela móvel).
+LATENCY_WINDOW = 2048
+
+_CONTENT_TYPE_EXTS = {
+    "image/jpeg": ".jpg", "image/png": ".png", "image/tiff": ".tif", "image/bmp": ".bmp", "image/webp": ".webp",
+}
+
+class _Job:
+    """Uma requisição de OCR na fila: imagem, tempos e resultado."""
+
+    __slots__ = ("img", "enqueued", "started", "finished", "batch_size", "pairs", "error", "done")
+
+    def __init__(self, img: Path):
+        self.img = img
+        self.enqueued = time.monotonic()
+        self.started = 0.0
+        self.finished = 0.0
+        self.batch_size = 0
+        self.pairs: List[ManifestPair] = []
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+class BatchQueue:
+    """Agrupa requisições concorrentes em lotes para uma única thread de OCR.
+
+    A thread pega a primeira requisição da fila e espera até `max_wait`
+    segundos por outras, até `max_batch`; o lote inteiro vai de uma vez para
+    `run_batch` (EasyOCR em lote na GPU via `process_chunk`). Como só essa
+    thread usa os modelos, eles ficam carregados entre os lotes.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Path]], List[List[ManifestPair]]], max_batch: int = 8, max_wait: float = 0.01):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.on_batch: Optional[Callable[[List[_Job]], None]] = None
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="daa-serve-batch", daemon=True)
+        self._thread.start()
+
+    def submit(self, img: Path) -> _Job:
+        if self._closed:
+            raise RuntimeError("serviço encerrando")
+        job = _Job(img)
+        self._queue.put(job)
+        return job
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self, first: _Job) -> Tuple[List[_Job], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            # Mesma imagem pedida por várias requisições no lote: um OCR só.
+            imgs = list(dict.fromkeys(job.img for job in batch))
+            started = time.monotonic()
+            for job in batch:
+                job.started = started
+                job.batch_size = len(imgs)
+            try:
+                results = dict(zip(imgs, self.run_batch(imgs)))
+            except Exception as exc:
+                logger.exception("Falha no lote de OCR")
+                results = {}
+                for job in batch:
+                    job.error = f"falha no OCR: {exc}"
+            finished = time.monotonic()
+            for job in batch:
+                job.finished = finished
+                job.pairs = results.get(job.img, [])
+            if self.on_batch is not None:
+                self.on_batch(batch)
+            for job in batch:
+                job.done.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        # Requisições que chegaram depois do sinal de parada não ficam esperando.
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job.error = "serviço encerrado"
+                job.done.set()
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class ServiceMetrics:
+    """Contadores e latências (ms) das requisições, expostos em /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_images = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self._latency: Dict[str, Deque[float]] = {
+            name: deque(maxlen=LATENCY_WINDOW) for name in ("queue", "ocr", "total")
+        }
+
+    def record_batch(self, jobs: List[_Job]) -> None:
+        size = jobs[0].batch_size if jobs else 0
+        with self._lock:
+            self.batches += 1
+            self.batched_images += size
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    def record_request(self, latency: Dict[str, float], ok: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            for name, value in latency.items():
+                self._latency[name].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = {
+                name: {
+                    "count": len(values),
+                    "mean": round(sum(values) / len(values), 3) if values else 0.0,
+                    "p50": round(_percentile(list(values), 0.50), 3),
+                    "p95": round(_percentile(list(values), 0.95), 3),
+                    "p99": round(_percentile(list(values), 0.99), 3),
+                    "max": round(max(values), 3) if values else 0.0,
+                }
+                for name, values in self._latency.items()
+            }
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "mean_batch_size": round(self.batched_images / self.batches, 3) if self.batches else 0.0,
+                "batch_sizes": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "latency_ms": latency,
+            }
+
+def _candidate_key(json_row: Dict[str, Any]) -> str:
+    # Mesmas chaves de `list_candidates_for_base`.
+    engine = json_row.get("engine", "")
+    if engine in ("tesseract", "tesseract-api"):
+        return f"tess_psm{int(json_row.get('psm') or 0):02d}"
+    return "easy" if engine == "easyocr" else engine
+
+def texts_from_pairs(pairs: List[ManifestPair]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """(textos, erros) por candidato a partir das linhas de manifest de uma imagem."""
+    texts: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    for _csv_row, json_row in pairs:
+        key = _candidate_key(json_row)
+        if "exit_code" in json_row:
+            if json_row.get("exit_code") != 0:
+                errors[key] = json_row.get("stderr") or f"exit_code={json_row.get('exit_code')}"
+                continue
+            if json_row.get("format") != "txt":
+                continue
+            out = json_row.get("out_path")
+        else:
+            if not json_row.get("available"):
+                errors[key] = json_row.get("error") or "backend ausente"
+                continue
+            out = json_row.get("out_txt")
+        text = read_text_if_exists(Path(out)) if out else None
+        if text is not None:
+            texts[key] = text
+    return texts, errors
+
+class OCRService:
+    """Serviço HTTP local de OCR sobre `process_chunk`, com modelos aquecidos.
+
+    - `POST /ocr` com JSON `{"path": "..."}` (imagem dentro de `input_dir`;
+      as saídas ficam ao lado dela, como no `ocr run`) ou com os bytes da
+      imagem no corpo (`Content-Type: image/...`; processada num diretório
+      temporário, apagado em seguida). Responde os textos por candidato
+      (`tess_psmNN`, `paddle`, `easy`, `deepseek`), erros e latências.
+    - `GET /health`: estado, engines e tamanho da fila.
+    - `GET /metrics`: requisições, lotes e percentis de latência (ms).
+    """
+
+    def __init__(self, cfg: ServeConfig):
+        self.cfg = cfg
+        self.root = Path(cfg.input_dir).resolve()
+        self.engine_versions = detect_engine_versions(cfg)
+        self.metrics = ServiceMetrics()
+        self._spool = Path(tempfile.mkdtemp(prefix="daa-serve-"))
+        # `process_chunk` manda ao EasyOCR até `batch_size` páginas por chamada.
+        self._ocr_cfg = cfg.model_copy(update={"batch_size": max(1, int(cfg.max_batch))})
+        configure_scheduler(max(1, int(cfg.tesseract_jobs or 1)))
+        self.batches = BatchQueue(self._run_batch, cfg.max_batch, cfg.max_wait_ms / 1000.0)
+        self.batches.on_batch = self.metrics.record_batch
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _run_batch(self, imgs: List[Path]) -> List[List[ManifestPair]]:
+        return process_chunk(imgs, self._ocr_cfg, self.engine_versions)
+
+    def resolve_path(self, raw: str) -> Path:
+        path = Path(raw)
+        path = (path if path.is_absolute() else self.root / path).resolve()
+        try:
+            path.relative_to(self.root)
+        except ValueError:
+            raise PermissionError(f"caminho fora da coleção: {raw}")
+        if path.suffix.lower() not in IMAGE_EXTS:
+            raise ValueError(f"extensão de imagem não suportada: {path.suffix}")
+        if not path.is_file():
+            raise FileNotFoundError(f"imagem não encontrada: {raw}")
+        return path
+
+    def ocr(self, img: Path) -> Tuple[int, Dict[str, Any]]:
+        """Enfileira `img`, espera o lote e monta a resposta (status HTTP, corpo)."""
+        job = self.batches.submit(img)
+        job.done.wait()
+        texts, errors = texts_from_pairs(job.pairs)
+        latency = {
+            "queue": (job.started - job.enqueued) * 1000.0,
+            "ocr": (job.finished - job.started) * 1000.0,
+            "total": (time.monotonic() - job.enqueued) * 1000.0,
+        }
+        ok = job.error is None and bool(texts)
+        self.metrics.record_request(latency, ok)
+        body = {
+            "texts": texts,
+            "errors": errors,
+            "sha256": job.pairs[0][1].get("source_sha256") if job.pairs else None,
+            "batch_size": job.batch_size,
+            "latency_ms": {name: round(value, 3) for name, value in latency.items()},
+        }
+        if job.error is not None:
+            body["error"] = job.error
+            return 500, body
+        return 200, body
+
+    def ocr_upload(self, data: bytes, suffix: str) -> Tuple[int, Dict[str, Any]]:
+        workdir = Path(tempfile.mkdtemp(dir=self._spool))
+        try:
+            img = workdir / f"upload{suffix}"
+            img.write_bytes(data)
+            return self.ocr(img)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok", "engines": list(self.cfg.engines), "gpu": self.cfg.gpu,
+            "queue": self.batches.pending(), "input_dir": str(self.root),
+        }
+
+    def start(self) -> Tuple[str, int]:
+        """Abre o servidor numa thread e devolve (host, porta); `port=0` escolhe uma porta livre."""
+        self._server = ThreadingHTTPServer((self.cfg.host, self.cfg.port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="daa-serve-http", daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        return host, port
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.batches.close()
+        shutil.rmtree(self._spool, ignore_errors=True)
+
+    def __enter__(self) -> "OCRService":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def _make_handler(service: OCRService):
+    class _Handler(BaseHTTPRequestHandler):
+        server_version = "daa-serve"
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            logger.debug("%s - " + fmt, self.address_string(), *args)
+
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            route = urlparse(self.path).path
+            if route == "/health":
+                self._reply(200, service.health())
+            elif route == "/metrics":
+                self._reply(200, service.metrics.snapshot())
+            else:
+                self._reply(404, {"error": f"rota desconhecida: {route}"})
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)
+            if url.path != "/ocr":
+                self._reply(404, {"error": f"rota desconhecida: {url.path}"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0:
+                self._reply(400, {"error": "corpo vazio"})
+                return
+            if length > MAX_UPLOAD_BYTES:
+                self._reply(413, {"error": "imagem grande demais"})
+                return
+            data = self.rfile.read(length)
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            try:
+                if content_type == "application/json":
+                    path = json.loads(data.decode("utf-8")).get("path")
+                    if not path:
+                        raise ValueError("campo 'path' obrigatório")
+                    status, body = service.ocr(service.resolve_path(path))
+                else:
+                    name = (parse_qs(url.query).get("name") or [""])[0]
+                    suffix = Path(name).suffix.lower() or _CONTENT_TYPE_EXTS.get(content_type, "")
+                    if suffix not in IMAGE_EXTS:
+                        raise ValueError("informe Content-Type de imagem ou ?name=arquivo.ext")
+                    status, body = service.ocr_upload(data, suffix)
+            except PermissionError as exc:
+                self._reply(403, {"error": str(exc)})
+                return
+            except FileNotFoundError as exc:
+                self._reply(404, {"error": str(exc)})
+                return
+            except (ValueError, AttributeError) as exc:
+                self._reply(400, {"error": str(exc)})
+                return
+            except RuntimeError as exc:
+                self._reply(503, {"error": str(exc)})
+                return
+            self._reply(status, body)
+
+    return _Handler
+
+def serve(cfg: ServeConfig, ready: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+    """Roda o serviço até Ctrl+C e devolve as métricas finais."""
+    with OCRService(cfg) as service:
+        host, port = service.start()
+        if ready is not None:
+            ready(host, port)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        return service.metrics.snapshot()
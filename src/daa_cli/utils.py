@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-import subprocess as sp, time, json, csv
+import subprocess as sp, time, json, csv, os
 from pathlib import Path
 from typing import Iterable, Dict, Any, List, Optional, Tuple
 
@@ -24,10 +24,10 @@ def tesseract_version() -> str:
     except Exception as e:
         return f"unknown ({e})"
 
-def run_cmd(cmd: List[str]) -> Tuple[int, float, str]:
+def run_cmd(cmd: List[str], env: Optional[Dict[str, str]] = None) -> Tuple[int, float, str]:
     t0 = time.time()
     try:
-        cp = sp.run(cmd, capture_output=True, text=True)
+        cp = sp.run(cmd, capture_output=True, text=True, env=env)
         dt = time.time() - t0
         stderr = (cp.stderr or "").strip()
         return cp.returncode, dt, stderr
@@ -40,6 +40,50 @@ def write_jsonl(path: Path, rows: Iterable[Dict[str, Any]]) -> None:
         for r in rows:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
+class AtomicJsonlWriter:
+    """Grava um JSONL linha a linha num `<arquivo>.tmp` e o renomeia para o destino no `commit`.
+
+    Leitores nunca veem o arquivo pela metade: até o `commit`, o destino
+    continua com o conteúdo anterior (ou não existe). Saindo do `with` por
+    erro, ou com `abort`, o temporário é apagado.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.rows = 0
+        ensure_parent(self.path)
+        self._fh = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    def commit(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+        self._fh = None
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "AtomicJsonlWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
 def append_csv(path: Path, fieldnames: List[str], row: Dict[str, Any]) -> None:
     ensure_parent(path)
     exists = path.exists()
@@ -49,8 +93,102 @@ def append_csv(path: Path, fieldnames: List[str], row: Dict[str, Any]) -> None:
             w.writeheader()
         w.writerow(row)
 
+def _csv_header(path: Path) -> Optional[List[str]]:
+    """Cabeçalho de um CSV existente e não vazio (None se não houver)."""
+    try:
+        with open(path, newline="", encoding="utf-8") as fh:
+            return next(csv.reader(fh), None)
+    except FileNotFoundError:
+        return None
+
+def _rotate(path: Path) -> Path:
+    n = 1
+    while True:
+        old = path.with_name(f"{path.stem}.old{n}{path.suffix}")
+        if not old.exists():
+            os.replace(path, old)
+            return old
+        n += 1
+
+class ManifestWriter:
+    """Grava manifests CSV e/ou JSONL por streaming com os arquivos abertos.
+
+    Os arquivos só são abertos na primeira linha. O CSV é sempre aberto em
+    modo append (cabeçalho só em arquivo novo ou vazio), como em `append_csv`;
+    se o cabeçalho existente tiver outras colunas (manifest de uma versão
+    anterior), o arquivo antigo é preservado como `<nome>.old<N>.csv` e um
+    novo é começado. O JSONL usa `jsonl_mode` ("w" ou "a"). Os buffers são
+    descarregados a cada `flush_every` linhas, em `flush` e no `close`.
+    """
+
+    def __init__(
+        self,
+        csv_path: Optional[Path],
+        fieldnames: List[str],
+        jsonl_path: Optional[Path] = None,
+        jsonl_mode: str = "w",
+        flush_every: int = 500,
+    ):
+        self.csv_path = csv_path
+        self.fieldnames = fieldnames
+        self.jsonl_path = jsonl_path
+        self.jsonl_mode = jsonl_mode
+        self.flush_every = max(1, int(flush_every))
+        self.rows = 0
+        self._opened = False
+        self._csv_fh = None
+        self._csv_writer = None
+        self._jsonl_fh = None
+
+    def _open(self) -> None:
+        self._opened = True
+        if self.csv_path is not None:
+            ensure_parent(self.csv_path)
+            if _csv_header(self.csv_path) not in (None, self.fieldnames):
+                _rotate(self.csv_path)
+            needs_header = not self.csv_path.exists() or self.csv_path.stat().st_size == 0
+            self._csv_fh = open(self.csv_path, "a", newline="", encoding="utf-8")
+            self._csv_writer = csv.DictWriter(self._csv_fh, fieldnames=self.fieldnames)
+            if needs_header:
+                self._csv_writer.writeheader()
+        if self.jsonl_path is not None:
+            ensure_parent(self.jsonl_path)
+            self._jsonl_fh = open(self.jsonl_path, self.jsonl_mode, encoding="utf-8")
+
+    def write(self, csv_row: Optional[Dict[str, Any]] = None, json_row: Optional[Dict[str, Any]] = None) -> None:
+        if not self._opened:
+            self._open()
+        if csv_row is not None and self._csv_writer is not None:
+            self._csv_writer.writerow(csv_row)
+        if json_row is not None and self._jsonl_fh is not None:
+            self._jsonl_fh.write(json.dumps(json_row, ensure_ascii=False) + "\n")
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        for fh in (self._csv_fh, self._jsonl_fh):
+            if fh is not None:
+                fh.flush()
+
+    def close(self) -> None:
+        for fh in (self._csv_fh, self._jsonl_fh):
+            if fh is not None:
+                fh.close()
+        self._csv_fh = self._jsonl_fh = None
+        self._csv_writer = None
+
+    def __enter__(self) -> "ManifestWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
 def discover_images(input_dir: Path, glob: str) -> List[Path]:
-    return [p for p in input_dir.glob(glob) if p.is_file() and p.suffix.lower() in IMAGE_EXTS]
+    # Um `os.scandir` por diretório (ver `collection.CollectionIndex`); import
+    # local porque `collection` depende de `IMAGE_EXTS` daqui.
+    from .collection import CollectionIndex
+    return CollectionIndex(input_dir).scan(glob).images(glob)
 
 def base_for_image(img: Path) -> Path:
     return img.with_suffix("")
@@ -67,3 +205,10 @@ def write_json(path: Path, data: Any) -> None:
     ensure_parent(path)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+
+def write_output(path: Path, content: Any) -> None:
+    """Grava uma saída de engine: texto puro para `str`, JSON indentado para o resto."""
+    if isinstance(content, str):
+        path.write_text(content, encoding="utf-8")
+    else:
+        write_json(path, content)
@@ -0,0 +1,283 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from .config import WatchConfig
+from .catalog import Catalog, open_catalog
+from .collection import CollectionIndex, glob_regex
+from .ocr import RunRecorder, _open_cache, detect_engine_versions, process_image
+from .scheduler import configure_scheduler
+from .utils import IMAGE_EXTS
+
+logger = logging.getLogger(__name__)
+
+WATCH_BACKENDS = ("auto", "watchdog", "polling")
+
+_WATCHDOG_MISSING = "Backend 'watchdog' requer o pacote watchdog (pip install .[watch])."
+
+# (tamanho, mtime_ns, inode)
+Signature = Tuple[int, int, int]
+
+_PROC_MOUNTS = Path("/proc/mounts")
+
+# Sistemas de arquivos em que o inotify não vê o que outros hosts gravam.
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "lustre")
+
+def _load_watchdog():
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except Exception:
+        return None
+    return Observer, FileSystemEventHandler
+
+def _signature(path: Path) -> Optional[Signature]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+def _filesystem_type(path: Path) -> Optional[str]:
+    """Tipo do sistema de arquivos de `path` segundo `/proc/mounts` (None fora do Linux)."""
+    try:
+        lines = _PROC_MOUNTS.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return None
+    target = os.path.realpath(path)
+    best: Tuple[int, Optional[str]] = (-1, None)
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        # Espaços no ponto de montagem vêm como \040.
+        mount = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[1])
+        prefix = mount.rstrip("/") + "/"
+        if (target == mount or target.startswith(prefix)) and len(mount) > best[0]:
+            best = (len(mount), fields[2])
+    return best[1]
+
+def _is_network_fs(path: Path) -> bool:
+    fstype = _filesystem_type(path)
+    return fstype is not None and (fstype in NETWORK_FILESYSTEMS or fstype.startswith("fuse.sshfs"))
+
+class PollingWatcher:
+    """Relista a coleção (`CollectionIndex`) a cada `interval` segundos.
+
+    `poll` devolve as imagens novas ou com tamanho/mtime/inode diferentes da
+    varredura anterior; a primeira varredura só serve de referência.
+    """
+
+    name = "polling"
+
+    def __init__(self, root: Path, glob: str, interval: float = 2.0):
+        self.root = root
+        self.glob = glob
+        self.interval = max(0.05, float(interval))
+        self._seen: Dict[Path, Signature] = {}
+        self._scan()
+        self._next_scan = time.monotonic() + self.interval
+
+    def _scan(self) -> List[Path]:
+        current: Dict[Path, Signature] = {}
+        touched: List[Path] = []
+        for img in CollectionIndex(self.root).scan(self.glob).images(self.glob):
+            sig = _signature(img)
+            if sig is None:
+                continue
+            current[img] = sig
+            if self._seen.get(img) != sig:
+                touched.append(img)
+        self._seen = current
+        return touched
+
+    def poll(self, timeout: float) -> List[Path]:
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self._next_scan:
+                return []
+        self._next_scan = time.monotonic() + self.interval
+        return self._scan()
+
+    def close(self) -> None:
+        pass
+
+class WatchdogWatcher:
+    """Eventos do sistema de arquivos (inotify no Linux) via `watchdog`, recursivo na raiz."""
+
+    name = "watchdog"
+
+    def __init__(self, root: Path, observer_cls: Any, handler_cls: Any):
+        self._queue: "queue.Queue[Path]" = queue.Queue()
+        events = self._queue
+
+        class _Handler(handler_cls):
+            def on_any_event(self, event: Any) -> None:
+                if event.is_directory:
+                    return
+                for attr in ("src_path", "dest_path"):
+                    path = getattr(event, attr, None)
+                    if path:
+                        events.put(Path(os.fsdecode(path)))
+
+        self._observer = observer_cls()
+        self._observer.schedule(_Handler(), str(root), recursive=True)
+        self._observer.start()
+
+    def poll(self, timeout: float) -> List[Path]:
+        try:
+            touched = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                touched.append(self._queue.get_nowait())
+            except queue.Empty:
+                return touched
+
+    def close(self) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+def open_watcher(backend: str, root: Path, glob: str, interval: float = 2.0):
+    backend = (backend or "auto").strip().lower()
+    if backend not in WATCH_BACKENDS:
+        raise ValueError(
+            "Backend de observação '{b}' inválido. Use {opts}.".format(b=backend, opts=", ".join(WATCH_BACKENDS))
+        )
+    if backend == "auto" and _is_network_fs(root):
+        # Em NFS/SMB os eventos de outros hosts nunca chegam ao inotify.
+        logger.info("%s está num sistema de arquivos de rede; observando por varredura a cada %.1fs.", root, interval)
+        backend = "polling"
+    if backend != "polling":
+        watchdog = _load_watchdog()
+        if watchdog is not None:
+            return WatchdogWatcher(root, *watchdog)
+        if backend == "watchdog":
+            raise RuntimeError(_WATCHDOG_MISSING)
+        logger.info("watchdog não instalado; observando a coleção por varredura a cada %.1fs.", interval)
+    return PollingWatcher(root, glob, interval)
+
+class SettleTracker:
+    """Segura cada imagem até ela ficar `settle` segundos sem mudar.
+
+    As estações de digitalização gravam TIFFs grandes aos poucos: uma imagem
+    só é liberada quando tamanho, mtime e inode se mantêm pelo intervalo.
+    """
+
+    def __init__(self, settle: float = 2.0):
+        self.settle = max(0.0, float(settle))
+        self._pending: Dict[Path, Tuple[Optional[Signature], float]] = {}
+
+    def touch(self, path: Path, now: float) -> None:
+        self._pending[path] = (_signature(path), now)
+
+    def ready(self, now: float) -> List[Path]:
+        out: List[Path] = []
+        for path, (sig, since) in list(self._pending.items()):
+            current = _signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != sig:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle:
+                del self._pending[path]
+                out.append(path)
+        return sorted(out)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+def _process(
+    img: Path, cfg: WatchConfig, catalog: Catalog, recorder: RunRecorder,
+    engine_versions: Dict[str, str], stats: Dict[str, int], synced: bool = False,
+) -> None:
+    if not synced:
+        catalog.sync([img], CollectionIndex(img.parent), cfg.gold_suffix, prune=False)
+    if not catalog.pending_ocr([img], recorder.key):
+        stats["skipped"] += 1
+        return
+    try:
+        pairs = process_image(img, cfg, engine_versions, None, catalog.digests([img]).get(str(img)))
+    except Exception as exc:
+        # Um arquivo corrompido ou removido no meio do caminho não derruba o daemon.
+        logger.warning("Falha no OCR de %s: %s", img, exc)
+        stats["errors"] += 1
+        return
+    recorder.collect(pairs)
+    stats["images"] += 1
+
+def watch_collection(cfg: WatchConfig, stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """Processa imagens novas ou alteradas assim que chegam à coleção, até `stop` (ou Ctrl+C).
+
+    Roda no próprio processo, uma imagem por vez, com a lógica de
+    `process_image`: os modelos ficam carregados nos caches de `backends`
+    entre uma página e outra. Manifests e checkpoint recebem as novas linhas
+    por acréscimo, e o catálogo decide o que ainda precisa de OCR.
+    """
+    input_dir = Path(cfg.input_dir).resolve()
+    stop = stop or threading.Event()
+    try:
+        watcher = open_watcher(cfg.backend, input_dir, cfg.glob, cfg.interval)
+    except (ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
+    catalog = open_catalog(input_dir)
+    if catalog is None:
+        watcher.close()
+        raise SystemExit("daa watch requer o catálogo da coleção (manifests/catalog.sqlite) com permissão de escrita.")
+
+    pattern = glob_regex(cfg.glob)
+
+    def _matches(path: Path) -> bool:
+        try:
+            rel = path.relative_to(input_dir).as_posix()
+        except ValueError:
+            return False
+        return path.suffix.lower() in IMAGE_EXTS and pattern.match(rel) is not None
+
+    engine_versions = detect_engine_versions(cfg)
+    configure_scheduler(max(1, int(cfg.tesseract_jobs or 1)))
+    settler = SettleTracker(cfg.settle)
+    tick = max(0.05, min(0.5, cfg.interval, cfg.settle or 0.5))
+    stats = {"images": 0, "skipped": 0, "errors": 0}
+
+    try:
+        with RunRecorder(input_dir, cfg, catalog, append=True) as recorder:
+            if cfg.catch_up:
+                # O que chegou (ou mudou) enquanto o watch estava parado.
+                index = CollectionIndex(input_dir).scan(cfg.glob)
+                files = index.images(cfg.glob)
+                catalog.sync(files, index, cfg.gold_suffix, glob=cfg.glob)
+                for img in catalog.pending_ocr(files, recorder.key):
+                    if stop.is_set():
+                        break
+                    _process(img, cfg, catalog, recorder, engine_versions, stats, synced=True)
+            while not stop.is_set():
+                for path in watcher.poll(tick):
+                    if _matches(path):
+                        settler.touch(path, time.monotonic())
+                for img in settler.ready(time.monotonic()):
+                    if stop.is_set():
+                        break
+                    _process(img, cfg, catalog, recorder, engine_versions, stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        catalog.close()
+
+    cache = _open_cache(cfg)
+    if cache is not None:
+        stats["cache_evicted"] = cache.evict()
+    return {
+        "stats": stats,
+        "backend": watcher.name,
+        "manifest_jsonl": str(recorder.manifest_jsonl),
+        "catalog": str(catalog.path),
+    }
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.align import align_lines, align_opcodes, resolve_engine
+from daa_cli.config import ExportConfig
+from daa_cli.export import (
+    EMPTY, _align_indices, _lines_from_boxes, _segment_by_lines, _vote_columns, export_dataset, fuse_candidates,
+)
+
+
+@pytest.mark.parametrize("engine", ["levenshtein", "difflib"])
+def test_align_indices_reconstructs_both_sides(engine):
+    anchor = "Abbadia de S. Bento, 1923"
+    candidate = "Abadia de S Bento 1928!"
+
+    src, cand = _align_indices(anchor, candidate, engine)
+
+    assert "".join(anchor[i] for i in src if i >= 0) == anchor
+    assert "".join(candidate[j] for j in cand if j >= 0) == candidate
+    assert not ((src < 0) & (cand < 0)).any(), "every column holds at least one character"
+
+
+def test_levenshtein_alignment_is_minimal():
+    ops = align_opcodes("gato preto", "gatu preto", "levenshtein")
+    assert [op[0] for op in ops] == ["equal", "replace", "equal"]
+
+
+def test_align_engines_fuse_identically_on_simple_pages():
+    candidates = {"paddle": "numero 123", "tess_psm03": "numero123", "easy": "nume ro 12 3"}
+    for engine in ("levenshtein", "difflib"):
+        assert fuse_candidates(candidates, anchor_key="paddle", align_engine=engine) == "numero 123"
+
+
+def test_resolve_engine_rejects_unknown_names():
+    assert resolve_engine("auto") in ("levenshtein", "difflib")
+    with pytest.raises(ValueError):
+        resolve_engine("myers")
+
+
+def test_export_rejects_unknown_fuse_options_before_writing(tmp_path):
+    cfg = ExportConfig(input_dir=str(tmp_path), out=str(tmp_path / "out.jsonl"), align_engine="myers")
+    with pytest.raises(SystemExit, match="myers"):
+        export_dataset(cfg)
+    with pytest.raises(SystemExit, match="paragrafo"):
+        export_dataset(cfg.model_copy(update={"align_engine": "auto", "fuse_segment": "paragrafo"}))
+    assert not (tmp_path / "out.jsonl").exists()
+
+
+def test_align_lines_skips_unrelated_lines():
+    pivot = ["Abbadia de S. Bento", "numero 123", "fim da pagina"]
+    other = ["Abadia de S Bento", "@@##!!", "fim da pagina"]
+
+    assert align_lines(pivot, other) == [(0, 0), (2, 2)]
+
+
+def test_align_lines_keeps_order_and_prefers_best_pairs():
+    pivot = ["cabecalho", "linha um", "linha dois", "linha tres", "rodape"]
+    other = ["linha um", "linha dos", "linha tres", "cabecalho", "rodape"]
+
+    # Monotônico: "cabecalho" fora de ordem fica sem par.
+    assert align_lines(pivot, other) == [(1, 0), (2, 1), (3, 2), (4, 4)]
+    assert align_lines(pivot, []) == []
+
+
+def test_fuse_by_lines_keeps_split_lines_in_their_segment():
+    candidates = {
+        "paddle": "Abbadia de S. Bento\nnumero 123\nfim da pagina",
+        "tess_psm03": "Abbadia de S. Bento\nnumero\n123\nfim da pagina",
+        "easy": "Abadia de S Bento\nnumero 123\nfim da pagina",
+    }
+
+    segments = _segment_by_lines(candidates, ["paddle", "easy", "tess_psm03"])
+
+    assert [seg["tess_psm03"] for seg in segments] == ["Abbadia de S. Bento", "numero 123", "fim da pagina"]
+    assert fuse_candidates(candidates, anchor_key="paddle") == "Abbadia de S. Bento\nnumero 123\nfim da pagina"
+
+
+def test_lines_from_boxes_groups_fragments_and_splits_columns(tmp_path):
+    def box(x0, y0, x1, y1, text):
+        return {"bbox": [[x0, y0], [x1, y0], [x1, y1], [x0, y1]], "text": text, "conf": 0.9}
+
+    words = [
+        box(60, 10, 100, 30, "Bento"),
+        box(0, 12, 50, 30, "Abbadia"),
+        box(400, 10, 460, 30, "Coluna"),
+        box(0, 40, 80, 60, "numero"),
+    ]
+    json_path = tmp_path / "p.paddle.json"
+    json_path.write_text(json.dumps({"engine": "paddle", "words": words}), encoding="utf-8")
+
+    assert _lines_from_boxes(json_path) == "Abbadia Bento\nColuna\nnumero"
+
+
+def test_vote_columns_tie_breaks_and_inserted_spaces():
+    grid = np.array(
+        [
+            [ord("o"), ord("e"), EMPTY],
+            [EMPTY, ord("b"), ord("a")],
+            [EMPTY, ord(" "), EMPTY],
+            [EMPTY, ord(" "), ord(" ")],
+        ],
+        dtype=np.int32,
+    )
+
+    fused = _vote_columns(grid, np.array([1.0, 1.0, 1.0]))
+
+    assert fused == "oa "
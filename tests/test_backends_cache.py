@@ -4,6 +4,8 @@ from pathlib import Path
 
 import sys
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = PROJECT_ROOT / "src"
 if str(SRC_DIR) not in sys.path:
@@ -123,3 +125,151 @@ def test_run_deepseek_gpu_requires_cuda_and_deps(monkeypatch, tmp_path):
     assert result["available"] is False
     assert "Passo a passo oficial" in result["error"]
     assert "CUDA" in result["error"]
+
+
+def test_run_tesseract_api_reuses_engine_across_psms_and_images(monkeypatch, tmp_path):
+    images = [_create_image(tmp_path, "page_a.png"), _create_image(tmp_path, "page_b.png")]
+
+    instantiation_args = []
+    calls = []
+
+    class DummyAPI:
+        def __init__(self, *, lang, oem):
+            instantiation_args.append((lang, oem))
+            self.psm = None
+
+        def SetPageSegMode(self, psm):
+            self.psm = psm
+
+        def SetImageFile(self, path):
+            calls.append((path, self.psm))
+
+        def GetUTF8Text(self):
+            return f"texto psm {self.psm}"
+
+        def GetTSVText(self, page):
+            return "level\tpage_num"
+
+        def Clear(self):
+            pass
+
+        def End(self):
+            pass
+
+    class DummyTesserocr:
+        PyTessBaseAPI = DummyAPI
+
+    def fake_import(module: str):
+        if module == "tesserocr":
+            return DummyTesserocr
+        return None
+
+    monkeypatch.setattr(backends, "_safe_import", fake_import)
+    backends.clear_tesserocr_cache()
+
+    for image in images:
+        rows = backends.run_tesseract_api(image, "por", 3, [3, 6], ["txt", "tsv", "pdf"])
+        by_format = {(row["psm"], row["format"]): row for row in rows}
+        assert by_format[(3, "txt")]["exit_code"] == 0
+        assert by_format[(6, "tsv")]["exit_code"] == 0
+        assert by_format[(3, "pdf")]["exit_code"] == 1
+        # Mesmo formato do CLI: separador de página no txt, cabeçalho no TSV.
+        assert image.with_suffix(".tess.psm06.txt").read_text(encoding="utf-8") == "texto psm 6\f"
+        assert image.with_suffix(".tess.psm03.tsv").read_text(encoding="utf-8").startswith("level\tpage_num\tblock_num")
+
+    assert instantiation_args == [("por", 3)], "expected a single cached tesserocr engine"
+    assert len(calls) == 4
+
+    backends.clear_tesserocr_cache()
+
+
+def test_run_tesseract_api_reports_missing_binding(monkeypatch, tmp_path):
+    image = _create_image(tmp_path, "page_missing.png")
+    monkeypatch.setattr(backends, "_safe_import", lambda module: None)
+    backends.clear_tesserocr_cache()
+
+    rows = backends.run_tesseract_api(image, "por", 3, [3], ["txt"])
+
+    assert rows[0]["exit_code"] == 1
+    assert rows[0]["available"] is False
+    assert "tesserocr" in rows[0]["stderr"]
+
+
+def test_run_tesseract_api_reports_bad_language(monkeypatch, tmp_path):
+    images = [_create_image(tmp_path, "page_a.png"), _create_image(tmp_path, "page_b.png")]
+    attempts = []
+
+    class FailingAPI:
+        def __init__(self, *, lang, oem):
+            attempts.append(lang)
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    class DummyTesserocr:
+        PyTessBaseAPI = FailingAPI
+
+    monkeypatch.setattr(backends, "_safe_import", lambda module: DummyTesserocr if module == "tesserocr" else None)
+    backends.clear_tesserocr_cache()
+
+    for image in images:
+        rows = backends.run_tesseract_api(image, "xyz", 3, [3, 6], ["txt"])
+        assert [row["available"] for row in rows] == [False, False]
+        assert all(row["exit_code"] == 1 and "lang=xyz" in row["stderr"] for row in rows)
+
+    assert attempts == ["xyz"], "a failed init is not retried for every page"
+    backends.clear_tesserocr_cache()
+
+
+def test_run_easyocr_batch_pads_pages_of_different_sizes(monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    images = [_create_image(tmp_path, f"page_{idx}.png") for idx in range(5)]
+    sizes = {"page_0": (12, 20), "page_1": (30, 40), "page_2": (10, 22), "page_3": (11, 21), "page_4": (31, 38)}
+
+    class FakeCV2:
+        IMREAD_COLOR = 1
+        COLOR_BGR2RGB = 4
+        BORDER_CONSTANT = 0
+
+        @staticmethod
+        def imread(path, flags):
+            name = Path(path).stem
+            arr = np.zeros((*sizes[name], 3), dtype=np.uint8)
+            arr[0, 0, 0] = int(name[-1])
+            return arr
+
+        @staticmethod
+        def cvtColor(arr, code):
+            return arr
+
+        @staticmethod
+        def copyMakeBorder(arr, top, bottom, left, right, border, value):
+            return np.pad(arr, ((top, bottom), (left, right), (0, 0)), constant_values=value[0])
+
+    batches = []
+
+    class DummyReader:
+        def __init__(self, langs, gpu=False):
+            pass
+
+        def readtext_batched(self, arrays, detail=1):
+            assert len({arr.shape for arr in arrays}) == 1, "a batch must stack arrays of one shape"
+            batches.append([f"page_{arr[0, 0, 0]}" for arr in arrays])
+            return [[([[0, 0], [1, 1], [1, 0], [0, 1]], f"page_{arr[0, 0, 0]}", 0.9)] for arr in arrays]
+
+    class DummyEasyOCR:
+        Reader = DummyReader
+
+    def fake_import(module: str):
+        return {"easyocr": DummyEasyOCR, "cv2": FakeCV2}.get(module)
+
+    monkeypatch.setattr(backends, "_safe_import", fake_import)
+    backends.clear_easyocr_cache()
+
+    results = backends.run_easyocr_batch(images, ["pt"], gpu=True, batch_size=3)
+
+    # Ordenadas por tamanho: as três páginas pequenas juntas, as duas grandes juntas.
+    assert batches == [["page_2", "page_3", "page_0"], ["page_1", "page_4"]]
+    assert [Path(res["out_txt"]).read_text(encoding="utf-8") for res in results] == [
+        f"page_{idx}" for idx in range(5)
+    ]
+
+    backends.clear_easyocr_cache()
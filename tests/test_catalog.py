@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli import ocr as ocr_module
+from daa_cli.catalog import Catalog, output_kind
+from daa_cli.collection import CollectionIndex
+from daa_cli.config import OCRConfig
+
+
+def _sync(root: Path):
+    index = CollectionIndex(root).scan("*.jpg")
+    with Catalog(root) as catalog:
+        return catalog.sync(index.images("*.jpg"), index)
+
+
+def _bump(path: Path, content: bytes) -> None:
+    st = path.stat()
+    path.write_bytes(content)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_output_kind() -> None:
+    assert output_kind(".tess.psm03.txt") == "tess_psm03"
+    assert output_kind(".tess.psm11.hocr") == "tess_psm11"
+    assert output_kind(".paddle.json") == "paddle"
+    assert output_kind(".easy.txt") == "easy"
+    assert output_kind(".deepseek.txt") == "deepseek"
+    assert output_kind(".curator.txt") == "curator"
+    assert output_kind(".fuse.txt") == "fuse"
+    assert output_kind(".jpg") is None
+    assert output_kind(".paddle.old.txt") is None
+
+
+def test_sync_reports_changes_between_runs(tmp_path: Path) -> None:
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (tmp_path / name).write_bytes(b"img-" + name.encode())
+    (tmp_path / "a.tess.psm03.txt").write_text("texto", encoding="utf-8")
+
+    first = _sync(tmp_path)
+    assert first.summary() == {"new": 3, "changed": 0, "unchanged": 0, "removed": 0, "outputs_changed": 0}
+
+    _bump(tmp_path / "b.jpg", b"img-b-v2")
+    (tmp_path / "c.jpg").unlink()
+    (tmp_path / "a.curator.txt").write_text("gold", encoding="utf-8")
+    (tmp_path / "d.jpg").write_bytes(b"img-d")
+
+    second = _sync(tmp_path)
+    assert [p.name for p in second.new] == ["d.jpg"]
+    assert [p.name for p in second.changed] == ["b.jpg"]
+    assert [p.name for p in second.unchanged] == ["a.jpg"]
+    assert second.removed == ["c.jpg"]
+    assert [p.name for p in second.outputs_changed] == ["a.jpg"]
+    with Catalog(tmp_path) as catalog:
+        assert catalog.outputs(tmp_path / "a.jpg") == {"a.curator.txt": "curator", "a.tess.psm03.txt": "tess_psm03"}
+
+    assert _sync(tmp_path).summary()["unchanged"] == 3
+
+
+def test_ocr_batch_reuses_digests_and_skips_unchanged(monkeypatch, tmp_path: Path) -> None:
+    for name in ("a.jpg", "b.jpg"):
+        (tmp_path / name).write_bytes(b"img-" + name.encode())
+
+    hashed = []
+    real_sha = ocr_module.sha256_of_file
+    monkeypatch.setattr(ocr_module, "sha256_of_file", lambda path: hashed.append(path.name) or real_sha(path))
+    ran = []
+
+    def fake_tesseract(img, lang, oem, psm_list, outputs, dry_run):
+        ran.append(img.name)
+        return [{"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.0, "stderr": "",
+                 "out_path": str(img.with_suffix(f".tess.psm{psm:02d}.txt"))} for psm in psm_list]
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_tesseract)
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3], changed_only=True)
+
+    first = ocr_module.ocr_batch(cfg)
+    assert sorted(hashed) == ["a.jpg", "b.jpg"] and sorted(ran) == ["a.jpg", "b.jpg"]
+    assert first["changes"]["new"] == 2
+
+    hashed.clear(); ran.clear()
+    second = ocr_module.ocr_batch(cfg)
+    assert hashed == [] and ran == []
+    assert second["stats"]["images"] == 0
+
+    _bump(tmp_path / "b.jpg", b"img-b-v2")
+    third = ocr_module.ocr_batch(cfg)
+    assert hashed == ["b.jpg"] and ran == ["b.jpg"]
+    assert third["changes"]["changed"] == 1
+
+    # Outros parâmetros de OCR: tudo volta a ser processado, sem recalcular hashes.
+    hashed.clear(); ran.clear()
+    ocr_module.ocr_batch(cfg.model_copy(update={"psm": [3, 6]}))
+    assert hashed == [] and sorted(ran) == ["a.jpg", "b.jpg"]
+
+
+def test_sync_keys_digests_on_inode_and_follows_moves(tmp_path: Path) -> None:
+    img = tmp_path / "a.jpg"
+    img.write_bytes(b"img-a")
+    index = CollectionIndex(tmp_path).scan("**/*.jpg")
+    with Catalog(tmp_path) as catalog:
+        catalog.sync(index.images("**/*.jpg"), index)
+        catalog.record_digest(img, "sha-a")
+
+    # Movida para uma subpasta: mesmo inode, tamanho e mtime herdam o digest.
+    (tmp_path / "vol2").mkdir()
+    moved = tmp_path / "vol2" / "a.jpg"
+    os.rename(img, moved)
+    index = CollectionIndex(tmp_path).scan("**/*.jpg")
+    with Catalog(tmp_path) as catalog:
+        diff = catalog.sync(index.images("**/*.jpg"), index)
+        assert diff.new == [moved] and diff.removed == ["a.jpg"]
+        assert catalog.digests([moved]) == {str(moved): "sha-a"}
+
+    # Substituída por outro arquivo com o mesmo tamanho e mtime: o inode muda.
+    st = moved.stat()
+    replacement = tmp_path / "vol2" / "tmp.bin"
+    replacement.write_bytes(b"img-b")
+    os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(replacement, moved)
+    index = CollectionIndex(tmp_path).scan("**/*.jpg")
+    with Catalog(tmp_path) as catalog:
+        assert catalog.sync(index.images("**/*.jpg"), index).changed == [moved]
+        assert catalog.digests([moved]) == {}
+
+
+def test_ocr_batch_hashes_new_images_in_background(monkeypatch, tmp_path: Path) -> None:
+    import threading
+
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (tmp_path / name).write_bytes(b"img-" + name.encode())
+    threads = []
+    real_sha = ocr_module.sha256_of_file
+
+    def fake_sha(path):
+        threads.append(threading.current_thread().name)
+        return real_sha(path)
+
+    monkeypatch.setattr(ocr_module, "sha256_of_file", fake_sha)
+    monkeypatch.setattr(ocr_module, "run_tesseract", lambda img, *a: [
+        {"psm": 3, "format": "txt", "exit_code": 0, "duration_sec": 0.0, "stderr": "", "out_path": "x"}
+    ])
+    result = ocr_module.ocr_batch(OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3]))
+
+    assert result["stats"]["hashed"] == 3
+    assert threads and all(name != threading.main_thread().name for name in threads)
+
+
+def test_sync_with_partial_glob_keeps_other_images(tmp_path: Path) -> None:
+    (tmp_path / "vol1").mkdir()
+    (tmp_path / "vol2").mkdir()
+    for name in ("vol1/a.jpg", "vol2/b.jpg"):
+        (tmp_path / name).write_bytes(b"img-" + name.encode())
+    index = CollectionIndex(tmp_path).scan("**/*.jpg")
+    with Catalog(tmp_path) as catalog:
+        catalog.sync(index.images("**/*.jpg"), index)
+        catalog.record_ocr(tmp_path / "vol2" / "b.jpg", "sha-b", "key")
+
+    (tmp_path / "vol1" / "a.jpg").unlink()
+    index = CollectionIndex(tmp_path).scan("vol1/*.jpg")
+    with Catalog(tmp_path) as catalog:
+        diff = catalog.sync(index.images("vol1/*.jpg"), index, glob="vol1/*.jpg")
+        assert diff.removed == ["vol1/a.jpg"]
+        assert catalog.pending_ocr([tmp_path / "vol2" / "b.jpg"], "key") == []
+
+
+def test_ocr_changed_only_redoes_deleted_outputs(monkeypatch, tmp_path: Path) -> None:
+    for name in ("a.jpg", "b.jpg"):
+        (tmp_path / name).write_bytes(b"img-" + name.encode())
+    ran = []
+
+    def fake_tesseract(img, lang, oem, psm_list, outputs, dry_run):
+        ran.append(img.name)
+        rows = []
+        for psm in psm_list:
+            out = img.with_suffix(f".tess.psm{psm:02d}.txt")
+            out.write_text("texto", encoding="utf-8")
+            rows.append({"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.0, "stderr": "",
+                         "out_path": str(out)})
+        return rows
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_tesseract)
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3], changed_only=True)
+
+    ocr_module.ocr_batch(cfg)
+    ran.clear()
+    ocr_module.ocr_batch(cfg)
+    assert ran == [], "saídas gravadas pelo OCR não invalidam o próprio OCR"
+
+    (tmp_path / "a.tess.psm03.txt").unlink()
+    ocr_module.ocr_batch(cfg)
+    assert ran == ["a.jpg"]
+
+    with pytest.raises(SystemExit, match="changed-only"):
+        ocr_module.ocr_batch(cfg.model_copy(update={"catalog": False}))
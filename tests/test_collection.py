@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli import collection as collection_module
+from daa_cli.collection import CollectionIndex, list_candidates_for_base
+
+
+def _touch(path: Path, text: str = "x") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _sample_tree(root: Path) -> None:
+    for name in ("a.jpg", "a.tess.psm03.txt", "a.tess.psm11.txt", "a.tess.psm03.tsv", "a.paddle.txt",
+                 "a.paddle.json", "a.easy.txt", "a.curator.txt", "ab.jpg", "ab.paddle.txt", "notes.txt"):
+        _touch(root / name)
+    _touch(root / "vol2" / "b.PNG")
+    _touch(root / "vol2" / "b.easy.txt")
+    _touch(root / "vol2" / "deep" / "c.tif")
+
+
+def test_images_match_path_glob(tmp_path: Path) -> None:
+    _sample_tree(tmp_path)
+    for glob in ("**/*", "*.jpg", "*/*", "**/*.tif", "vol2/**/*", "a*"):
+        index = CollectionIndex(tmp_path).scan(glob)
+        expected = {p for p in tmp_path.glob(glob) if p.is_file() and p.suffix.lower() in {".jpg", ".png", ".tif"}}
+        assert set(index.images(glob)) == expected, glob
+
+
+def test_candidates_from_index_match_filesystem(tmp_path: Path) -> None:
+    _sample_tree(tmp_path)
+    index = CollectionIndex(tmp_path).scan("**/*")
+    for base in (tmp_path / "a", tmp_path / "ab", tmp_path / "vol2" / "b", tmp_path / "vol2" / "deep" / "c"):
+        assert list_candidates_for_base(base, index) == list_candidates_for_base(base)
+    assert set(list_candidates_for_base(tmp_path / "a", index)) == {"tess_psm03", "tess_psm11", "paddle", "easy"}
+    assert index.read_text(tmp_path / "a.curator.txt") == "x"
+    assert index.read_text(tmp_path / "missing.curator.txt") is None
+
+
+def test_directories_are_scanned_once(tmp_path: Path, monkeypatch) -> None:
+    _sample_tree(tmp_path)
+    calls = []
+    real_scandir = collection_module.os.scandir
+    monkeypatch.setattr(collection_module.os, "scandir", lambda path: calls.append(Path(path)) or real_scandir(path))
+
+    index = CollectionIndex(tmp_path).scan("**/*")
+    for img in index.images("**/*"):
+        list_candidates_for_base(img.with_suffix(""), index)
+        index.exists(img.with_suffix(".curator.txt"))
+    assert sorted(calls) == sorted({tmp_path, tmp_path / "vol2", tmp_path / "vol2" / "deep"})
+
+
+def test_restrict_keeps_only_siblings(tmp_path: Path) -> None:
+    _sample_tree(tmp_path)
+    sub = CollectionIndex(tmp_path).scan("*").restrict(tmp_path / "a")
+    assert list_candidates_for_base(tmp_path / "a", sub) == list_candidates_for_base(tmp_path / "a")
+    assert not sub.exists(tmp_path / "notes.txt")
+
+
+def test_images_match_path_glob_with_symlinked_dirs(tmp_path: Path) -> None:
+    root = tmp_path / "acervo"
+    _touch(root / "real" / "a.jpg")
+    _touch(root / "real" / "sub" / "c.jpg")
+    _touch(tmp_path / "ext" / "b.jpg")
+    (root / "alias").symlink_to("real", target_is_directory=True)
+    (root / "link").symlink_to("../ext", target_is_directory=True)
+    (root / "real" / "loop").symlink_to("..", target_is_directory=True)
+
+    for glob in ("**/*.jpg", "*/*.jpg", "*/*/*.jpg", "alias/**/*.jpg", "real/**/*"):
+        index = CollectionIndex(root).scan(glob)
+        expected = sorted(p for p in root.glob(glob) if p.is_file())
+        assert sorted(index.images(glob)) == expected, glob
+    assert root / "real" / "a.jpg" in CollectionIndex(root).scan("*/*.jpg").images("*/*.jpg")
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.config import ExportConfig
+from daa_cli.dataset import ShardedJsonlWriter, iter_dataset
+from daa_cli.export import export_dataset
+
+
+def _prepare_pages(tmp_path: Path, count: int) -> None:
+    for idx in range(count):
+        page = tmp_path / f"page{idx:02d}.jpg"
+        page.write_bytes(b"fake-image")
+        page.with_suffix(".curator.txt").write_text(f"Texto {idx}", encoding="utf-8")
+        page.with_suffix(".paddle.txt").write_text(f"Texto {idx}", encoding="utf-8")
+
+
+def test_export_writes_gzip_shards_with_index(tmp_path):
+    _prepare_pages(tmp_path, 5)
+    out = tmp_path / "out" / "abbadia_train.jsonl"
+    cfg = ExportConfig(
+        input_dir=str(tmp_path), glob="*.jpg", out=str(out), write_hypothesis=False,
+        shard_size=2, compression="gzip",
+    )
+
+    result = export_dataset(cfg)
+
+    index_path = Path(result["out"])
+    assert index_path.name == "abbadia_train.index.json"
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    assert index["examples"] == 5
+    assert [(s["file"], s["first_example"], s["examples"]) for s in index["shards"]] == [
+        ("abbadia_train-00000.jsonl.gz", 0, 2),
+        ("abbadia_train-00001.jsonl.gz", 2, 2),
+        ("abbadia_train-00002.jsonl.gz", 4, 1),
+    ]
+    assert len(list(iter_dataset(index_path))) == 5
+    assert not list(out.parent.glob("*.tmp"))
+
+    export_dataset(cfg.model_copy(update={"shard_size": 5}))
+    assert sorted(p.name for p in out.parent.glob("abbadia_train-*")) == ["abbadia_train-00000.jsonl.gz"]
+
+
+def test_sharded_writer_zstd_roundtrip(tmp_path):
+    pytest.importorskip("zstandard")
+    out = tmp_path / "ds.jsonl"
+    with ShardedJsonlWriter(out, shard_size=0, compression="zstd") as writer:
+        for idx in range(3):
+            writer.write({"doc_id": idx, "texto": "ação"})
+
+    assert [row["doc_id"] for row in iter_dataset(tmp_path / "ds.index.json")] == [0, 1, 2]
+
+
+def test_sharded_writer_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedJsonlWriter(tmp_path / "ds.jsonl", compression="lz4")
+
+
+def test_export_parquet_has_stable_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _prepare_pages(tmp_path, 3)
+    out = tmp_path / "out" / "abbadia_train.jsonl"
+    cfg = ExportConfig(
+        input_dir=str(tmp_path), glob="*.jpg", out=str(out), write_hypothesis=False,
+        multi_hyp="best", format="parquet",
+    )
+
+    result = export_dataset(cfg)
+
+    index = json.loads(Path(result["out"]).read_text(encoding="utf-8"))
+    assert index["format"] == "parquet"
+    table = pq.read_table(out.parent / index["shards"][0]["file"])
+    candidates_type = table.schema.field("candidates").type
+    assert (str(candidates_type.key_type), str(candidates_type.item_type)) == ("string", "string")
+    assert str(table.schema.field("cer").type) == "double"
+    rows = {row["doc_id"]: row for row in iter_dataset(Path(result["out"]))}
+    assert sorted(rows) == ["page00", "page01", "page02"]
+    assert rows["page01"]["candidates"] == [("paddle", "Texto 1")]
+    assert rows["page01"]["selected_candidates"] == ["paddle"]
+    assert rows["page01"]["candidates_keys"] == ["paddle"]
+    assert rows["page01"]["cer"] == 0.0
+
+
+@pytest.mark.parametrize("compression,codec", [("none", "UNCOMPRESSED"), ("snappy", "SNAPPY"), ("gzip", "GZIP")])
+def test_export_parquet_compression_codec(tmp_path, compression, codec):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _prepare_pages(tmp_path, 1)
+    out = tmp_path / "out" / "abbadia_train.jsonl"
+    cfg = ExportConfig(
+        input_dir=str(tmp_path), glob="*.jpg", out=str(out), write_hypothesis=False,
+        format="parquet", compression=compression,
+    )
+
+    index = json.loads(Path(export_dataset(cfg)["out"]).read_text(encoding="utf-8"))
+
+    meta = pq.ParquetFile(out.parent / index["shards"][0]["file"]).metadata
+    assert meta.row_group(0).column(0).compression == codec
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.config import EvalConfig
+from daa_cli import eval as eval_module
+from daa_cli.eval import eval_collection
+
+
+def _prepare_pages(tmp_path: Path, count: int = 3) -> None:
+    for idx in range(count):
+        page = tmp_path / f"page{idx:02d}.jpg"
+        page.write_bytes(b"fake-image")
+        page.with_suffix(".curator.txt").write_text(f"Texto correto {idx}", encoding="utf-8")
+        page.with_suffix(".paddle.txt").write_text(f"Texto correto {idx}", encoding="utf-8")
+        page.with_suffix(".tess.psm03.txt").write_text(f"Texte errado {idx}", encoding="utf-8")
+
+
+def _read_rows(path: Path):
+    with open(path, newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+def test_eval_reuses_cached_pairs_and_recomputes_changed_gold(tmp_path):
+    _prepare_pages(tmp_path)
+    cfg = EvalConfig(input_dir=str(tmp_path), glob="*.jpg", out_dir=str(tmp_path / "eval1"))
+
+    first = eval_collection(cfg)
+    assert (first["computed"], first["cached"]) == (6, 0)
+
+    (tmp_path / "page01.curator.txt").write_text("Texto revisado 1", encoding="utf-8")
+    second = eval_collection(cfg.model_copy(update={"out_dir": str(tmp_path / "eval2")}))
+    assert (second["computed"], second["cached"]) == (6, 0), "cache fica em out_dir"
+
+    third = eval_collection(cfg.model_copy(update={"out_dir": str(tmp_path / "eval2")}))
+    assert (third["computed"], third["cached"]) == (0, 6)
+
+    (tmp_path / "page01.curator.txt").write_text("Texto correto 1", encoding="utf-8")
+    fourth = eval_collection(cfg.model_copy(update={"out_dir": str(tmp_path / "eval2")}))
+    assert (fourth["computed"], fourth["cached"]) == (2, 4)
+
+
+def test_eval_workers_match_serial_rows(tmp_path):
+    _prepare_pages(tmp_path, count=5)
+    rows = {}
+    for workers in (1, 2):
+        out_dir = tmp_path / f"eval_w{workers}"
+        cfg = EvalConfig(input_dir=str(tmp_path), glob="*.jpg", out_dir=str(out_dir), workers=workers, cache=False)
+        eval_collection(cfg)
+        rows[workers] = _read_rows(out_dir / "eval_by_page.csv")
+
+    assert rows[2] == rows[1]
+    assert len(rows[2]) == 10
+
+
+def test_eval_rewrites_reports_on_cached_rerun(monkeypatch, tmp_path):
+    _prepare_pages(tmp_path)
+    out_dir = tmp_path / "eval"
+    cfg = EvalConfig(input_dir=str(tmp_path), glob="*.jpg", out_dir=str(out_dir), workers=2)
+
+    eval_collection(cfg)
+    by_page = _read_rows(out_dir / "eval_by_page.csv")
+    summary = _read_rows(out_dir / "eval_summary_by_engine_psm.csv")
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("every pair is cached: no process pool")
+
+    monkeypatch.setattr(eval_module, "ProcessPoolExecutor", no_pool)
+    again = eval_collection(cfg)
+
+    assert again["cached"] == 6
+    assert _read_rows(out_dir / "eval_by_page.csv") == by_page
+    assert _read_rows(out_dir / "eval_summary_by_engine_psm.csv") == summary
+
+
+def test_eval_replaces_report_with_old_columns(tmp_path):
+    _prepare_pages(tmp_path, count=1)
+    out_dir = tmp_path / "eval"
+    out_dir.mkdir()
+    # Relatório de antes da decomposição dos erros: só doc_id/candidate_key/cer/wer.
+    (out_dir / "eval_by_page.csv").write_text("doc_id,candidate_key,cer,wer\npage00,paddle,0.0,0.0\n", encoding="utf-8")
+
+    eval_collection(EvalConfig(input_dir=str(tmp_path), glob="*.jpg", out_dir=str(out_dir)))
+
+    with open(out_dir / "eval_by_page.csv", newline="", encoding="utf-8") as fh:
+        header = next(csv.reader(fh))
+    rows = _read_rows(out_dir / "eval_by_page.csv")
+    assert header == eval_module.PER_PAGE_FIELDS
+    assert len(rows) == 2 and all(row["ref_chars"] for row in rows)
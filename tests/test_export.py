@@ -13,6 +13,7 @@ if str(SRC_DIR) not in sys.path:
 
 from daa_cli.config import ExportConfig
 from daa_cli.export import export_dataset, fuse_candidates
+from daa_cli.utils import discover_images
 
 
 def _prepare_sample_page(tmp_path: Path) -> Path:
@@ -195,3 +196,56 @@ def test_fuse_candidates_single_candidate_fast_path():
     assert fused == "texto\ncom espaços"
 
     assert fused != "numero 123"
+
+
+def test_export_workers_match_serial_output(tmp_path):
+    for idx in range(4):
+        page = tmp_path / f"page{idx:02d}.jpg"
+        page.write_bytes(b"fake-image")
+        page.with_suffix(".curator.txt").write_text(f"Texto {idx}", encoding="utf-8")
+        page.with_suffix(".paddle.txt").write_text(f"Texto {idx}", encoding="utf-8")
+        page.with_suffix(".tess.psm03.txt").write_text(f"Texte {idx}", encoding="utf-8")
+
+    outputs = {}
+    for workers in (1, 2):
+        out_dir = tmp_path / f"out{workers}"
+        cfg = ExportConfig(
+            input_dir=str(tmp_path),
+            glob="*.jpg",
+            out=str(out_dir / "dataset.jsonl"),
+            multi_hyp="fuse",
+            write_hypothesis=False,
+            workers=workers,
+        )
+        result = export_dataset(cfg)
+        outputs[workers] = (_read_jsonl(Path(result["out"])), _read_jsonl(Path(result["manifest_jsonl"])))
+
+    assert outputs[2] == outputs[1]
+    expected = [img.stem for img in discover_images(tmp_path.resolve(), "*.jpg")]
+    assert [row["doc_id"] for row in outputs[2][0]] == expected
+
+
+def test_export_best_mode_scores_each_candidate_once(monkeypatch, tmp_path):
+    from daa_cli import metrics as metrics_module
+
+    _prepare_sample_page(tmp_path)
+    scored = []
+    real_edit_scores = metrics_module.edit_scores
+
+    def counting_edit_scores(gold, text, breakdown=True):
+        scored.append(text)
+        return real_edit_scores(gold, text, breakdown)
+
+    monkeypatch.setattr(metrics_module, "edit_scores", counting_edit_scores)
+
+    cfg = ExportConfig(
+        input_dir=str(tmp_path),
+        glob="*.jpg",
+        out=str(tmp_path / "dataset_best.jsonl"),
+        multi_hyp="best",
+        write_hypothesis=False,
+    )
+    result = export_dataset(cfg)
+
+    assert sorted(scored) == ["Texte errado", "Texto correto"]
+    assert _read_jsonl(Path(result["manifest_jsonl"]))[0]["cer"] == 0.0
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+import jiwer
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.metrics import MetricMemo, edit_scores
+
+PAIRS = [
+    ("Texto correto", "Texte errado"),
+    ("  Abbadia de S. Bento\n1923 ", "Abadia  de S Bento\n\n1928"),
+    ("numero 123", "numero 123"),
+    ("a\nb", "a b"),
+    ("gato", "gato preto e branco"),
+]
+
+
+@pytest.mark.parametrize("gold,text", PAIRS)
+@pytest.mark.parametrize("breakdown", [False, True])
+def test_edit_scores_match_jiwer(gold, text, breakdown):
+    scores = edit_scores(gold, text, breakdown)
+
+    assert scores.cer == pytest.approx(jiwer.cer(gold, text))
+    assert scores.wer == pytest.approx(jiwer.wer(gold, text))
+
+
+def test_edit_scores_breakdown_matches_jiwer_alignment():
+    gold, text = "Abbadia de S. Bento", "Abadia de S Bentoo"
+    scores = edit_scores(gold, text)
+    chars = jiwer.process_characters(gold, text)
+    words = jiwer.process_words(gold, text)
+
+    assert (scores.char_substitutions, scores.char_insertions, scores.char_deletions) == (
+        chars.substitutions, chars.insertions, chars.deletions,
+    )
+    assert (scores.word_substitutions, scores.word_insertions, scores.word_deletions) == (
+        words.substitutions, words.insertions, words.deletions,
+    )
+
+
+def test_memo_upgrades_to_breakdown_and_scores_empty_candidates():
+    memo = MetricMemo("Texto correto")
+
+    assert memo.score("Texto corretx") == memo.score("Texto corretx")
+    assert memo.details("Texto corretx").char_substitutions == 1
+    assert (memo.hits, memo.misses) == (1, 2)
+
+    empty = memo.details("")
+    assert (empty.cer, empty.wer, empty.char_deletions, empty.word_deletions) == (1.0, 1.0, 13, 2)
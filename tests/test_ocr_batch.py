@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import csv
+import json
 from pathlib import Path
 import sys
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = PROJECT_ROOT / "src"
 if str(SRC_DIR) not in sys.path:
@@ -51,21 +55,12 @@ def test_ocr_batch_uses_cached_tesseract_version(monkeypatch, tmp_path):
 
     monkeypatch.setattr(ocr_module, "run_tesseract", lambda *args, **kwargs: fake_rows)
 
-    captured_manifest_rows = []
-
-    def fake_append_csv(path, fields, row):
-        captured_manifest_rows.append(row)
-
-    monkeypatch.setattr(ocr_module, "append_csv", fake_append_csv)
-
-    captured_json_rows = []
+    result = ocr_module.ocr_batch(cfg)
 
-    def fake_write_jsonl(path, rows):
-        captured_json_rows.extend(rows)
+    with open(result["manifest_csv"], newline="", encoding="utf-8") as fh:
+        captured_manifest_rows = list(csv.DictReader(fh))
 
-    monkeypatch.setattr(ocr_module, "write_jsonl", fake_write_jsonl)
-
-    result = ocr_module.ocr_batch(cfg)
+    captured_json_rows = Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()
 
     assert len(version_calls) == 1, "tesseract_version should be called once per batch"
     assert captured_manifest_rows, "expected manifest rows to be recorded"
@@ -74,3 +69,257 @@ def test_ocr_batch_uses_cached_tesseract_version(monkeypatch, tmp_path):
     )
     assert result["stats"]["rows"] == len(captured_json_rows)
 
+
+
+def test_ocr_batch_workers_preserve_image_order(tmp_path):
+    names = ["a.jpg", "b.jpg", "c.jpg"]
+    for name in names:
+        _create_image(tmp_path, name)
+
+    cfg = OCRConfig(
+        input_dir=str(tmp_path),
+        glob="*.jpg",
+        engines=["tesseract"],
+        outputs=["txt"],
+        psm=[3, 6],
+        dry_run=True,
+        workers=2,
+    )
+
+    expected_order = [str(p) for p in ocr_module.discover_images(tmp_path.resolve(), "*.jpg")]
+
+    result = ocr_module.ocr_batch(cfg)
+
+    manifest_rows = [
+        json.loads(line)
+        for line in Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()
+    ]
+    assert result["stats"]["rows"] == len(names) * 2
+    assert [row["source_path"] for row in manifest_rows[::2]] == expected_order
+    assert [row["psm"] for row in manifest_rows] == [3, 6] * len(names)
+
+
+def test_ocr_batch_resume_skips_checkpointed_units(monkeypatch, tmp_path):
+    for name in ("a.jpg", "b.jpg"):
+        _create_image(tmp_path, name)
+
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+
+    first, second = [p.name for p in ocr_module.discover_images(tmp_path.resolve(), "*.jpg")]
+    calls = []
+    crash_on = {second}
+
+    def fake_run_tesseract(image, lang, oem, psm_list, out_formats, dry_run=False):
+        if image.name in crash_on:
+            raise MemoryError("simulated crash")
+        calls.append((image.name, list(psm_list)))
+        return [
+            {"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.1, "stderr": "", "out_path": "x"}
+            for psm in psm_list
+        ]
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_run_tesseract)
+
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3, 6])
+
+    try:
+        ocr_module.ocr_batch(cfg)
+    except MemoryError:
+        pass
+    assert calls == [(first, [3, 6])]
+
+    crash_on.clear()
+    result = ocr_module.ocr_batch(cfg.model_copy(update={"resume": True}))
+
+    assert calls == [(first, [3, 6]), (second, [3, 6])], "resume must only process pending units"
+    manifest_rows = [
+        json.loads(line)
+        for line in Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()
+    ]
+    assert [Path(row["source_path"]).name for row in manifest_rows] == [first, first, second, second]
+
+
+def test_ocr_batch_resume_retries_failed_units(monkeypatch, tmp_path):
+    _create_image(tmp_path, "a.jpg")
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+
+    calls = []
+    failing = {6}
+
+    def fake_run_tesseract(image, lang, oem, psm_list, out_formats, dry_run=False):
+        calls.append(list(psm_list))
+        return [
+            {"psm": psm, "format": fmt, "exit_code": 1 if psm in failing and fmt == "tsv" else 0,
+             "duration_sec": 0.1, "stderr": "", "out_path": "x"}
+            for psm in psm_list for fmt in out_formats
+        ]
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_run_tesseract)
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3, 6], outputs=["txt", "tsv"])
+
+    # Dry run não marca nada como concluído.
+    ocr_module.ocr_batch(cfg.model_copy(update={"dry_run": True}))
+    ocr_module.ocr_batch(cfg.model_copy(update={"resume": True}))
+    assert calls == [[3, 6], [3, 6]]
+
+    failing.clear()
+    ocr_module.ocr_batch(cfg.model_copy(update={"resume": True}))
+    assert calls == [[3, 6], [3, 6], [6]], "only the PSM with a failed format is re-run"
+
+    ocr_module.ocr_batch(cfg.model_copy(update={"resume": True}))
+    assert calls == [[3, 6], [3, 6], [6]]
+
+
+def test_ocr_batch_sends_easyocr_pages_in_batches(monkeypatch, tmp_path):
+    for idx in range(3):
+        _create_image(tmp_path, f"p{idx}.jpg")
+
+    batch_calls = []
+
+    def fake_batch(images, langs, gpu=False, batch_size=8, **kwargs):
+        batch_calls.append([img.name for img in images])
+        results = []
+        for img in images:
+            txt = img.with_suffix(".easy.txt")
+            txt.write_text("ok", encoding="utf-8")
+            img.with_suffix(".easy.json").write_text("{}", encoding="utf-8")
+            results.append({"engine": "easyocr", "available": True, "out_txt": str(txt), "out_json": str(img.with_suffix(".easy.json"))})
+        return results
+
+    monkeypatch.setattr(ocr_module, "run_easyocr_batch", fake_batch)
+    monkeypatch.setattr(ocr_module, "run_easyocr", lambda *a, **k: pytest.fail("per-image EasyOCR called"))
+
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["easyocr"], batch_size=2)
+    result = ocr_module.ocr_batch(cfg)
+
+    assert [len(call) for call in batch_calls] == [2, 1]
+    assert result["stats"]["rows"] == 3
+
+
+def test_ocr_batch_pipeline_decodes_once_and_defers_writes(monkeypatch, tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    for idx in range(3):
+        cv2.imwrite(str(tmp_path / f"p{idx}.png"), np.full((8, 12, 3), idx * 40, dtype=np.uint8))
+
+    seen = []
+
+    def fake_run_paddle(image, gpu=False, array=None, emit=None):
+        seen.append((image.name, None if array is None else array.shape))
+        txt = image.with_suffix(".paddle.txt")
+        emit(txt, f"texto {image.stem}")
+        emit(image.with_suffix(".paddle.json"), {"engine": "paddle", "words": []})
+        return {"engine": "paddle", "available": True, "out_txt": str(txt), "out_json": str(image.with_suffix(".paddle.json"))}
+
+    monkeypatch.setattr(ocr_module, "run_paddle", fake_run_paddle)
+
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.png", engines=["paddle"], pipeline=True, queue_size=1)
+    result = ocr_module.ocr_batch(cfg)
+
+    assert sorted(seen) == [(f"p{idx}.png", (8, 12, 3)) for idx in range(3)]
+    assert result["stats"]["rows"] == 3
+    for idx in range(3):
+        assert (tmp_path / f"p{idx}.paddle.txt").read_text(encoding="utf-8") == f"texto p{idx}"
+    manifest_rows = Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()
+    assert [json.loads(row)["source_path"] for row in manifest_rows] == [
+        str(p) for p in ocr_module.discover_images(tmp_path.resolve(), "*.png")
+    ]
+
+
+def test_ocr_batch_overlaps_tesseract_with_gpu_engine(monkeypatch, tmp_path):
+    import threading
+
+    _create_image(tmp_path)
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    tesseract_started = threading.Event()
+    paddle_running = threading.Event()
+    overlapped = []
+
+    def fake_run_tesseract(image, lang, oem, psm_list, out_formats, dry_run=False):
+        tesseract_started.set()
+        overlapped.append(paddle_running.wait(timeout=5))
+        return [
+            {"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.1, "stderr": "", "out_path": "x"}
+            for psm in psm_list
+        ]
+
+    def fake_run_paddle(image, gpu=False, array=None, emit=None):
+        paddle_running.set()
+        overlapped.append(tesseract_started.wait(timeout=5))
+        return {"engine": "paddle", "available": True, "out_txt": "", "out_json": ""}
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_run_tesseract)
+    monkeypatch.setattr(ocr_module, "run_paddle", fake_run_paddle)
+
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["paddle", "tesseract"], psm=[3], gpu=True)
+    result = ocr_module.ocr_batch(cfg)
+
+    assert overlapped == [True, True]
+    manifest_rows = [
+        json.loads(line)
+        for line in Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()
+    ]
+    assert [row["engine"] for row in manifest_rows] == ["tesseract", "paddle"]
+    assert not [t for t in threading.enumerate() if t.name.startswith("daa-cpu-engines")], "engine threads are shut down"
+
+
+def test_ocr_batch_starts_new_manifest_over_old_header(monkeypatch, tmp_path):
+    _create_image(tmp_path, "a.jpg")
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    manifests = tmp_path / "manifests"
+    manifests.mkdir()
+    # Manifest de antes de `queue_wait_sec`.
+    old_fields = [field for field in ocr_module.MANIFEST_FIELDS if field != "queue_wait_sec"]
+    old_manifest = ",".join(old_fields) + "\n" + ",".join("x" for _ in old_fields) + "\n"
+    (manifests / "ocr_manifest.csv").write_text(old_manifest, encoding="utf-8")
+
+    result = ocr_module.ocr_batch(OCRConfig(input_dir=str(tmp_path), glob="*.jpg", psm=[3], dry_run=True))
+
+    with open(result["manifest_csv"], newline="", encoding="utf-8") as fh:
+        reader = csv.DictReader(fh)
+        rows = list(reader)
+    assert reader.fieldnames == ocr_module.MANIFEST_FIELDS
+    assert rows and all(None not in row for row in rows)
+    tess = [row for row in rows if row["engine"] == "tesseract"]
+    assert tess[0]["stderr"] == "DRY-RUN" and tess[0]["out_path"].endswith(".tess.psm03.txt")
+    assert (manifests / "ocr_manifest.old1.csv").read_text(encoding="utf-8") == old_manifest
+
+
+def test_ocr_batch_workers_submit_a_bounded_window(monkeypatch, tmp_path):
+    from concurrent.futures import Future
+
+    names = [f"p{idx:02d}.jpg" for idx in range(20)]
+    for name in names:
+        _create_image(tmp_path, name)
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    submitted = []
+    outstanding = []
+
+    class FakePool:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, job):
+            submitted.append(job[0].name)
+            future = Future()
+            future.set_result([])
+            return future
+
+    def collect(pairs):
+        outstanding.append(len(submitted))
+
+    monkeypatch.setattr(ocr_module, "_worker_pool", FakePool)
+    cfg = OCRConfig(input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3], workers=2)
+    files = sorted(tmp_path.glob("*.jpg"))
+
+    ocr_module._run_images(files, cfg, {}, {}, {}, 2, 1, collect)
+
+    assert submitted == names
+    assert outstanding[0] == 2 * 4, "only workers * 4 images are submitted ahead"
+    assert len(outstanding) == len(names)
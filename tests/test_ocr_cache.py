@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from pathlib import Path
+import os
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.cache import ResultCache
+from daa_cli.config import OCRConfig
+from daa_cli import ocr as ocr_module
+
+
+def _fake_tesseract(calls):
+    def run(image, lang, oem, psm_list, out_formats, dry_run=False):
+        calls.append(list(psm_list))
+        rows = []
+        for psm in psm_list:
+            out_path = Path(image.with_suffix("").as_posix() + f".tess.psm{psm:02d}.txt")
+            out_path.write_text(f"texto {psm}", encoding="utf-8")
+            rows.append({
+                "psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.2,
+                "queue_wait_sec": 0.0, "stderr": "", "out_path": str(out_path),
+            })
+        return rows
+    return run
+
+
+def test_ocr_batch_restores_unchanged_pages_from_cache(monkeypatch, tmp_path):
+    collection = tmp_path / "colecao"
+    collection.mkdir()
+    image = collection / "page.jpg"
+    image.write_bytes(b"fake-image-content")
+
+    calls = []
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    monkeypatch.setattr(ocr_module, "run_tesseract", _fake_tesseract(calls))
+
+    cfg = OCRConfig(
+        input_dir=str(collection),
+        glob="*.jpg",
+        engines=["tesseract"],
+        psm=[3, 6],
+        cache_dir=str(tmp_path / "cache"),
+    )
+
+    first = ocr_module.ocr_batch(cfg)
+    assert calls == [[3, 6]]
+    assert first["stats"]["cached"] == 0
+
+    out_path = collection / "page.tess.psm06.txt"
+    out_path.unlink()
+
+    second = ocr_module.ocr_batch(cfg)
+    assert calls == [[3, 6]], "unchanged image must not be OCR'd again"
+    assert second["stats"]["cached"] == 2
+    assert out_path.read_text(encoding="utf-8") == "texto 6"
+
+    image.write_bytes(b"new-scan-content")
+    ocr_module.ocr_batch(cfg)
+    assert calls == [[3, 6], [3, 6]], "changed image must miss the cache"
+
+
+def test_deepseek_cache_follows_model_from_environment(monkeypatch, tmp_path):
+    collection = tmp_path / "colecao"
+    collection.mkdir()
+    (collection / "page.jpg").write_bytes(b"fake-image-content")
+
+    models = []
+
+    def fake_deepseek(image, gpu=False, model_path=None, weights_path=None, cache_dir=None, emit=None):
+        model = model_path or os.environ["DEEPSEEK_OCR_MODEL_PATH"]
+        models.append(model)
+        txt, js = image.with_suffix(".deepseek.txt"), image.with_suffix(".deepseek.json")
+        txt.write_text(f"texto de {model}", encoding="utf-8")
+        js.write_text("{}", encoding="utf-8")
+        return {"engine": "deepseek", "available": True, "out_txt": str(txt), "out_json": str(js)}
+
+    monkeypatch.setattr(ocr_module, "run_deepseek", fake_deepseek)
+    cfg = OCRConfig(
+        input_dir=str(collection), glob="*.jpg", engines=["deepseek"], cache_dir=str(tmp_path / "cache"), catalog=False,
+    )
+
+    monkeypatch.setenv("DEEPSEEK_OCR_MODEL_PATH", "/modelos/v1")
+    ocr_module.ocr_batch(cfg)
+    ocr_module.ocr_batch(cfg)
+    assert models == ["/modelos/v1"], "same model is served from the cache"
+
+    monkeypatch.setenv("DEEPSEEK_OCR_MODEL_PATH", "/modelos/v2")
+    ocr_module.ocr_batch(cfg)
+    assert models == ["/modelos/v1", "/modelos/v2"], "switching the model via env must miss the cache"
+    assert (collection / "page.deepseek.txt").read_text(encoding="utf-8") == "texto de /modelos/v2"
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=300)
+    src = tmp_path / "out.txt"
+    src.write_text("x" * 100, encoding="utf-8")
+
+    keys = [ResultCache.make_key(source_sha256=str(i), engine="tesseract") for i in range(3)]
+    for idx, key in enumerate(keys):
+        cache.put(key, {"txt": src})
+        meta = cache._entry_dir(key) / "meta.json"
+        os.utime(meta, (1000 + idx, 1000 + idx))
+
+    restored = tmp_path / "restored.txt"
+    assert cache.get(keys[0], {"txt": restored}) is not None
+
+    assert cache.evict() == 1
+    assert cache.get(keys[1], {"txt": restored}) is None, "oldest untouched entry is evicted"
+    assert cache.get(keys[0], {"txt": restored}) is not None
+    assert cache.get(keys[2], {"txt": restored}) is not None
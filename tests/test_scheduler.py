@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+import multiprocessing
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli import backends
+from daa_cli.scheduler import CommandScheduler
+
+
+def test_scheduler_caps_concurrency_and_reports_queue_wait():
+    scheduler = CommandScheduler(max_concurrency=2)
+    cmd = [sys.executable, "-c", "import time; time.sleep(0.3)"]
+    try:
+        futures = [scheduler.submit(cmd) for _ in range(4)]
+        results = [f.result() for f in futures]
+    finally:
+        scheduler.shutdown()
+
+    assert all(rc == 0 for rc, _, _, _ in results)
+    waits = sorted(wait for _, _, _, wait in results)
+    assert waits[0] < 0.2 and waits[1] < 0.2, "two jobs should start immediately"
+    assert waits[2] >= 0.2 and waits[3] >= 0.2, "extra jobs should wait for a free slot"
+
+
+def test_run_tesseract_emits_all_formats_from_one_run_per_psm(tmp_path):
+    image = tmp_path / "page.png"
+    image.write_bytes(b"fake")
+
+    submitted = []
+
+    class FakeFuture:
+        def result(self):
+            return 0, 0.5, "", 0.25
+
+    class FakeScheduler:
+        def submit(self, cmd):
+            submitted.append(cmd)
+            return FakeFuture()
+
+    rows = backends.run_tesseract(image, "por", 3, [3, 6], ["txt", "tsv"], scheduler=FakeScheduler())
+
+    assert len(submitted) == 2, "one tesseract process per PSM"
+    assert all(cmd[-2:] == ["txt", "tsv"] for cmd in submitted)
+    assert [(row["psm"], row["format"]) for row in rows] == [(3, "txt"), (3, "tsv"), (6, "txt"), (6, "tsv")]
+    assert all(row["duration_sec"] == 0.5 and row["queue_wait_sec"] == 0.25 for row in rows)
+    assert rows[1]["out_path"].endswith("page.tess.psm03.tsv")
+
+
+def test_run_tesseract_txt_only_keeps_plain_command(tmp_path):
+    image = tmp_path / "page.png"
+    image.write_bytes(b"fake")
+
+    submitted = []
+
+    class FakeFuture:
+        def result(self):
+            return 0, 0.1, "", 0.0
+
+    class FakeScheduler:
+        def submit(self, cmd):
+            submitted.append(cmd)
+            return FakeFuture()
+
+    backends.run_tesseract(image, "por", 3, [3], ["txt"], scheduler=FakeScheduler())
+
+    assert submitted[0][-2:] == ["--psm", "3"]
+
+
+def test_schedulers_sharing_slots_respect_global_cap():
+    # Como os workers de `--workers`: cada processo tem seu scheduler, e o
+    # semáforo compartilhado limita o total de comandos simultâneos.
+    slots = multiprocessing.get_context("spawn").BoundedSemaphore(1)
+    schedulers = [CommandScheduler(max_concurrency=2, slots=slots) for _ in range(2)]
+    cmd = [sys.executable, "-c", "import time; time.sleep(0.3)"]
+    try:
+        futures = [scheduler.submit(cmd) for scheduler in schedulers for _ in range(2)]
+        results = [f.result() for f in futures]
+    finally:
+        for scheduler in schedulers:
+            scheduler.shutdown()
+
+    assert all(rc == 0 for rc, _, _, _ in results)
+    waits = sorted(wait for _, _, _, wait in results)
+    assert waits[0] < 0.2
+    assert all(later - earlier >= 0.2 for earlier, later in zip(waits, waits[1:])), "one command at a time"
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli import ocr as ocr_module
+from daa_cli.config import ServeConfig
+from daa_cli.serve import OCRService
+
+
+def _request(url: str, data: bytes = None, content_type: str = "application/json"):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": content_type} if data is not None else {})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+@pytest.fixture
+def fake_engines(monkeypatch):
+    batches = []
+
+    def fake_tesseract(img, lang, oem, psm_list, outputs, dry_run):
+        rows = []
+        for psm in psm_list:
+            out = img.with_suffix(f".tess.psm{psm:02d}.txt")
+            out.write_text(f"tess {img.stem}", encoding="utf-8")
+            rows.append({"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.0, "stderr": "", "out_path": str(out)})
+        return rows
+
+    def fake_easyocr_batch(images, langs, gpu=False, batch_size=1, arrays=None, emit=None):
+        batches.append(len(images))
+        results = []
+        for img in images:
+            out = img.with_suffix(".easy.txt")
+            out.write_text(f"easy {img.stem}", encoding="utf-8")
+            results.append({"engine": "easyocr", "available": True, "out_txt": str(out), "out_json": ""})
+        return results
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_tesseract)
+    monkeypatch.setattr(ocr_module, "run_easyocr_batch", fake_easyocr_batch)
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    monkeypatch.setattr(ocr_module, "python_engine_version", lambda engine: "1.0")
+    return batches
+
+
+def _service(tmp_path: Path, **kwargs) -> OCRService:
+    cfg = ServeConfig(input_dir=str(tmp_path), port=0, engines=["tesseract", "easyocr"], psm=[3], **kwargs)
+    return OCRService(cfg)
+
+
+def test_serve_ocr_by_path_upload_health_and_metrics(tmp_path: Path, fake_engines) -> None:
+    (tmp_path / "page.jpg").write_bytes(b"img")
+    with _service(tmp_path) as service:
+        host, port = service.start()
+        base = f"http://{host}:{port}"
+
+        status, body = _request(base + "/ocr", json.dumps({"path": "page.jpg"}).encode())
+        assert status == 200
+        assert body["texts"] == {"tess_psm03": "tess page", "easy": "easy page"}
+        assert set(body["latency_ms"]) == {"queue", "ocr", "total"}
+
+        status, body = _request(base + "/ocr", b"uploaded-bytes", content_type="image/png")
+        assert status == 200 and body["texts"]["easy"] == "easy upload"
+        assert list(service._spool.iterdir()) == []
+
+        assert _request(base + "/ocr", json.dumps({"path": "../outside.jpg"}).encode())[0] == 403
+        assert _request(base + "/ocr", json.dumps({"path": "missing.jpg"}).encode())[0] == 404
+        assert _request(base + "/ocr", b"x", content_type="text/plain")[0] == 400
+
+        status, health = _request(base + "/health")
+        assert status == 200 and health["status"] == "ok" and health["engines"] == ["tesseract", "easyocr"]
+        status, metrics = _request(base + "/metrics")
+        assert metrics["requests"] == 2 and metrics["batches"] == 2
+        assert metrics["latency_ms"]["total"]["count"] == 2
+
+
+def test_serve_batches_concurrent_requests(tmp_path: Path, fake_engines) -> None:
+    names = [f"p{i}.jpg" for i in range(4)]
+    for name in names:
+        (tmp_path / name).write_bytes(name.encode())
+    with _service(tmp_path, max_batch=4, max_wait_ms=500.0) as service:
+        host, port = service.start()
+        results = {}
+
+        def _post(name):
+            results[name] = _request(f"http://{host}:{port}/ocr", json.dumps({"path": name}).encode())
+
+        threads = [threading.Thread(target=_post, args=(name,)) for name in names]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        assert all(status == 200 for status, _ in results.values())
+        assert {name: body["texts"]["easy"] for name, (_, body) in results.items()} == {
+            name: f"easy {Path(name).stem}" for name in names
+        }
+        assert sum(fake_engines) == 4 and max(fake_engines) > 1
+        assert service.metrics.snapshot()["mean_batch_size"] > 1
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli.utils import AtomicJsonlWriter, ManifestWriter
+
+
+def test_manifest_writer_streams_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "manifests" / "m.csv"
+    jsonl_path = tmp_path / "manifests" / "m.jsonl"
+
+    writer = ManifestWriter(csv_path, ["a", "b"], jsonl_path, flush_every=2)
+    assert not csv_path.exists(), "files are opened lazily on the first row"
+
+    writer.write({"a": 1, "b": "x"}, {"a": 1})
+    writer.write({"a": 2, "b": "y"}, {"a": 2})
+    assert len(jsonl_path.read_text(encoding="utf-8").splitlines()) == 2, "flushed every 2 rows"
+    writer.write({"a": 3, "b": "z"}, {"a": 3})
+    writer.close()
+
+    with ManifestWriter(csv_path, ["a", "b"]) as again:
+        again.write({"a": 4, "b": "w"})
+
+    csv_lines = csv_path.read_text(encoding="utf-8").splitlines()
+    assert csv_lines[0] == "a,b"
+    assert csv_lines.count("a,b") == 1, "header written only for a new file"
+    assert len(csv_lines) == 5
+    assert [json.loads(line)["a"] for line in jsonl_path.read_text(encoding="utf-8").splitlines()] == [1, 2, 3]
+
+
+def test_atomic_jsonl_writer_publishes_only_on_commit(tmp_path):
+    out = tmp_path / "sub" / "dataset.jsonl"
+    out.parent.mkdir()
+    out.write_text('{"old": true}\n', encoding="utf-8")
+
+    with AtomicJsonlWriter(out) as writer:
+        writer.write({"doc_id": "a"})
+        assert out.read_text(encoding="utf-8") == '{"old": true}\n'
+        writer.write({"doc_id": "b"})
+
+    assert [json.loads(line)["doc_id"] for line in out.read_text(encoding="utf-8").splitlines()] == ["a", "b"]
+    assert not writer.tmp_path.exists()
+
+    with pytest.raises(RuntimeError):
+        with AtomicJsonlWriter(out) as writer:
+            writer.write({"doc_id": "c"})
+            raise RuntimeError("falha no meio do export")
+
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 2
+    assert not writer.tmp_path.exists()
+
+
+def test_manifest_writer_rotates_csv_with_old_header(tmp_path):
+    csv_path = tmp_path / "m.csv"
+    csv_path.write_text("a,b\n1,x\n", encoding="utf-8")
+
+    with ManifestWriter(csv_path, ["a", "wait", "b"]) as writer:
+        writer.write({"a": 2, "wait": 0.5, "b": "y"})
+
+    assert csv_path.read_text(encoding="utf-8").splitlines() == ["a,wait,b", "2,0.5,y"]
+    assert (tmp_path / "m.old1.csv").read_text(encoding="utf-8") == "a,b\n1,x\n"
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+import threading
+import time
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from daa_cli import ocr as ocr_module
+from daa_cli.catalog import Catalog
+from daa_cli.config import WatchConfig
+from daa_cli.watch import PollingWatcher, SettleTracker, open_watcher, watch_collection
+
+
+def test_settle_tracker_waits_for_stable_file(tmp_path: Path) -> None:
+    img = tmp_path / "scan.tif"
+    img.write_bytes(b"part")
+    tracker = SettleTracker(settle=1.0)
+    tracker.touch(img, now=100.0)
+    assert tracker.ready(now=100.5) == []
+
+    # Ainda sendo gravado: a espera recomeça.
+    img.write_bytes(b"part-and-more")
+    assert tracker.ready(now=100.9) == []
+    assert tracker.ready(now=101.5) == []
+    assert tracker.ready(now=102.0) == [img]
+    assert len(tracker) == 0
+
+
+def test_polling_watcher_reports_new_and_changed_images(tmp_path: Path) -> None:
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    watcher = PollingWatcher(tmp_path, "*.jpg", interval=0.05)
+    assert watcher.poll(0.2) == []
+
+    (tmp_path / "new.jpg").write_bytes(b"new")
+    (tmp_path / "new.txt").write_text("x", encoding="utf-8")
+    assert watcher.poll(0.2) == [tmp_path / "new.jpg"]
+
+
+def test_open_watcher_rejects_unknown_backend(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        open_watcher("fanotify", tmp_path, "*.jpg")
+
+
+def test_watch_processes_backlog_and_new_scans(monkeypatch, tmp_path: Path) -> None:
+    (tmp_path / "a.jpg").write_bytes(b"img-a")
+    ran = []
+
+    def fake_tesseract(img, lang, oem, psm_list, outputs, dry_run):
+        ran.append(img.name)
+        return [{"psm": psm, "format": "txt", "exit_code": 0, "duration_sec": 0.0, "stderr": "",
+                 "out_path": str(img.with_suffix(f".tess.psm{psm:02d}.txt"))} for psm in psm_list]
+
+    monkeypatch.setattr(ocr_module, "run_tesseract", fake_tesseract)
+    monkeypatch.setattr(ocr_module, "tesseract_version", lambda: "tesseract 5.0.0")
+    cfg = WatchConfig(
+        input_dir=str(tmp_path), glob="*.jpg", engines=["tesseract"], psm=[3],
+        backend="polling", interval=0.05, settle=0.1,
+    )
+    stop = threading.Event()
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(watch_collection(cfg, stop)))
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while ran != ["a.jpg"] and time.monotonic() < deadline:
+            time.sleep(0.02)
+        (tmp_path / "b.jpg").write_bytes(b"img-b")
+        while ran != ["a.jpg", "b.jpg"] and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+
+    assert ran == ["a.jpg", "b.jpg"]
+    assert result["stats"]["images"] == 2 and result["backend"] == "polling"
+    rows = [json.loads(line) for line in Path(result["manifest_jsonl"]).read_text(encoding="utf-8").splitlines()]
+    assert [Path(row["source_path"]).name for row in rows] == ["a.jpg", "b.jpg"]
+
+    # Uma nova sessão não refaz o que o catálogo já registra como processado.
+    with Catalog(tmp_path.resolve()) as catalog:
+        assert catalog.pending_ocr([tmp_path.resolve() / "a.jpg", tmp_path.resolve() / "b.jpg"], ocr_module.ocr_key(cfg)) == []
+
+
+def test_open_watcher_auto_polls_network_filesystems(monkeypatch, tmp_path: Path) -> None:
+    from daa_cli import watch as watch_module
+
+    share = tmp_path / "acervo compartilhado"
+    share.mkdir()
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/sda1 / ext4 rw 0 0\n"
+        f"nas:/scans {str(share).replace(' ', chr(92) + '040')} nfs4 rw 0 0\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(watch_module, "_PROC_MOUNTS", mounts)
+
+    def no_watchdog():
+        raise AssertionError("inotify não enxerga gravações de outros hosts no NFS")
+
+    monkeypatch.setattr(watch_module, "_load_watchdog", no_watchdog)
+
+    assert watch_module._filesystem_type(share / "vol1") == "nfs4"
+    assert watch_module._filesystem_type(tmp_path) == "ext4"
+    watcher = open_watcher("auto", share, "*.jpg", interval=0.05)
+    assert watcher.name == "polling"
+    watcher.close()